@@ -21,22 +21,20 @@ import logging
 import traceback
 import argparse
 import datetime
+import time
 import socket
-import sqlite3
 import signal
 
-try:
-    import pytz
-except:
-    pytz = None
-
 PWD = os.path.dirname(os.path.abspath(__file__))
 BASE_DIR = os.path.dirname(PWD)
 sys.path.append(BASE_DIR)
 
 from forensics import (
-    setupLogger, validatePath, ContainerBase, TCPContainer, UDPContainer,
-    IPContainer)
+    setupLogger, validatePath, IPContainer, PacketFilter, BPFFilter,
+    SocketCapture, BatchCapture, PcapCapture, FlowTable, MonitorDB,
+    PartitionedMonitorDB, MonitorExport, EpochTime, DeferredQueueHandler,
+    RateLimitFilter, MetricsRegistry, MetricsServer)
+from forensics.pipeline import Pipeline, Source, Transform, Sink
 
 
 __version__ = '2.0.0'
@@ -44,34 +42,113 @@ __version_info__ = tuple([ int(num) for num in __version__.split('.')])
 
 
 class MonitorIP(object):
-    _PACKET_SIZE = 65535
+    _ETH_P_IP = 0x0800
+    _PROTOCOL_MAP = {'TCP': socket.IPPROTO_TCP, 'UDP': socket.IPPROTO_UDP,
+                     'ICMP': socket.IPPROTO_ICMP}
+    _REJECT_REASONS = ('short', 'fragment', 'protocol', 'address', 'port',
+                       'unknown')
 
     def __init__(self, log, options, protocols):
         self._log = log
         self._options = options
         self._protocols = protocols
-        self._conn = None
-        self._cursor = None
+        self._filter = PacketFilter(protocols, options.address, options.ports)
+        self._db = None
+        self._flows = None
+        self._capture = None
+        self._pipeline = None
+        self._anchor = 0
         self._wait = True
+        self._rateLimit = None
+
+        for handler in log.handlers:
+            for flt in handler.filters:
+                if isinstance(flt, RateLimitFilter):
+                    self._rateLimit = flt
+
+        self._setupMetrics()
+
+    def _setupMetrics(self):
+        """
+        The counters are always kept, they are only served when a metrics
+        address is given. The gauges are read when the metrics are scraped.
+        """
+        self._metrics = registry = MetricsRegistry('forensics_monitor_')
+        self._received = registry.counter(
+            'packets_received', "Packets read from the capture source.")
+        self._parsed = registry.counter(
+            'packets_parsed', "Packets parsed by a protocol container.")
+        filtered = registry.counter(
+            'packets_filtered', "Packets rejected in user space by reason.",
+            ('reason',))
+        self._filtered = dict([(reason, filtered.labels(reason))
+                               for reason in self._REJECT_REASONS])
+        self._inserted = registry.counter(
+            'rows_inserted', "Rows written to the database by table.",
+            ('table',))
+        self._commitSeconds = registry.histogram(
+            'commit_seconds', "Latency of the database batch commits.")
+        registry.counter(
+            'kernel_packets', "Packets seen by the kernel on the socket.",
+            func=lambda: self._kernelStatistics()[0])
+        registry.counter(
+            'kernel_drops', "Packets dropped by the kernel on the socket.",
+            func=lambda: self._kernelStatistics()[1])
+        registry.gauge(
+            'log_queue_depth', "Log records waiting to be written.",
+            func=self._logQueueDepth)
+        registry.gauge(
+            'pending_rows', "Packet rows waiting to be committed.",
+            func=lambda: self._db.pendingRows if self._db else 0)
+        registry.gauge(
+            'pipeline_queue_depth', "Packets waiting for the writer.",
+            func=self._pipelineQueueDepth)
+        registry.gauge(
+            'flow_table_size', "Active flows in the flow table.",
+            func=lambda: len(self._flows) if self._flows is not None else 0)
+
+    def _observeCommit(self, table, rows, seconds):
+        self._inserted.labels(table).inc(rows)
+        self._commitSeconds.observe(seconds)
+
+    def _kernelStatistics(self):
+        stats = self._capture and self._capture.kernelStatistics()
+        return stats or (0, 0)
+
+    def _pipelineQueueDepth(self):
+        return sum([depth for name, depth in self._pipeline.queueDepths()]
+                   ) if self._pipeline else 0
+
+    def _logQueueDepth(self):
+        return sum([handler.queue.qsize() for handler in self._log.handlers
+                    if isinstance(handler, DeferredQueueHandler)])
 
     def start(self):
         if self._options.data_path:
             if self._options.dump_db:
                 self.dumpDB()
+            elif self._options.export:
+                self.exportDB()
             else:
                 self._setExitHandler(self._kill)
-                self._cursor = self._configDB()
                 self._monitor()
         else:
             self._monitor()
 
-    def _configDB(self):
-        self._conn = sqlite3.connect(self._options.data_path)
-        cursor = self._conn.cursor()
-        cursor.execute("CREATE TABLE IF NOT EXISTS monitor_ip "
-                       "(protocol text, address text, port integer, "
-                       "datetime text)")
-        return cursor
+    def _openDB(self, readOnly=False):
+        options = self._options
+
+        if options.rotate or options.max_size:
+            return PartitionedMonitorDB(
+                self._log, options.data_path,
+                options.rotate or PartitionedMonitorDB.DAILY,
+                options.max_size * 1024 * 1024 if options.max_size else None,
+                options.retention * 86400 if options.retention else None,
+                options.commit_size, observer=self._observeCommit).open(
+                    readOnly)
+
+        return MonitorDB(self._log, options.data_path, options.commit_size,
+                         observer=self._observeCommit).open(readOnly)
 
     def _setExitHandler(self, func):
         if os.name == "nt":
@@ -92,66 +169,329 @@ class MonitorIP(object):
         self._wait = False
 
     def _monitor(self):
-        sock = socket.socket(socket.AF_INET, socket.SOCK_RAW,
-                             socket.IPPROTO_TCP)
+        """
+        Captured packets are parsed in the capture thread, so the capture
+        buffers can be reused, and written by the writer stage which runs
+        in the same thread or, with the thread writer, in its own thread
+        so database commits do not hold up the capture.
+        """
+        self._capture = capture = self._openCapture()
+        server = None
+        # Live packets are timed on the monotonic clock anchored to the
+        # epoch once, so the wall clock is not read for every packet.
+        self._anchor = time.time_ns() - time.monotonic_ns()
+        self._pipeline = Pipeline(
+            self._log, _CaptureSource(self._log, self, capture),
+            [_ParseTransform(self._log, self)],
+            _WriterSink(self._log, self, self._options.writer),
+            self._options.queue_size, self._options.timing)
+
+        if self._options.metrics:
+            server = MetricsServer(self._log, self._metrics,
+                                   self._options.metrics).start()
+
+        startTime = time.monotonic()
+
+        try:
+            self._pipeline.run()
+        finally:
+            # Stop serving first so the capture is not read while closing.
+            try:
+                if server:
+                    server.stop()
+            finally:
+                stats = capture.kernelStatistics()
+                capture.close()
+
+        elapsed = time.monotonic() - startTime
+        received = self._received.value
+        self._log.info("Received %s packets, accepted %s, in %.3f seconds "
+                       "(%.0f packets/second).", received,
+                       self._parsed.value, elapsed,
+                       received / elapsed if elapsed else 0)
+
+        if stats and stats[1]:
+            self._log.warning("The kernel dropped %s of %s packets.",
+                              stats[1], stats[0])
+
+        if self._options.timing:
+            self._pipeline.report()
+
+        for handler in self._log.handlers:
+            if isinstance(handler, DeferredQueueHandler):
+                suppressed = sum([getattr(flt, 'suppressed', 0)
+                                  for flt in handler.filters])
+
+                if suppressed or handler.dropped:
+                    self._log.warning("Log records suppressed by rate "
+                                      "limit: %s, dropped on a full queue: "
+                                      "%s.", suppressed, handler.dropped)
+
+    def _packets(self, capture):
+        """
+        Yields the captured (timestamp, packet) tuples, and Pipeline.TICK
+        when the capture is idle, until asked to stop.
+        """
+        received = self._received
+        tick = Pipeline.TICK
+
+        for item in capture.packets():
+            if not self._wait:
+                break
+
+            if item[1] is None:
+                yield tick
+                continue
+
+            received.inc()
+            yield item
 
-        while self._wait:
-            packet = sock.recv(self._PACKET_SIZE)
-            ipCont = IPContainer(self._log, packet)
-            Klass = IPContainer.PROTOCOL_CLASS_MAP.get(ipCont.protocol)
+    def _parse(self, item):
+        """
+        Returns the (timestamp, protocol, source address, destination
+        address, source port, destination port, length, flags) of a packet
+        or None if it is rejected.
+        """
+        timestamp, packet = item
+        reason = self._filter.reject(packet)
 
-            if not issubclass(Klass, ContainerBase):
+        if reason:
+            self._filtered[reason].inc()
+
+            if self._logAllowed(logging.DEBUG):
+                self._log.debug("Packet rejected on %s.", reason)
+
+            return None
+
+        ipCont = IPContainer(self._log, packet)
+        Klass = IPContainer.PROTOCOL_CLASS_MAP.get(ipCont.protocol)
+
+        if Klass is None:
+            self._filtered['unknown'].inc()
+
+            if self._logAllowed(logging.INFO):
                 self._log.info("Non-implemented protocol %s.",
                                hex(ipCont.protocol))
-                continue
 
-            if self._protocols and Klass.name() not in self._protocols:
-                self._log.debug("Protocol: %s rejected.", Klass)
-                continue
+            return None
 
-            address = self._options.address
+        obj = Klass(self._log, ipCont.data)
+        self._parsed.inc()
 
-            if address and ipCont.dst_addr not in address:
-                self._log.debug("Address %s rejected.", ipCont.dst_addr)
-                continue
+        if timestamp is None:
+            timestamp = self._anchor + time.monotonic_ns()
 
-            obj = Klass(self._log, ipCont.data)
-            ports = self._options.ports
+        return (timestamp, ipCont.protocol, ipCont.src_addr, ipCont.dst_addr,
+                obj.source_port, obj.destination_port, ipCont.total_length,
+                obj.flags)
 
-            if ports and obj.destination_port not in ports:
-                self._log.debug("Port %s rejected.", obj.destination_port)
-                continue
+    def _openWriter(self):
+        options = self._options
+
+        if options.data_path:
+            self._db = self._openDB()
+
+        if options.flows:
+            self._flows = FlowTable(
+                self._log, self._insertFlows, options.idle_timeout,
+                options.active_timeout, options.flow_batch)
+
+    def _write(self, record):
+        (timestamp, protocol, srcAddr, dstAddr, srcPort, dstPort, length,
+         flags) = record
+
+        if self._flows is not None:
+            self._flows.update((protocol, srcAddr, dstAddr, srcPort, dstPort),
+                               length, flags, timestamp)
+            return
+
+        if self._db:
+            self._db.insertPacket(timestamp, protocol, srcAddr, dstAddr,
+                                  dstPort)
+
+        if self._logAllowed(logging.INFO):
+            self._log.info("Protocol: %s, Source: %s:%s, Destination: %s:%s, "
+                           "UTC time: %s",
+                           IPContainer.PROTOCOL_CLASS_MAP[protocol].name(),
+                           srcAddr, srcPort, dstAddr, dstPort,
+                           EpochTime(timestamp))
+
+    def _logAllowed(self, level):
+        """
+        The per packet and per flow records are checked against the log
+        rate limit before the logging call, so no record is made for those
+        over the limit.
+        """
+        return self._log.isEnabledFor(level) and (
+            self._rateLimit is None or self._rateLimit.allow())
+
+    def _idle(self):
+        now = self._anchor + time.monotonic_ns()
+
+        if self._flows is not None:
+            self._flows.expire(now)
 
-            if hasattr(pytz, 'utc'):
-                now = datetime.datetime.now(pytz.utc).isoformat()
+        if self._db:
+            self._db.commit(now)
+
+    def _closeWriter(self):
+        if self._flows is not None:
+            self._flows.flushAll()
+
+        self.closeDB()
+
+    def _openCapture(self):
+        if self._options.read_file:
+            return PcapCapture(self._log, self._options.read_file,
+                               self._options.replay)
+
+        sock, incomingOnly = self._openSocket()
+
+        if self._options.kernel_filter:
+            BPFFilter(self._log, self._filter, incomingOnly).attach(sock)
+        elif incomingOnly:
+            BPFFilter(self._log, PacketFilter(), incomingOnly).attach(sock)
+
+        capture = None
+
+        if self._options.capture == BatchCapture.name():
+            if BatchCapture.available():
+                capture = BatchCapture(self._log, sock,
+                                       self._options.batch_size)
             else:
-                now = datetime.datetime.utcnow().isoformat()
+                self._log.warning("Batched capture is not available on "
+                                  "this platform, falling back to %s "
+                                  "capture.", SocketCapture.name())
+
+        if capture is None:
+            capture = SocketCapture(self._log, sock)
+
+        if self._options.rcvbuf:
+            capture.setReceiveBuffer(self._options.rcvbuf)
+
+        return capture
+
+    def _openSocket(self):
+        """
+        A raw IP socket only receives the protocol it was opened with, so
+        when more than one protocol is monitored a packet socket is used
+        that receives all IP traffic. Returns the socket and whether the
+        copies of outgoing packets need to be dropped.
+        """
+        if len(self._protocols) != 1 and hasattr(socket, 'AF_PACKET'):
+            return socket.socket(socket.AF_PACKET, socket.SOCK_DGRAM,
+                                 socket.htons(self._ETH_P_IP)), True
+
+        name = self._protocols[0] if self._protocols else 'TCP'
 
-            if self._cursor:
-                self._insert(Klass.name(), ipCont.src_addr,
-                             obj.destination_port, now)
+        if len(self._protocols) != 1:
+            self._log.warning("Monitoring more than one protocol is not "
+                              "supported on this platform, only %s will be "
+                              "monitored.", name)
 
-            self._log.info("Protocol: %s, Source Address: %s, "
-                           "Destination Address: %s, UTC time: %s",
-                           obj, ipCont.src_addr, ipCont.dst_addr, now)
-            self._log.info("Protocol: %s, Source Port: %s, "
-                           "Destination Port: %s", obj, obj.source_port,
-                           obj.destination_port)
+        return socket.socket(socket.AF_INET, socket.SOCK_RAW,
+                             self._PROTOCOL_MAP[name]), False
 
-    def _insert(self, protocol, addr, port, dtime):
-        self._cursor.execute("INSERT INTO monitor_ip VALUES (?,?,?,?)",
-                             (protocol, addr, port, dtime))
-        self._conn.commit()
+    def _insertFlows(self, flows):
+        if self._db:
+            self._db.insertFlows(flows)
+
+        for flow in flows:
+            if not self._logAllowed(logging.INFO):
+                continue
+
+            self._log.info("Flow: %s %s:%s -> %s:%s, first: %s, last: %s, "
+                           "packets: %s, bytes: %s, TCP flags: %s",
+                           IPContainer.PROTOCOL_CLASS_MAP[flow[0]].name(),
+                           flow[1], flow[3], flow[2], flow[4],
+                           EpochTime(flow[5]), EpochTime(flow[6]),
+                           flow[7], flow[8], hex(flow[9]))
 
     def closeDB(self):
-        if self._conn:
-            self._conn.close()
+        if self._db:
+            self._db.close()
+            self._db = None
 
     def dumpDB(self, stream=sys.stdout):
-        conn = sqlite3.connect(self._options.data_path)
+        db = self._openDB(readOnly=True)
+
+        try:
+            db.dump(stream)
+        finally:
+            db.close()
+
+    def exportDB(self, stream=sys.stdout):
+        options = self._options
+        db = self._openDB(readOnly=True)
+
+        try:
+            exporter = MonitorExport(self._log, db, options.export,
+                                     options.table)
+
+            if options.output:
+                with open(options.output, 'w', newline='',
+                          encoding='utf-8') as f:
+                    exporter.export(f, options.address, options.ports,
+                                    self._protocols, options.start,
+                                    options.end)
+            else:
+                exporter.export(stream, options.address, options.ports,
+                                self._protocols, options.start, options.end)
+        finally:
+            db.close()
+
+
+class _CaptureSource(Source):
+
+    def __init__(self, log, monitor, capture):
+        super(_CaptureSource, self).__init__(log)
+        self._monitor = monitor
+        self._capture = capture
+
+    def items(self):
+        return self._monitor._packets(self._capture)
+
+    @classmethod
+    def name(self):
+        return 'capture'
+
+
+class _ParseTransform(Transform):
 
-        for record in conn.iterdump():
-            stream.write("{}\n".format(record))
+    def __init__(self, log, monitor):
+        super(_ParseTransform, self).__init__(log)
+        self.process = monitor._parse
+
+    @classmethod
+    def name(self):
+        return 'parse'
+
+
+class _WriterSink(Sink):
+    """
+    Writes the parsed packets to the flow table or database. The database
+    is opened and closed in the thread this stage runs in.
+    """
+
+    def __init__(self, log, monitor, executor):
+        super(_WriterSink, self).__init__(log, executor)
+        self._monitor = monitor
+
+    def open(self):
+        self._monitor._openWriter()
+
+    def consume(self, record):
+        self._monitor._write(record)
+
+    def tick(self):
+        self._monitor._idle()
+
+    def close(self):
+        self._monitor._closeWriter()
+
+    @classmethod
+    def name(self):
+        return 'writer'
 
 
 if __name__ == '__main__':
@@ -168,9 +508,15 @@ if __name__ == '__main__':
     parser.add_argument(
         '-l', '--log-file', type=str, default='', dest='log_file',
         help="Log file path and filename.")
+    parser.add_argument(
+        '--log-rate', type=int, default=0, dest='log_rate',
+        help=("Maximum per packet or per flow log records per second, the "
+              "log is written from a background thread (default no "
+              "limit)."))
     parser.add_argument(
         '-a', '--address', type=str, default='', dest='address',
-        help="IP address' to monitor seperated with spaces or commas.")
+        help=("Destination IP address' to monitor seperated with spaces "
+              "or commas."))
     parser.add_argument(
         '-p', '--ports', type=str, default='', dest='ports',
         help="Port(s) to monitor seperated with spaces or commas.")
@@ -180,12 +526,107 @@ if __name__ == '__main__':
     parser.add_argument(
         '-U', '--udp', action='store_true', default=False, dest='udp',
         help="Look for the UDP protocol.")
+    parser.add_argument(
+        '-I', '--icmp', action='store_true', default=False, dest='icmp',
+        help="Look for the ICMP protocol.")
+    parser.add_argument(
+        '-K', '--kernel-filter', action='store_true', default=False,
+        dest='kernel_filter', help=("Compile the address, port, and "
+                                    "protocol selection into a BPF program "
+                                    "run in the kernel (Linux only)."))
+    parser.add_argument(
+        '-c', '--capture', type=str, default='socket', dest='capture',
+        choices=('socket', 'batch'),
+        help=("Capture backend, 'socket' receives one packet per system "
+              "call, 'batch' uses recvmmsg on Linux (default socket)."))
+    parser.add_argument(
+        '-B', '--batch-size', type=int, default=64, dest='batch_size',
+        help="Number of packets per batched receive (default 64).")
+    parser.add_argument(
+        '--rcvbuf', type=int, default=4194304, dest='rcvbuf',
+        help=("Socket receive buffer in bytes that holds a burst of packets "
+              "while the capture is busy, 0 keeps the system default "
+              "(default 4194304)."))
+    parser.add_argument(
+        '-r', '--read-file', type=str, default='', dest='read_file',
+        help="Read packets from a pcap or pcapng file instead of a socket.")
+    parser.add_argument(
+        '-R', '--replay', type=str, default='fast', dest='replay',
+        choices=('fast', 'timed'),
+        help=("Replay a file as 'fast' as possible or 'timed' to reproduce "
+              "the original packet timing (default fast)."))
+    parser.add_argument(
+        '-F', '--flows', action='store_true', default=False, dest='flows',
+        help="Aggregate packets into flows instead of one row per packet.")
+    parser.add_argument(
+        '--idle-timeout', type=int, default=60, dest='idle_timeout',
+        help="Seconds without packets before a flow expires (default 60).")
+    parser.add_argument(
+        '--active-timeout', type=int, default=1800, dest='active_timeout',
+        help=("Seconds after which an active flow is written and restarted "
+              "(default 1800)."))
+    parser.add_argument(
+        '--flow-batch', type=int, default=500, dest='flow_batch',
+        help="Number of expired flows written per batch (default 500).")
+    parser.add_argument(
+        '--writer', type=str, default='inline', dest='writer',
+        choices=('inline', 'thread'),
+        help=("Write packets 'inline' in the capture thread or in a "
+              "'thread' of their own so database commits do not hold up "
+              "the capture (default inline)."))
+    parser.add_argument(
+        '--queue-size', type=int, default=10000, dest='queue_size',
+        help=("Packets queued for a thread writer before the capture "
+              "waits (default 10000)."))
+    parser.add_argument(
+        '--timing', action='store_true', default=False, dest='timing',
+        help="Log the time spent in the capture, parse, and write stages.")
+    parser.add_argument(
+        '-M', '--metrics', type=str, default='', dest='metrics',
+        help=("Serve Prometheus metrics on 'host:port' or "
+              "'unix:/path/to/socket' while monitoring."))
     parser.add_argument(
         '-d', '--data-path', type=str, default='', dest='data_path',
         help="Path to SQLite database file.")
+    parser.add_argument(
+        '--commit-size', type=int, default=1000, dest='commit_size',
+        help=("Packet rows written per database commit, pending rows are "
+              "also committed once a second (default 1000)."))
+    parser.add_argument(
+        '--rotate', type=str, default='', dest='rotate',
+        choices=('hourly', 'daily'),
+        help=("Write a separate database file per hour or day, named after "
+              "the data path."))
+    parser.add_argument(
+        '--max-size', type=int, default=0, dest='max_size',
+        help=("Start a new database file when the current one reaches this "
+              "many megabytes, implies daily rotation if --rotate is not "
+              "set."))
+    parser.add_argument(
+        '--retention', type=float, default=0, dest='retention',
+        help="Days to keep rotated database files, default keep forever.")
     parser.add_argument(
         '-b', '--dump-db', action='store_true', dest='dump_db',
         help="Dump the database if it exists.")
+    parser.add_argument(
+        '-e', '--export', type=str, default='', dest='export',
+        choices=('csv', 'jsonl'),
+        help=("Export the database as CSV or JSON Lines, the address, port, "
+              "and protocol options select the rows, the address and port "
+              "match the destination as when monitoring."))
+    parser.add_argument(
+        '--table', type=str, default='packets', dest='table',
+        choices=('packets', 'flows'),
+        help="Table to export (default packets).")
+    parser.add_argument(
+        '--start', type=str, default=None, dest='start',
+        help="Export rows at or after this ISO 8601 UTC time.")
+    parser.add_argument(
+        '--end', type=str, default=None, dest='end',
+        help="Export rows before this ISO 8601 UTC time.")
+    parser.add_argument(
+        '-o', '--output', type=str, default='', dest='output',
+        help="Export file path and filename, default standard out.")
 
     options = parser.parse_args()
 
@@ -196,10 +637,19 @@ if __name__ == '__main__':
     else:
         level = logging.INFO
 
-    log = setupLogger(fullpath=options.log_file, level=level)
-    log.debug("Options: %s", options)
+    log = setupLogger(fullpath=options.log_file, level=level, queued=True,
+                      rate=options.log_rate)
+    # Formatted now, the options are changed before the record is written.
+    log.debug("Options: {}".format(options))
     startTime = datetime.datetime.now()
 
+    if options.read_file and not validatePath(options.read_file, file=True):
+        msg = "The capture file seems to not exist, please check: {}".format(
+            options.read_file)
+        log.critical(msg)
+        if options.quite: print(msg)
+        sys.exit(1)
+
     if not validatePath(options.data_path, sqlite=True):
         msg = "The data path seems to not exist, please check: {}".format(
             options.data_path)
@@ -207,6 +657,20 @@ if __name__ == '__main__':
         if options.quite: print(msg)
         sys.exit(1)
 
+    if options.batch_size < 1:
+        msg = "The batch size must be at least 1, found: {}".format(
+            options.batch_size)
+        log.critical(msg)
+        if options.quite: print(msg)
+        sys.exit(1)
+
+    if options.rcvbuf < 0:
+        msg = "The receive buffer must not be negative, found: {}".format(
+            options.rcvbuf)
+        log.critical(msg)
+        if options.quite: print(msg)
+        sys.exit(1)
+
     protocols = []
 
     if options.tcp:
@@ -215,6 +679,9 @@ if __name__ == '__main__':
     if options.udp:
         protocols.append("UDP")
 
+    if options.icmp:
+        protocols.append("ICMP")
+
     if options.ports:
         options.ports = [int(p.strip())
                          for p in options.ports.replace(' ', ',').split(',')
@@ -225,7 +692,7 @@ if __name__ == '__main__':
                            for a in options.address.replace(' ', ',').split(',')
                            if a]
 
-    log.debug("Options: %s", options)
+    log.debug("Options: {}".format(options))
     mip = None
 
     try:
@@ -23,7 +23,7 @@ PWD = os.path.dirname(os.path.abspath(__file__))
 BASE_DIR = os.path.dirname(PWD)
 sys.path.append(BASE_DIR)
 
-from forensics import setupLogger, validatePath
+from forensics import setupLogger, validatePath, SearchUtilities
 
 
 __version__ = '2.0.0'
@@ -52,7 +52,31 @@ if __name__ == '__main__':
         required=True, help="File or path of files to search.")
     parser.add_argument(
         '-m', '--matrix-path', type=str, default='', dest='matrix_path',
-        required=True, help="Weighted matrix filename.")
+        required=True, help=("Weighted matrix filename, a file of letter "
+                             "pairs common in the language searched."))
+    parser.add_argument(
+        '-r', '--report-path', type=str, default='', dest='report_path',
+        help="Outgoing CSV file path and filename, default standard out.")
+    parser.add_argument(
+        '-W', '--weight', type=float, default=0.75, dest='weight',
+        help=("Minimum matrix weight of a probable word, set above 1 to "
+              "only report keywords (default 0.75)."))
+    parser.add_argument(
+        '-e', '--executor', type=str, default='inline', dest='executor',
+        choices=('inline', 'thread', 'process'),
+        help=("Where files are searched, 'inline' in the walking thread, "
+              "or a pool of 'thread' or 'process' workers (default "
+              "inline)."))
+    parser.add_argument(
+        '-w', '--workers', type=int, default=4, dest='workers',
+        help="Number of thread or process workers (default 4).")
+    parser.add_argument(
+        '--queue-size', type=int, default=1000, dest='queue_size',
+        help="Files queued for the workers before walking waits (default "
+             "1000).")
+    parser.add_argument(
+        '--timing', action='store_true', default=False, dest='timing',
+        help="Log the time spent in each stage of the search.")
 
     options = parser.parse_args()
 
@@ -66,10 +90,10 @@ if __name__ == '__main__':
     log = setupLogger(fullpath=options.log_file, level=level)
     log.info("Options: %s", options)
 
-    if (not validatePath(options.search_path, dir=True) or not
+    if (not validatePath(options.search_path, dir=True) and not
         validatePath(options.search_path, file=True)):
         msg = ("The search path can be either a file or a path of files, "
-               f"please check: {options.dir_path}")
+               f"please check: {options.search_path}")
         log.critical(msg)
         if options.quite: print(msg)
         sys.exit(1)
@@ -88,15 +112,24 @@ if __name__ == '__main__':
         if options.quite: print(msg)
         sys.exit(1)
 
+    if options.report_path and not validatePath(options.report_path,
+                                                csv=True):
+        msg = (f"The report path '{options.report_path}' must include a "
+               "valid path and CSV file.")
+        log.critical(msg)
+        if options.quite: print(msg)
+        sys.exit(1)
+
     startTime = datetime.datetime.now()
 
     try:
-        log.info("Search path %s started at %s", options.dir_path, startTime)
-        #su = SearchUtilities(log, options)
-        #pCount = su.start()
+        log.info("Search path %s started at %s", options.search_path,
+                 startTime)
+        su = SearchUtilities(log, options)
+        pCount = su.start()
         endTime = datetime.datetime.now()
         log.info("Search path %s finished, %s files processed at %s, "
-                 "elapsed time %s", options.dir_path, pCount, endTime,
+                 "elapsed time %s", options.search_path, pCount, endTime,
                  endTime - startTime)
     except Exception as e:
         if options.quite:
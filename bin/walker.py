@@ -68,6 +68,22 @@ if __name__ == '__main__':
     parser.add_argument(
         '--sha512', action='store_true', dest='sha512', default=False,
         help="Use the SHA512 algorithm.")
+    parser.add_argument(
+        '-e', '--executor', type=str, default='inline', dest='executor',
+        choices=('inline', 'thread', 'process'),
+        help=("Where files are read and hashed, 'inline' in the walking "
+              "thread, or a pool of 'thread' or 'process' workers "
+              "(default inline)."))
+    parser.add_argument(
+        '-w', '--workers', type=int, default=4, dest='workers',
+        help="Number of thread or process workers (default 4).")
+    parser.add_argument(
+        '--queue-size', type=int, default=1000, dest='queue_size',
+        help="Files queued for the workers before walking waits (default "
+             "1000).")
+    parser.add_argument(
+        '--timing', action='store_true', default=False, dest='timing',
+        help="Log the time spent in each stage of the walk.")
     options = parser.parse_args()
 
     if not options.quite and options.log_file == '':
@@ -7,14 +7,34 @@ import sys
 import os
 import logging
 from .walker_utils import WalkerUtilities
-from .network import ContainerBase, TCPContainer, UDPContainer, IPContainer
+from .search_utils import Keywords, WeightedMatrix, SearchUtilities
+from .log_utils import (
+    DeferredQueueHandler, RateLimitFilter, EpochTime, startLogQueue)
+from .network import (
+    ContainerBase, IPContainer, TCPContainer, UDPContainer, ICMPContainer,
+    PacketFilter)
+from .bpf import BPFFilter
+from .capture import (
+    CaptureBase, SocketCapture, BatchCapture, CAPTURE_CLASS_MAP)
+from .pcap import PcapReader, PcapCapture
+from .flows import FlowTable
+from .database import MonitorDB, PartitionedMonitorDB
+from .export import MonitorExport
+from .metrics import (
+    Counter, Gauge, Histogram, MetricsRegistry, MetricsServer)
 
 
-def setupLogger(fullpath=None, level=logging.INFO):
+def setupLogger(fullpath=None, level=logging.INFO, queued=False, rate=0):
     FORMAT = ("%(asctime)s %(levelname)s %(module)s %(funcName)s "
               "[line:%(lineno)d] %(message)s")
     logging.basicConfig(filename=fullpath, format=FORMAT, level=level)
-    return logging.getLogger()
+    log = logging.getLogger()
+
+    # Write the log from a background thread, see log_utils.startLogQueue.
+    if queued:
+        startLogQueue(log, rate)
+
+    return log
 
 
 def validatePath(path, file=False, csv=False, dir=False, sqlite=False):
@@ -37,7 +57,7 @@ def validatePath(path, file=False, csv=False, dir=False, sqlite=False):
     elif sqlite:
         head, tail = os.path.split(path)
         result = validatePath(head, dir=True)
-    else:
+    elif not (file or dir):
         logging.getLogger().critical("Must set either file, csv, dir, or "
                                      "sqlite to True")
 
@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+#
+# forensics/bench/__main__.py
+#
+# by: Carl J. Nobile
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+#
+# python -m forensics.bench -o data/bench.json
+# python -m forensics.bench -s packet-parse,packet-filter -b data/bench.json
+#
+
+import sys
+import logging
+import argparse
+
+from forensics import setupLogger, validatePath
+from forensics.bench import BenchRunner, SCENARIO_MAP
+
+
+__version__ = '1.0.0'
+__version_info__ = tuple([ int(num) for num in __version__.split('.')])
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        prog='python -m forensics.bench',
+        description=("Forensics benchmarks, runs offline on generated "
+                     "data."))
+    parser.add_argument(
+        '-q', '--quite', action='store_false', dest='quite',
+        help="Turn off all console output except errors.")
+    parser.add_argument(
+        '-D', '--debug', action='store_true', dest='debug',
+        help="Turn on INFO logging of the benchmark progress.")
+    parser.add_argument(
+        '-L', '--list', action='store_true', default=False, dest='list',
+        help="List the scenarios and exit.")
+    parser.add_argument(
+        '-s', '--scenarios', type=str, default='', dest='scenarios',
+        help="Scenario(s) to run seperated with spaces or commas, all if "
+             "not set.")
+    parser.add_argument(
+        '-r', '--repeat', type=int, default=5, dest='repeat',
+        help="Timed runs of each scenario (default 5).")
+    parser.add_argument(
+        '-w', '--warmup', type=int, default=1, dest='warmup',
+        help="Untimed runs of each scenario before timing (default 1).")
+    parser.add_argument(
+        '--seed', type=int, default=0, dest='seed',
+        help="Seed of the data generators (default 0).")
+    parser.add_argument(
+        '--scale', type=float, default=1.0, dest='scale',
+        help="Multiplier of the generated data sizes (default 1.0).")
+    parser.add_argument(
+        '-W', '--work-path', type=str, default=None, dest='work_path',
+        help="Directory the data is generated in, default the system "
+             "temporary directory.")
+    parser.add_argument(
+        '-o', '--output', type=str, default='', dest='output',
+        help="Write the results as JSON to this file, it can be used as a "
+             "baseline later.")
+    parser.add_argument(
+        '-b', '--baseline', type=str, default='', dest='baseline',
+        help="Compare the results with a JSON file written by --output.")
+    parser.add_argument(
+        '-t', '--threshold', type=float, default=10.0, dest='threshold',
+        help="Percent change in the median time reported as faster or "
+             "slower, slower exits with 2 (default 10).")
+    options = parser.parse_args()
+
+    if options.list:
+        for name, Klass in SCENARIO_MAP.items():
+            print("{:<20} {}".format(name, Klass.description()))
+
+        sys.exit(0)
+
+    # Logging from the code under test would be part of the timings.
+    level = logging.INFO if options.debug else logging.WARNING
+    log = setupLogger(level=level)
+
+    if options.work_path and not validatePath(options.work_path, dir=True):
+        msg = "The work path seems to not exist, please check: {}".format(
+            options.work_path)
+        log.critical(msg)
+        sys.exit(1)
+
+    if options.baseline and not validatePath(options.baseline, file=True):
+        msg = "The baseline file seems to not exist, please check: {}".format(
+            options.baseline)
+        log.critical(msg)
+        sys.exit(1)
+
+    if options.repeat < 1:
+        msg = "The repeat count must be at least 1, found: {}".format(
+            options.repeat)
+        log.critical(msg)
+        sys.exit(1)
+
+    if options.warmup < 0:
+        msg = "The warmup count can not be negative, found: {}".format(
+            options.warmup)
+        log.critical(msg)
+        sys.exit(1)
+
+    names = [name.strip() for name in
+             options.scenarios.replace(' ', ',').split(',') if name.strip()]
+
+    try:
+        runner = BenchRunner(log, names, options.repeat, options.warmup,
+                             options.seed, options.scale, options.work_path)
+    except ValueError as e:
+        log.critical(str(e))
+        sys.exit(1)
+
+    results = runner.run()
+    comparison = None
+
+    if options.baseline:
+        baseline = BenchRunner.load(options.baseline)
+        mismatches = BenchRunner.mismatches(results, baseline)
+
+        if mismatches:
+            log.warning("The baseline was run with a different %s, the "
+                        "results may not be comparable.",
+                        ", ".join(mismatches))
+
+        comparison = BenchRunner.compare(results, baseline,
+                                         options.threshold / 100)
+
+    if options.quite:
+        BenchRunner.report(results, comparison)
+
+    if options.output:
+        BenchRunner.save(results, options.output)
+
+    if comparison and [item for item in comparison
+                       if item[4] == BenchRunner.SLOWER]:
+        sys.exit(2)
+
+    sys.exit(0)
@@ -0,0 +1,228 @@
+# -*- coding: utf-8 -*-
+#
+# forensics/bench/generators.py
+#
+# by: Carl J. Nobile
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+#
+from __future__ import absolute_import
+
+import os
+import math
+import random
+import socket
+import string
+import struct
+
+
+__version__ = '1.0.0'
+__version_info__ = tuple([ int(num) for num in __version__.split('.')])
+
+
+class TreeGenerator(object):
+    """
+    Writes a directory tree of random files. The same seed always gives the
+    same directories, file names, sizes and contents. File sizes are either
+    'fixed', 'uniform' between zero and twice 'size', or 'lognormal' with a
+    median of 'size', which is close to the mix found on real file systems.
+    """
+    FIXED = 'fixed'
+    UNIFORM = 'uniform'
+    LOGNORMAL = 'lognormal'
+    DISTRIBUTIONS = (FIXED, UNIFORM, LOGNORMAL)
+    _EXTENSIONS = ('txt', 'log', 'csv', 'bin', 'dat', 'jpg', 'pdf', '')
+
+    def __init__(self, seed=0, files=100, depth=3, fanout=4, size=4096,
+                 distribution=LOGNORMAL, sigma=1.5, maxSize=1 << 24):
+        self._seed = seed
+        self._files = files
+        self._depth = depth
+        self._fanout = fanout
+        self._size = size
+        self._distribution = distribution
+        self._sigma = sigma
+        self._maxSize = maxSize
+
+    def sizes(self):
+        rng = random.Random(self._seed)
+        size = self._size
+
+        if self._distribution == self.FIXED:
+            sizes = [size] * self._files
+        elif self._distribution == self.UNIFORM:
+            sizes = [rng.randint(0, 2 * size) for i in range(self._files)]
+        elif self._distribution == self.LOGNORMAL:
+            mu = math.log(max(size, 1))
+            sizes = [int(rng.lognormvariate(mu, self._sigma))
+                     for i in range(self._files)]
+        else:
+            raise ValueError("Invalid size distribution '{}', must be one "
+                             "of {}.".format(self._distribution,
+                                             self.DISTRIBUTIONS))
+
+        return [min(size, self._maxSize) for size in sizes]
+
+    def directories(self, root):
+        dirs = [root]
+        level = [root]
+
+        for depth in range(self._depth):
+            level = [os.path.join(path, "dir{:02d}".format(idx))
+                     for path in level for idx in range(self._fanout)]
+            dirs.extend(level)
+
+        return dirs
+
+    def create(self, root):
+        """
+        Create the tree under 'root' and return the number of files and
+        bytes written.
+        """
+        rng = random.Random(self._seed + 1)
+        dirs = self.directories(root)
+        total = 0
+
+        for path in dirs:
+            os.makedirs(path, exist_ok=True)
+
+        for idx, size in enumerate(self.sizes()):
+            ext = rng.choice(self._EXTENSIONS)
+            name = "file{:06d}{}".format(idx, ext and '.' + ext)
+
+            with open(os.path.join(rng.choice(dirs), name), 'wb') as f:
+                f.write(rng.randbytes(size))
+
+            total += size
+
+        return self._files, total
+
+
+class KeywordCorpus(object):
+    """
+    Builds a vocabulary of random words, keyword lists taken from it in the
+    formats read by search_utils.Keywords, and documents of words from the
+    vocabulary with the keywords mixed in at a given density.
+    """
+    SEPARATORS = (',', '|', '\n', '\t', '\r\n', ', ')
+
+    def __init__(self, seed=0, vocabulary=5000, minLength=3, maxLength=12):
+        self._seed = seed
+        rng = random.Random(seed)
+        words = set()
+
+        while len(words) < vocabulary:
+            words.add(''.join([rng.choice(string.ascii_lowercase)
+                               for i in range(rng.randint(minLength,
+                                                          maxLength))]))
+
+        self.words = sorted(words)
+
+    def keywords(self, count):
+        return random.Random(self._seed + 1).sample(self.words, count)
+
+    def keywordString(self, keywords):
+        rng = random.Random(self._seed + 2)
+        return ''.join([keyword + rng.choice(self.SEPARATORS)
+                        for keyword in keywords])
+
+    def document(self, words, keywords=(), density=0.01, seed=0):
+        rng = random.Random(self._seed + 3 + seed)
+        result = []
+
+        for i in range(words):
+            if keywords and rng.random() < density:
+                result.append(rng.choice(keywords))
+            else:
+                result.append(rng.choice(self.words))
+
+            result.append('\n' if rng.random() < 0.1 else ' ')
+
+        return ''.join(result)
+
+    def create(self, root, files, words, keywords=(), density=0.01):
+        """
+        Write 'files' documents under 'root' and return the number of bytes
+        written.
+        """
+        os.makedirs(root, exist_ok=True)
+        total = 0
+
+        for idx in range(files):
+            data = self.document(words, keywords, density, idx).encode(
+                'utf-8')
+
+            with open(os.path.join(root, "doc{:06d}.txt".format(idx)),
+                      'wb') as f:
+                f.write(data)
+
+            total += len(data)
+
+        return total
+
+
+class PacketGenerator(object):
+    """
+    Builds raw IPv4 packets, as received on a raw or packet socket, with a
+    weighted mix of protocols, a pool of addresses and ports and random
+    payload sizes. A share of the packets are non-first fragments.
+    """
+    TCP = socket.IPPROTO_TCP
+    UDP = socket.IPPROTO_UDP
+    ICMP = socket.IPPROTO_ICMP
+    MIX = ((TCP, 70), (UDP, 25), (ICMP, 5))
+    PORTS = (22, 53, 80, 123, 443, 8000, 8080)
+    _IP = struct.Struct('!BBHHHBBH4s4s')
+    _TCP = struct.Struct('!HHLLBBHHH')
+    _UDP = struct.Struct('!HHHH')
+    _ICMP = struct.Struct('!BBHHH')
+
+    def __init__(self, seed=0, mix=MIX, addresses=256, ports=PORTS,
+                 maxPayload=1400, fragments=0.01):
+        self._seed = seed
+        self._protocols = [protocol for protocol, weight in mix]
+        self._weights = [weight for protocol, weight in mix]
+        self.addresses = [socket.inet_ntoa(struct.pack('!L', 0x0a000001 + idx))
+                          for idx in range(addresses)]
+        self.ports = tuple(ports)
+        self._maxPayload = maxPayload
+        self._fragments = fragments
+
+    def packets(self, count):
+        rng = random.Random(self._seed)
+        addresses = [socket.inet_aton(addr) for addr in self.addresses]
+        protocols = rng.choices(self._protocols, self._weights, k=count)
+        payload = bytes(self._maxPayload)
+        result = []
+
+        for protocol in protocols:
+            size = rng.randint(0, self._maxPayload)
+
+            if protocol == self.TCP:
+                transport = self._TCP.pack(
+                    rng.randint(1024, 65535), rng.choice(self.ports),
+                    rng.getrandbits(32), rng.getrandbits(32), 5 << 4,
+                    rng.choice((0x02, 0x10, 0x18, 0x11, 0x04)), 65535, 0, 0)
+            elif protocol == self.UDP:
+                transport = self._UDP.pack(
+                    rng.randint(1024, 65535), rng.choice(self.ports),
+                    self._UDP.size + size, 0)
+            else:
+                transport = self._ICMP.pack(8, 0, 0, rng.getrandbits(16),
+                                            rng.getrandbits(16))
+
+            data = transport + payload[:size]
+            fragment = (rng.randint(1, 0x1fff)
+                        if rng.random() < self._fragments else 0x4000)
+            result.append(self._IP.pack(
+                0x45, 0, self._IP.size + len(data), rng.getrandbits(16),
+                fragment, 64, protocol, 0, rng.choice(addresses),
+                rng.choice(addresses)) + data)
+
+        return result
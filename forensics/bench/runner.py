@@ -0,0 +1,192 @@
+# -*- coding: utf-8 -*-
+#
+# forensics/bench/runner.py
+#
+# by: Carl J. Nobile
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+#
+from __future__ import absolute_import
+
+import gc
+import sys
+import json
+import time
+import shutil
+import datetime
+import platform
+import tempfile
+import statistics
+
+from .scenarios import SCENARIO_MAP
+
+
+__version__ = '1.0.0'
+__version_info__ = tuple([ int(num) for num in __version__.split('.')])
+
+
+class BenchRunner(object):
+    """
+    Runs the named scenarios, each in its own work directory, 'warmup'
+    untimed times and then 'repeat' timed times. The median time is used
+    for the rate and for comparisons as it is the least affected by noise.
+    """
+    FORMAT = 1
+    FASTER = 'faster'
+    SLOWER = 'slower'
+    SAME = 'same'
+    NEW = 'new'
+
+    def __init__(self, log, names=None, repeat=5, warmup=1, seed=0,
+                 scale=1.0, workdir=None):
+        self._log = log
+        self._names = names or list(SCENARIO_MAP)
+        self._repeat = repeat
+        self._warmup = warmup
+        self._seed = seed
+        self._scale = scale
+        self._workdir = workdir
+
+        if repeat < 1 or warmup < 0:
+            raise ValueError("Invalid repeat {} or warmup {}, the repeat "
+                             "must be at least 1 and the warmup at least "
+                             "0.".format(repeat, warmup))
+
+        for name in self._names:
+            if name not in SCENARIO_MAP:
+                raise ValueError("Invalid scenario '{}', must be one of "
+                                 "{}.".format(name, list(SCENARIO_MAP)))
+
+    def run(self):
+        results = {
+            'format': self.FORMAT,
+            'created': datetime.datetime.now(
+                datetime.timezone.utc).isoformat(),
+            'python': platform.python_version(),
+            'implementation': platform.python_implementation(),
+            'platform': platform.platform(),
+            'seed': self._seed,
+            'scale': self._scale,
+            'repeat': self._repeat,
+            'scenarios': {},
+            }
+
+        for name in self._names:
+            results['scenarios'][name] = self._runScenario(name)
+
+        return results
+
+    def _runScenario(self, name):
+        scenario = SCENARIO_MAP[name](self._log, self._seed, self._scale)
+        workdir = tempfile.mkdtemp(prefix="bench-{}-".format(name),
+                                   dir=self._workdir)
+        times = []
+
+        try:
+            self._log.info("Setting up scenario %s in %s.", name, workdir)
+            scenario.setup(workdir)
+
+            for idx in range(self._warmup + self._repeat):
+                gc.collect()
+                start = time.perf_counter()
+                ops = scenario.run()
+                elapsed = time.perf_counter() - start
+
+                if idx >= self._warmup:
+                    times.append(elapsed)
+
+            scenario.teardown()
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+        median = statistics.median(times)
+        result = {
+            'ops': ops,
+            'times': times,
+            'min': min(times),
+            'median': median,
+            'mean': statistics.mean(times),
+            'stdev': statistics.stdev(times) if len(times) > 1 else 0.0,
+            'ops_per_second': ops / median if median else 0.0,
+            }
+        self._log.info("Scenario %s: %s ops, median %.6f seconds.", name,
+                       ops, median)
+        return result
+
+    @classmethod
+    def compare(self, results, baseline, threshold=0.1):
+        """
+        Compare the median times in 'results' with 'baseline', returns a
+        list of (name, baseline median, median, change, status) where the
+        change is the relative difference and status is one of FASTER,
+        SLOWER, SAME, or NEW. Scenarios only in the baseline are ignored.
+        """
+        comparison = []
+
+        for name, result in results['scenarios'].items():
+            base = baseline['scenarios'].get(name)
+
+            if base is None:
+                comparison.append((name, None, result['median'], None,
+                                   self.NEW))
+                continue
+
+            change = (result['median'] - base['median']) / base['median']
+
+            if change > threshold:
+                status = self.SLOWER
+            elif change < -threshold:
+                status = self.FASTER
+            else:
+                status = self.SAME
+
+            comparison.append((name, base['median'], result['median'],
+                               change, status))
+
+        return comparison
+
+    @classmethod
+    def mismatches(self, results, baseline):
+        """
+        Returns the settings that differ between the results and baseline,
+        results are only comparable when they are the same.
+        """
+        return [key for key in ('seed', 'scale', 'python', 'implementation')
+                if results.get(key) != baseline.get(key)]
+
+    @classmethod
+    def load(self, path):
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    @classmethod
+    def save(self, results, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+            f.write("\n")
+
+    @classmethod
+    def report(self, results, comparison=None, stream=sys.stdout):
+        changes = dict([(item[0], item) for item in comparison or ()])
+        stream.write("{:<20} {:>10} {:>12} {:>12} {:>14}{}\n".format(
+            'Scenario', 'Ops', 'Median (s)', 'Stdev (s)', 'Ops/second',
+            '  Change' if comparison else ''))
+
+        for name, result in results['scenarios'].items():
+            change = ''
+
+            if name in changes:
+                item = changes[name]
+                change = ("  {:+.1%} {}".format(item[3], item[4])
+                          if item[3] is not None else "  " + item[4])
+
+            stream.write("{:<20} {:>10} {:>12.6f} {:>12.6f} {:>14.1f}{}\n"
+                         .format(name, result['ops'], result['median'],
+                                 result['stdev'], result['ops_per_second'],
+                                 change))
@@ -0,0 +1,267 @@
+# -*- coding: utf-8 -*-
+#
+# forensics/bench/scenarios.py
+#
+# by: Carl J. Nobile
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+#
+from __future__ import absolute_import
+
+import os
+import argparse
+from collections import OrderedDict
+
+from ..walker_utils import WalkerUtilities
+from ..search_utils import Keywords, SearchUtilities
+from ..network import IPContainer, PacketFilter
+from .generators import TreeGenerator, KeywordCorpus, PacketGenerator
+
+
+__version__ = '1.0.0'
+__version_info__ = tuple([ int(num) for num in __version__.split('.')])
+
+
+class Scenario(object):
+    """
+    A named benchmark. 'setup' builds the inputs in a work directory and is
+    not timed, 'run' is timed and returns the number of operations done so
+    the results can be given as a rate. 'scale' multiplies the input sizes.
+    """
+    SCENARIO_MAP = OrderedDict()
+
+    def __init__(self, log, seed=0, scale=1.0):
+        self._log = log
+        self._seed = seed
+        self._scale = scale
+
+    def _scaled(self, count):
+        return max(1, int(count * self._scale))
+
+    def setup(self, workdir):
+        pass
+
+    def run(self):
+        raise NotImplementedError("Must implement the 'run' method.")
+
+    def teardown(self):
+        pass
+
+    @classmethod
+    def register(self, Klass):
+        """
+        Class decorator that adds a scenario to SCENARIO_MAP by its name.
+        """
+        self.SCENARIO_MAP[Klass.name()] = Klass
+        return Klass
+
+    @classmethod
+    def name(self):
+        raise NotImplementedError("Must implement the 'name' method.")
+
+    @classmethod
+    def description(self):
+        return (self.__doc__ or '').strip()
+
+
+class WalkerScenario(Scenario):
+    _FILES = 0
+    _SIZE = 0
+    _DISTRIBUTION = TreeGenerator.LOGNORMAL
+    _HASH = 'md5'
+
+    def setup(self, workdir):
+        self._workdir = workdir
+        dirPath = os.path.join(workdir, 'tree')
+        files, size = TreeGenerator(
+            self._seed, self._scaled(self._FILES), size=self._SIZE,
+            distribution=self._DISTRIBUTION).create(dirPath)
+        self._log.info("Created %s files, %s bytes in %s.", files, size,
+                       dirPath)
+        self._options = argparse.Namespace(
+            noop=False, dir_path=dirPath,
+            report_path=os.path.join(workdir, 'report.csv'),
+            md5=self._HASH == 'md5', sha256=self._HASH == 'sha256',
+            sha512=self._HASH == 'sha512', executor='inline', workers=1,
+            queue_size=1000, timing=False)
+
+    def run(self):
+        return WalkerUtilities(self._log, self._options).walkPath()
+
+
+@Scenario.register
+class WalkerSmallFiles(WalkerScenario):
+    """
+    Walk and MD5 hash a deep tree of mostly small files.
+    """
+    _FILES = 2000
+    _SIZE = 2048
+
+    @classmethod
+    def name(self):
+        return 'walker-small-files'
+
+
+@Scenario.register
+class WalkerLargeFiles(WalkerScenario):
+    """
+    Walk and SHA256 hash a tree of large files.
+    """
+    _FILES = 40
+    _SIZE = 1 << 20
+    _DISTRIBUTION = TreeGenerator.UNIFORM
+    _HASH = 'sha256'
+
+    @classmethod
+    def name(self):
+        return 'walker-large-files'
+
+
+@Scenario.register
+class KeywordsString(Scenario):
+    """
+    Split and de-duplicate a large keyword string.
+    """
+    _KEYWORDS = 20000
+
+    def setup(self, workdir):
+        corpus = KeywordCorpus(self._seed, self._scaled(self._KEYWORDS))
+        keywords = corpus.keywords(self._scaled(self._KEYWORDS))
+        # Every keyword twice so de-duplication is exercised.
+        self._string = corpus.keywordString(keywords + keywords)
+        self._keywords = Keywords(self._log)
+
+    def run(self):
+        return len(self._keywords.fromString(self._string))
+
+    @classmethod
+    def name(self):
+        return 'keywords-string'
+
+
+@Scenario.register
+class KeywordsFile(KeywordsString):
+    """
+    Read, split and de-duplicate a large keyword file.
+    """
+
+    def setup(self, workdir):
+        super(KeywordsFile, self).setup(workdir)
+        self._path = os.path.join(workdir, 'keywords.txt')
+
+        with open(self._path, 'w', encoding='utf-8') as f:
+            f.write(self._string)
+
+    def run(self):
+        return len(self._keywords.fromFile(self._path))
+
+    @classmethod
+    def name(self):
+        return 'keywords-file'
+
+
+@Scenario.register
+class SearchDocuments(Scenario):
+    """
+    Search a tree of documents for keywords and probable words.
+    """
+    _FILES = 40
+    _WORDS = 5000
+    _KEYWORDS = 200
+
+    def setup(self, workdir):
+        corpus = KeywordCorpus(self._seed)
+        keywords = corpus.keywords(self._KEYWORDS)
+        searchPath = os.path.join(workdir, 'docs')
+        size = corpus.create(searchPath, self._scaled(self._FILES),
+                             self._WORDS, keywords)
+        self._log.info("Created %s bytes of documents in %s.", size,
+                       searchPath)
+        keywordPath = os.path.join(workdir, 'keywords.txt')
+        matrixPath = os.path.join(workdir, 'matrix.txt')
+
+        with open(keywordPath, 'w', encoding='utf-8') as f:
+            f.write(corpus.keywordString(keywords))
+
+        # The pairs of the first tenth of the vocabulary, so only some of
+        # the words are probable.
+        with open(matrixPath, 'w', encoding='utf-8') as f:
+            f.write(" ".join(sorted(set([
+                word[idx:idx+2] for word in corpus.words[::10]
+                for idx in range(len(word) - 1)]))))
+
+        self._options = argparse.Namespace(
+            noop=False, search_path=searchPath, keyword_path=keywordPath,
+            matrix_path=matrixPath,
+            report_path=os.path.join(workdir, 'report.csv'), weight=0.9,
+            executor='inline', workers=1, queue_size=1000, timing=False)
+
+    def run(self):
+        return SearchUtilities(self._log, self._options).start()
+
+    @classmethod
+    def name(self):
+        return 'search-documents'
+
+
+class PacketScenario(Scenario):
+    _PACKETS = 100000
+
+    def setup(self, workdir):
+        self._generator = PacketGenerator(self._seed)
+        self._packets = self._generator.packets(
+            self._scaled(self._PACKETS))
+
+
+@Scenario.register
+class PacketParse(PacketScenario):
+    """
+    Build the IP and protocol containers for a mixed packet stream.
+    """
+
+    def run(self):
+        log = self._log
+        classMap = IPContainer.PROTOCOL_CLASS_MAP
+
+        for packet in self._packets:
+            ipCont = IPContainer(log, packet)
+            classMap[ipCont.protocol](log, ipCont.data)
+
+        return len(self._packets)
+
+    @classmethod
+    def name(self):
+        return 'packet-parse'
+
+
+@Scenario.register
+class PacketFilterScenario(PacketScenario):
+    """
+    Pre-filter a mixed packet stream on protocol, address and port.
+    """
+
+    def setup(self, workdir):
+        super(PacketFilterScenario, self).setup(workdir)
+        self._filter = PacketFilter(
+            ('TCP', 'UDP'), self._generator.addresses[::4], (80, 443))
+
+    def run(self):
+        reject = self._filter.reject
+
+        for packet in self._packets:
+            reject(packet)
+
+        return len(self._packets)
+
+    @classmethod
+    def name(self):
+        return 'packet-filter'
+
+
+SCENARIO_MAP = Scenario.SCENARIO_MAP
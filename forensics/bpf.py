@@ -0,0 +1,187 @@
+# -*- coding: utf-8 -*-
+#
+# forensics/bpf.py
+#
+# by: Carl J. Nobile
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+#
+from __future__ import absolute_import
+
+import sys
+import ctypes
+import socket
+
+from .network import IPContainer
+
+
+__version__ = '1.0.0'
+__version_info__ = tuple([ int(num) for num in __version__.split('.')])
+
+
+class SockFilter(ctypes.Structure):
+    _fields_ = [('code', ctypes.c_ushort), ('jt', ctypes.c_ubyte),
+                ('jf', ctypes.c_ubyte), ('k', ctypes.c_uint32)]
+
+
+class SockFprog(ctypes.Structure):
+    _fields_ = [('len', ctypes.c_ushort),
+                ('filter', ctypes.POINTER(SockFilter))]
+
+
+class BPFFilter(object):
+    """
+    Compiles the criteria of a PacketFilter into a classic BPF program and
+    attaches it to a socket so the kernel drops non-matching packets before
+    they are copied into user space. The program expects the buffer to
+    start at the IP header, which is the case for AF_INET raw sockets and
+    AF_PACKET datagram sockets. Set 'incomingOnly' on AF_PACKET sockets to
+    drop the copies of outgoing packets. Fragments and truncated packets
+    that match are passed on, the PacketFilter rejects and counts them.
+    """
+    SO_ATTACH_FILTER = 26
+    SO_DETACH_FILTER = 27
+    SNAP_LENGTH = 0x40000
+    SKF_AD_PKTTYPE = 0xfffff000 + 4 # Ancillary packet type load
+    PACKET_OUTGOING = 4
+    # Instruction classes, sizes and modes.
+    LD_W_ABS = 0x20
+    LD_H_ABS = 0x28
+    LD_B_ABS = 0x30
+    LD_H_IND = 0x48
+    LDX_B_MSH = 0xb1
+    JMP_JEQ_K = 0x15
+    JMP_JSET_K = 0x45
+    RET_K = 0x06
+    _ACCEPT = 'accept'
+    _REJECT = 'reject'
+
+    def __init__(self, log, packetFilter, incomingOnly=False):
+        self._log = log
+        self._filter = packetFilter
+        self._incomingOnly = incomingOnly
+
+    def compile(self):
+        """
+        Returns the program as a list of (code, jt, jf, k) tuples.
+        """
+        program = []
+        flt = self._filter
+
+        # Packet sockets also see the packets this host sends.
+        if self._incomingOnly:
+            program.append((self.LD_W_ABS, 0, 0, self.SKF_AD_PKTTYPE))
+            program.append((self.JMP_JEQ_K, self._REJECT, 0,
+                            self.PACKET_OUTGOING))
+
+        if flt.protocols:
+            program.append((self.LD_B_ABS, 0, 0, 9))
+            self._matchAny(program, sorted(flt.protocols), 'address')
+
+        program.append('address')
+
+        if flt.addresses:
+            program.append((self.LD_W_ABS, 0, 0, 16))
+            self._matchAny(program, sorted(flt.addresses), 'port')
+
+        program.append('port')
+
+        if flt.ports:
+            # Only the first fragment of a TCP or UDP packet has ports.
+            program.append((self.LD_B_ABS, 0, 0, 9))
+            self._matchAny(program, (IPContainer.TCP, IPContainer.UDP),
+                           'fragment')
+            program.append('fragment')
+            program.append((self.LD_H_ABS, 0, 0, 6))
+            program.append((self.JMP_JSET_K, self._REJECT, 0, 0x1fff))
+            program.append((self.LDX_B_MSH, 0, 0, 0))
+            program.append((self.LD_H_IND, 0, 0, 2))
+            self._matchAny(program, sorted(flt.ports), self._ACCEPT)
+
+        program.append(self._ACCEPT)
+        program.append((self.RET_K, 0, 0, self.SNAP_LENGTH))
+        program.append(self._REJECT)
+        program.append((self.RET_K, 0, 0, 0))
+        return self._resolve(program)
+
+    def _matchAny(self, program, values, label):
+        last = len(values) - 1
+
+        for idx, value in enumerate(values):
+            program.append((self.JMP_JEQ_K, label,
+                            self._REJECT if idx == last else 0, value))
+
+    def _resolve(self, program):
+        labels = {}
+        insns = []
+
+        for item in program:
+            if isinstance(item, str):
+                labels[item] = len(insns)
+            else:
+                insns.append(item)
+
+        result = []
+
+        for idx, (code, jt, jf, k) in enumerate(insns):
+            jt, jf = [self._offset(labels, idx, jmp) for jmp in (jt, jf)]
+            result.append((code, jt, jf, k))
+
+        return result
+
+    def _offset(self, labels, idx, jmp):
+        if not isinstance(jmp, str):
+            return jmp
+
+        offset = labels[jmp] - idx - 1
+
+        if offset > 0xff:
+            raise ValueError("Too many filter values, BPF jump offset "
+                             "{} is out of range.".format(offset))
+
+        return offset
+
+    def attach(self, sock):
+        """
+        Attach the compiled program to the socket. A drop everything program
+        is attached first so packets queued before the filter was in place
+        can be drained without losing any that match.
+        """
+        if not sys.platform.startswith('linux'):
+            raise OSError("Kernel socket filters are only supported on "
+                          "Linux.")
+
+        program = self.compile()
+        self._log.debug("BPF program: %s", program)
+        self._setProgram(sock, [(self.RET_K, 0, 0, 0)])
+        self._drain(sock)
+        self._setProgram(sock, program)
+        return program
+
+    def _setProgram(self, sock, program):
+        insns = (SockFilter * len(program))(*program)
+        fprog = SockFprog(len(program), insns)
+        sock.setsockopt(socket.SOL_SOCKET, self.SO_ATTACH_FILTER,
+                        bytes(fprog))
+
+    def _drain(self, sock):
+        timeout = sock.gettimeout()
+        sock.setblocking(False)
+
+        try:
+            while True:
+                sock.recv(1)
+        except (BlockingIOError, InterruptedError):
+            pass
+        finally:
+            sock.settimeout(timeout)
+
+    @classmethod
+    def detach(self, sock):
+        sock.setsockopt(socket.SOL_SOCKET, self.SO_DETACH_FILTER, 0)
@@ -0,0 +1,245 @@
+# -*- coding: utf-8 -*-
+#
+# forensics/capture.py
+#
+# by: Carl J. Nobile
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+#
+from __future__ import absolute_import
+
+import os
+import sys
+import errno
+import socket
+import struct
+import ctypes
+import ctypes.util
+import threading
+
+
+__version__ = '1.0.0'
+__version_info__ = tuple([ int(num) for num in __version__.split('.')])
+
+
+class CaptureBase(object):
+    """
+    The 'packets' generator of all capture classes yields (timestamp,
+    packet) tuples. The timestamp is in epoch nanoseconds or None when the
+    packet was captured live and the time should be taken on receipt. Live
+    captures yield IDLE when no packet arrived within TICK seconds so the
+    caller can do periodic work and notice it has been asked to stop.
+    """
+    PACKET_SIZE = 65535
+    TICK = 1.0
+    IDLE = (None, None)
+    SOL_PACKET = 263
+    PACKET_STATISTICS = 6
+    SO_RCVBUFFORCE = 33
+
+    def __init__(self, log, sock):
+        self._log = log
+        self._sock = sock
+        self._kernelPackets = 0
+        self._kernelDrops = 0
+        self._kernelLock = threading.Lock()
+
+    def kernelStatistics(self):
+        """
+        Returns the (packets, drops) totals counted by the kernel or None
+        if the socket does not keep them, only Linux packet sockets do.
+        Reading the statistics resets them in the kernel so they are
+        accumulated here.
+        """
+        sock = self._sock
+
+        if (sock is None or
+            sock.family != getattr(socket, 'AF_PACKET', None)):
+            return None
+
+        with self._kernelLock:
+            if sock.fileno() != -1:
+                packets, drops = struct.unpack('II', sock.getsockopt(
+                    self.SOL_PACKET, self.PACKET_STATISTICS, 8))
+                self._kernelPackets += packets
+                self._kernelDrops += drops
+
+            return self._kernelPackets, self._kernelDrops
+
+    def setReceiveBuffer(self, size):
+        """
+        Sets the socket receive buffer to 'size' bytes so a burst of
+        packets is queued instead of dropped while the capture is busy.
+        On Linux the net.core.rmem_max limit is overridden when the process
+        has CAP_NET_ADMIN. Returns the size the kernel reports.
+        """
+        if size < 1:
+            raise ValueError("Invalid receive buffer size {}, must be at "
+                             "least 1.".format(size))
+
+        sock = self._sock
+
+        try:
+            if not sys.platform.startswith('linux'):
+                raise PermissionError()
+
+            sock.setsockopt(socket.SOL_SOCKET, self.SO_RCVBUFFORCE, size)
+        except PermissionError:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, size)
+
+        actual = sock.getsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF)
+
+        if actual < size:
+            self._log.warning("The receive buffer is %s bytes, %s were "
+                              "asked for.", actual, size)
+
+        return actual
+
+    def packets(self):
+        raise NotImplementedError("Must implement the 'packets' method.")
+
+    def close(self):
+        # The statistics may be read from another thread, e.g. by metrics.
+        with self._kernelLock:
+            self._sock.close()
+
+    @classmethod
+    def name(self):
+        raise NotImplementedError("Must implement the 'name' method.")
+
+
+class SocketCapture(CaptureBase):
+    """
+    Receives one packet per system call, this works on any platform.
+    """
+
+    def __init__(self, log, sock):
+        super(SocketCapture, self).__init__(log, sock)
+
+    def packets(self):
+        recv = self._sock.recv
+        size = self.PACKET_SIZE
+        self._sock.settimeout(self.TICK)
+
+        while True:
+            try:
+                yield None, recv(size)
+            except socket.timeout:
+                yield self.IDLE
+
+    @classmethod
+    def name(self):
+        return 'socket'
+
+
+class IOVec(ctypes.Structure):
+    _fields_ = [('iov_base', ctypes.c_void_p), ('iov_len', ctypes.c_size_t)]
+
+
+class MsgHdr(ctypes.Structure):
+    _fields_ = [('msg_name', ctypes.c_void_p),
+                ('msg_namelen', ctypes.c_uint32),
+                ('msg_iov', ctypes.POINTER(IOVec)),
+                ('msg_iovlen', ctypes.c_size_t),
+                ('msg_control', ctypes.c_void_p),
+                ('msg_controllen', ctypes.c_size_t),
+                ('msg_flags', ctypes.c_int)]
+
+
+class MMsgHdr(ctypes.Structure):
+    _fields_ = [('msg_hdr', MsgHdr), ('msg_len', ctypes.c_uint)]
+
+
+class BatchCapture(CaptureBase):
+    """
+    Receives up to 'batch' packets per system call with recvmmsg(2) into a
+    buffer pool that is allocated once. The packets are yielded as read
+    only memoryviews into the pool, so they are only valid until the next
+    packet is requested.
+    """
+    MSG_WAITFORONE = 0x10000
+    _recvmmsg = None
+
+    def __init__(self, log, sock, batch=64):
+        if batch < 1:
+            raise ValueError("Invalid batch size {}, must be at least "
+                             "1.".format(batch))
+
+        super(BatchCapture, self).__init__(log, sock)
+        self._batch = batch
+        size = self.PACKET_SIZE
+        self._pool = (ctypes.c_char * (size * batch))()
+        self._iovecs = (IOVec * batch)()
+        self._msgs = (MMsgHdr * batch)()
+        base = ctypes.addressof(self._pool)
+
+        for idx in range(batch):
+            self._iovecs[idx].iov_base = base + idx * size
+            self._iovecs[idx].iov_len = size
+            self._msgs[idx].msg_hdr.msg_iov = ctypes.pointer(
+                self._iovecs[idx])
+            self._msgs[idx].msg_hdr.msg_iovlen = 1
+
+        self._view = memoryview(self._pool).cast('B').toreadonly()
+
+    @classmethod
+    def available(self):
+        if self._recvmmsg is None and sys.platform.startswith('linux'):
+            libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+            func = getattr(libc, 'recvmmsg', None)
+
+            if func:
+                func.argtypes = (ctypes.c_int, ctypes.POINTER(MMsgHdr),
+                                 ctypes.c_uint, ctypes.c_int, ctypes.c_void_p)
+                func.restype = ctypes.c_int
+                self._recvmmsg = func
+
+        return self._recvmmsg is not None
+
+    def packets(self):
+        if not self.available():
+            raise OSError("recvmmsg is not available on this platform.")
+
+        recvmmsg = self._recvmmsg
+        fd = self._sock.fileno()
+        # A receive timeout makes recvmmsg return EAGAIN when idle.
+        sec = int(self.TICK)
+        self._sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVTIMEO,
+                              struct.pack('ll', sec,
+                                          int((self.TICK - sec) * 1000000)))
+        msgs = self._msgs
+        view = self._view
+        size = self.PACKET_SIZE
+
+        while True:
+            count = recvmmsg(fd, msgs, self._batch, self.MSG_WAITFORONE, None)
+
+            if count < 0:
+                err = ctypes.get_errno()
+
+                if err in (errno.EINTR, errno.EAGAIN):
+                    # Give the Python signal handlers a chance to run.
+                    yield self.IDLE
+                    continue
+
+                raise OSError(err, os.strerror(err))
+
+            self._log.debug("Received %s packets in one batch.", count)
+
+            for idx in range(count):
+                offset = idx * size
+                yield None, view[offset:offset + msgs[idx].msg_len]
+
+    @classmethod
+    def name(self):
+        return 'batch'
+
+
+CAPTURE_CLASS_MAP = {SocketCapture.name(): SocketCapture,
+                     BatchCapture.name(): BatchCapture}
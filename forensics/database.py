@@ -0,0 +1,629 @@
+# -*- coding: utf-8 -*-
+#
+# forensics/database.py
+#
+# by: Carl J. Nobile
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+#
+from __future__ import absolute_import
+
+import os
+import re
+import sys
+import pathlib
+import socket
+import struct
+import sqlite3
+import datetime
+import time
+
+from .network import IPContainer
+
+
+__version__ = '1.0.0'
+__version_info__ = tuple([ int(num) for num in __version__.split('.')])
+
+
+class MonitorDB(object):
+    """
+    SQLite storage for the IP monitor. Times are stored as integer epoch
+    nanoseconds, addresses as 32 bit integers and protocols as IP protocol
+    numbers. Packets are recorded with both addresses and the destination
+    port, the address criteria of the queries match the destination, the
+    same as the capture filter.
+
+    The schema version is kept in 'PRAGMA user_version', version 0 is the
+    original text based schema and version 1 recorded only the source
+    address of packets, both are migrated when the database is opened for
+    writing. A database opened read only is never changed, so an
+    older schema can be dumped but not queried. If given, 'observer' is
+    called with the table name, row count and seconds taken after each
+    batch is written.
+    """
+    VERSION = 2
+    _NS = 1000000000
+    _EPOCH = datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc)
+    _ADDRESS = struct.Struct('!L')
+    _SCHEMA = (
+        "CREATE TABLE IF NOT EXISTS monitor_ip "
+        "(time_ns integer NOT NULL, protocol integer NOT NULL, "
+        "src_addr integer NOT NULL, dst_addr integer, port integer)",
+        "CREATE INDEX IF NOT EXISTS monitor_ip_dst_time "
+        "ON monitor_ip (dst_addr, time_ns, protocol, src_addr, port)",
+        "CREATE INDEX IF NOT EXISTS monitor_ip_port_time "
+        "ON monitor_ip (port, time_ns, protocol, src_addr, dst_addr)",
+        "CREATE INDEX IF NOT EXISTS monitor_ip_time ON monitor_ip (time_ns)",
+        "CREATE TABLE IF NOT EXISTS monitor_flow "
+        "(protocol integer NOT NULL, src_addr integer NOT NULL, "
+        "dst_addr integer NOT NULL, src_port integer, dst_port integer, "
+        "first_ns integer NOT NULL, last_ns integer NOT NULL, "
+        "packets integer, bytes integer, tcp_flags integer)",
+        "CREATE INDEX IF NOT EXISTS monitor_flow_dst_time "
+        "ON monitor_flow (dst_addr, first_ns)",
+        "CREATE INDEX IF NOT EXISTS monitor_flow_port_time "
+        "ON monitor_flow (dst_port, first_ns)",
+        "CREATE INDEX IF NOT EXISTS monitor_flow_time "
+        "ON monitor_flow (first_ns)",
+        )
+    _V1_INDEXES = ('monitor_ip_address_time', 'monitor_ip_port_time',
+                   'monitor_ip_time', 'monitor_flow_src_time')
+    _MIGRATE_BATCH = 10000
+    FETCH_SIZE = 1000
+
+    def __init__(self, log, path, batchSize=1, commitInterval=1.0,
+                 observer=None):
+        self._log = log
+        self._path = path
+        self._conn = None
+        self._version = None
+        self._observer = observer
+        self._batchSize = batchSize
+        self._commitInterval = int(commitInterval * self._NS)
+        self._pending = []
+        self._lastCommit = 0
+        self._protocols = dict([(Klass.name(), number) for number, Klass
+                                in IPContainer.PROTOCOL_CLASS_MAP.items()])
+
+    def open(self, readOnly=False):
+        if readOnly:
+            uri = "{}?mode=ro".format(pathlib.Path(
+                os.path.abspath(self._path)).as_uri())
+            self._conn = sqlite3.connect(uri, uri=True)
+        else:
+            self._conn = sqlite3.connect(self._path)
+
+        version = self._conn.execute("PRAGMA user_version").fetchone()[0]
+
+        if version > self.VERSION:
+            raise ValueError("Database schema version {} is newer than the "
+                             "supported version {}.".format(
+                                 version, self.VERSION))
+
+        if version < self.VERSION and not readOnly:
+            with self._conn:
+                self._migrate(version)
+
+            version = self.VERSION
+
+        self._version = version
+        return self
+
+    def close(self):
+        if self._conn:
+            self.commit()
+            self._conn.close()
+            self._conn = None
+
+    @property
+    def connection(self):
+        return self._conn
+
+    #
+    # Conversion helpers
+    #
+    @classmethod
+    def addressToInt(self, address):
+        return self._ADDRESS.unpack(socket.inet_aton(address))[0]
+
+    @classmethod
+    def intToAddress(self, value):
+        return socket.inet_ntoa(self._ADDRESS.pack(value))
+
+    @classmethod
+    def toNanoseconds(self, value):
+        """
+        Convert a datetime, ISO 8601 string or epoch seconds float to epoch
+        nanoseconds, integers are assumed to already be nanoseconds. Naive
+        datetimes are taken to be UTC.
+        """
+        if value is None or isinstance(value, int):
+            return value
+
+        if isinstance(value, float):
+            return int(value * self._NS)
+
+        if isinstance(value, str):
+            value = datetime.datetime.fromisoformat(value)
+
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=datetime.timezone.utc)
+
+        delta = value - self._EPOCH
+        return ((delta.days * 86400 + delta.seconds) * self._NS
+                + delta.microseconds * 1000)
+
+    @classmethod
+    def toDatetime(self, value):
+        return self._EPOCH + datetime.timedelta(microseconds=value // 1000)
+
+    def protocolNumber(self, value):
+        return self._protocols.get(value, value)
+
+    def protocolName(self, number):
+        Klass = IPContainer.PROTOCOL_CLASS_MAP.get(number)
+        return Klass.name() if Klass else number
+
+    #
+    # Inserts
+    #
+    def insertPacket(self, timestamp, protocol, srcAddr, dstAddr, port):
+        """
+        Packets are written in batches of 'batchSize' rows, or sooner if
+        'commitInterval' seconds have passed since the last commit.
+        """
+        self._pending.append((timestamp, protocol, self.addressToInt(srcAddr),
+                              self.addressToInt(dstAddr), port))
+
+        if (len(self._pending) >= self._batchSize
+            or timestamp - self._lastCommit >= self._commitInterval):
+            self.commit(timestamp)
+
+    def commit(self, timestamp=None):
+        if self._pending:
+            start = time.monotonic()
+            self._conn.executemany(
+                "INSERT INTO monitor_ip VALUES (?,?,?,?,?)", self._pending)
+            self._conn.commit()
+
+            if self._observer:
+                self._observer('monitor_ip', len(self._pending),
+                               time.monotonic() - start)
+
+            self._pending = []
+
+        if timestamp is not None:
+            self._lastCommit = timestamp
+
+    @property
+    def pendingRows(self):
+        return len(self._pending)
+
+    def insertFlows(self, flows):
+        """
+        Insert (protocol, src, dst, sport, dport, first, last, packets,
+        bytes, flags) tuples, the addresses are in dotted quad notation.
+        """
+        toInt = self.addressToInt
+        start = time.monotonic()
+        self._conn.executemany(
+            "INSERT INTO monitor_flow VALUES (?,?,?,?,?,?,?,?,?,?)",
+            [(flow[0], toInt(flow[1]), toInt(flow[2])) + tuple(flow[3:])
+             for flow in flows])
+        self._conn.commit()
+
+        if self._observer:
+            self._observer('monitor_flow', len(flows),
+                           time.monotonic() - start)
+
+    #
+    # Queries
+    #
+    def hits(self, address=None, port=None, protocol=None, start=None,
+             end=None):
+        """
+        Yields (time_ns, protocol, src_addr, dst_addr, port) rows matching
+        all of the given criteria, 'start' is inclusive and 'end' exclusive.
+        The address matches the destination, it is None on rows migrated
+        from versions 0 and 1 which only recorded the source. The address,
+        port
+        and protocol can each be a single value or a list.
+        """
+        where, params = self._where('dst_addr', 'port', 'time_ns', address,
+                                    port, protocol, start, end)
+        sql = ("SELECT time_ns, protocol, src_addr, dst_addr, port "
+               "FROM monitor_ip{} ORDER BY time_ns".format(where))
+
+        for row in self._fetch(sql, params):
+            yield (row[0], self.protocolName(row[1]),
+                   self.intToAddress(row[2]),
+                   None if row[3] is None else self.intToAddress(row[3]),
+                   row[4])
+
+    def flows(self, address=None, port=None, protocol=None, start=None,
+              end=None):
+        """
+        Yields the flows matching all of the given criteria, the address
+        and port match the destination.
+        """
+        where, params = self._where('dst_addr', 'dst_port', 'first_ns',
+                                    address, port, protocol, start, end)
+        sql = ("SELECT protocol, src_addr, dst_addr, src_port, dst_port, "
+               "first_ns, last_ns, packets, bytes, tcp_flags "
+               "FROM monitor_flow{} ORDER BY first_ns".format(where))
+
+        for row in self._fetch(sql, params):
+            yield ((self.protocolName(row[0]), self.intToAddress(row[1]),
+                    self.intToAddress(row[2])) + row[3:])
+
+    def _fetch(self, sql, params):
+        if self._version < self.VERSION:
+            raise ValueError("Database {} has schema version {}, it must be "
+                             "opened for writing to be migrated before it "
+                             "can be queried.".format(self._path,
+                                                      self._version))
+
+        # Only FETCH_SIZE rows are held in memory at a time.
+        self.commit()
+        cursor = self._conn.execute(sql, params)
+
+        try:
+            while True:
+                rows = cursor.fetchmany(self.FETCH_SIZE)
+
+                if not rows:
+                    break
+
+                for row in rows:
+                    yield row
+        finally:
+            cursor.close()
+
+    def _where(self, addrCol, portCol, timeCol, address, port, protocol,
+               start, end):
+        clauses = []
+        params = []
+
+        for column, values, convert in (
+            (addrCol, address, self.addressToInt),
+            (portCol, port, int),
+            ('protocol', protocol, self.protocolNumber)):
+            if values is None or values == '':
+                continue
+
+            if not isinstance(values, (list, tuple, set, frozenset)):
+                values = (values,)
+
+            if values:
+                clauses.append("{} IN ({})".format(
+                    column, ",".join("?" * len(values))))
+                params.extend([convert(value) for value in values])
+
+        for op, value in (('>=', start), ('<', end)):
+            if value is not None:
+                clauses.append("{} {} ?".format(timeCol, op))
+                params.append(self.toNanoseconds(value))
+
+        where = " WHERE " + " AND ".join(clauses) if clauses else ""
+        return where, params
+
+    def dump(self, stream=sys.stdout):
+        for record in self._conn.iterdump():
+            stream.write("{}\n".format(record))
+
+    #
+    # Schema migration
+    #
+    def _migrate(self, version):
+        cursor = self._conn.cursor()
+        # Make the table changes part of the same transaction as the data.
+        cursor.execute("BEGIN")
+        tables = [row[0] for row in cursor.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table'")]
+        legacy = []
+
+        if version == 0:
+            for table in ('monitor_ip', 'monitor_flow'):
+                if table in tables:
+                    cursor.execute("ALTER TABLE {0} RENAME TO {0}_v0".format(
+                        table))
+                    legacy.append(table)
+        elif version == 1:
+            # The indexes keep their names when the table is renamed.
+            for index in self._V1_INDEXES:
+                cursor.execute("DROP INDEX IF EXISTS {}".format(index))
+
+            if 'monitor_ip' in tables:
+                cursor.execute(
+                    "ALTER TABLE monitor_ip RENAME TO monitor_ip_v1")
+
+        for sql in self._SCHEMA:
+            cursor.execute(sql)
+
+        if version == 1 and 'monitor_ip' in tables:
+            # Version 1 only recorded the source address.
+            cursor.execute("INSERT INTO monitor_ip SELECT time_ns, protocol, "
+                           "address, NULL, port FROM monitor_ip_v1")
+            cursor.execute("DROP TABLE monitor_ip_v1")
+
+        if 'monitor_ip' in legacy:
+            self._copy(cursor, "SELECT protocol, address, port, datetime "
+                       "FROM monitor_ip_v0", self._migrateHit,
+                       "INSERT INTO monitor_ip VALUES (?,?,?,?,?)")
+
+        if 'monitor_flow' in legacy:
+            self._copy(cursor, "SELECT * FROM monitor_flow_v0",
+                       self._migrateFlow, "INSERT INTO monitor_flow "
+                       "VALUES (?,?,?,?,?,?,?,?,?,?)")
+
+        for table in legacy:
+            cursor.execute("DROP TABLE {}_v0".format(table))
+
+        cursor.execute("PRAGMA user_version = {}".format(self.VERSION))
+        self._log.info("Migrated database %s from schema version %s to %s.",
+                       self._path, version, self.VERSION)
+
+    def _copy(self, cursor, select, convert, insert):
+        source = self._conn.cursor()
+        source.execute(select)
+
+        while True:
+            rows = source.fetchmany(self._MIGRATE_BATCH)
+
+            if not rows:
+                break
+
+            cursor.executemany(insert, [convert(row) for row in rows])
+
+    def _migrateHit(self, row):
+        # Version 0 only recorded the source address.
+        protocol, address, port, dtime = row
+        return (self.toNanoseconds(dtime), self.protocolNumber(protocol),
+                self.addressToInt(address), None, port)
+
+    def _migrateFlow(self, row):
+        return ((self.protocolNumber(row[0]), self.addressToInt(row[1]),
+                 self.addressToInt(row[2]), row[3], row[4],
+                 self.toNanoseconds(row[5]), self.toNanoseconds(row[6]))
+                + tuple(row[7:]))
+
+
+class PartitionedMonitorDB(object):
+    """
+    Splits the monitor data over one SQLite file per hour or day, named
+    after the base path, e.g. 'monitor_ip-20240131.db' or, when a size cap
+    forces a new file within the same period, 'monitor_ip-20240131-1.db'.
+    Rows are routed to the partition that covers their time, partitions
+    older than the retention period are deleted on rotation and late rows
+    that would fall in them are dropped, and queries
+    only open the partitions that overlap the requested time range, read
+    only. It has the same interface as MonitorDB.
+    """
+    HOURLY = 'hourly'
+    DAILY = 'daily'
+    _NS = MonitorDB._NS
+    _PERIODS = {HOURLY: 3600, DAILY: 86400}
+    _FORMATS = {HOURLY: '%Y%m%d%H', DAILY: '%Y%m%d'}
+    _SIZE_CHECK = 1000 # Rows between file size checks
+
+    def __init__(self, log, path, rotate=DAILY, maxSize=None,
+                 retention=None, batchSize=1, commitInterval=1.0,
+                 observer=None):
+        self._log = log
+        self._observer = observer
+        self._batchSize = batchSize
+        self._commitInterval = commitInterval
+        self._dir, tail = os.path.split(os.path.abspath(path))
+        self._root, self._ext = os.path.splitext(tail)
+        self._rotate = rotate
+        self._period = self._PERIODS[rotate] * self._NS
+        self._maxSize = maxSize
+        self._retention = retention
+        pattern = r"^{}-(\d{{8}}|\d{{10}})(?:-(\d+))?{}$".format(
+            re.escape(self._root), re.escape(self._ext))
+        self._regex = re.compile(pattern)
+        self._db = None
+        self._key = None
+        self._newest = None
+        self._seq = 0
+        self._rows = 0
+        self.expiredRows = 0
+
+    def open(self, readOnly=False):
+        return self
+
+    def close(self):
+        if self._db:
+            self._db.close()
+            self._db = None
+            self._key = None
+
+    def commit(self, timestamp=None):
+        if self._db:
+            self._db.commit(timestamp)
+
+    @property
+    def pendingRows(self):
+        return self._db.pendingRows if self._db else 0
+
+    #
+    # Partition handling
+    #
+    def partitions(self, start=None, end=None):
+        """
+        Returns a sorted list of (start_ns, end_ns, sequence, path) for the
+        partitions that overlap the 'start' (inclusive) to 'end'
+        (exclusive) time range.
+        """
+        start = MonitorDB.toNanoseconds(start)
+        end = MonitorDB.toNanoseconds(end)
+        result = []
+
+        for name in os.listdir(self._dir):
+            match = self._regex.match(name)
+
+            if not match:
+                continue
+
+            stamp, seq = match.groups()
+            rotate = self.DAILY if len(stamp) == 8 else self.HOURLY
+            first = MonitorDB.toNanoseconds(datetime.datetime.strptime(
+                stamp, self._FORMATS[rotate]))
+            last = first + self._PERIODS[rotate] * self._NS
+
+            if ((start is None or last > start) and
+                (end is None or first < end)):
+                result.append((first, last, int(seq or 0),
+                               os.path.join(self._dir, name)))
+
+        result.sort()
+        return result
+
+    def _path(self, key, seq):
+        stamp = MonitorDB.toDatetime(key * self._period).strftime(
+            self._FORMATS[self._rotate])
+        name = "{}-{}{}{}".format(self._root, stamp,
+                                  "-{}".format(seq) if seq else "", self._ext)
+        return os.path.join(self._dir, name)
+
+    def _lastSequence(self, key):
+        first = key * self._period
+        seqs = [seq for start, end, seq, path
+                in self.partitions(first, first + self._period)
+                if start == first and end == first + self._period]
+        return max(seqs) if seqs else 0
+
+    def _partitionFor(self, key):
+        if key != self._key:
+            self.close()
+            self._key = key
+            self._seq = self._lastSequence(key)
+            self._open()
+            self._prune(key)
+        elif self._maxSize and self._rows >= self._SIZE_CHECK:
+            self._rows = 0
+
+            if os.path.getsize(self._path(key, self._seq)) >= self._maxSize:
+                self._db.close()
+                self._seq += 1
+                self._open()
+
+        return self._db
+
+    def _open(self):
+        path = self._path(self._key, self._seq)
+        self._log.info("Opening database partition %s.", path)
+        self._db = MonitorDB(self._log, path, self._batchSize,
+                             self._commitInterval, self._observer).open()
+        self._rows = 0
+
+    def _cutoff(self, key):
+        return key * self._period - self._retention * self._NS
+
+    def _expired(self, key):
+        """
+        Returns True if the partition 'key' ends before the retention
+        cutoff of the newest partition, so it was, or would be, removed.
+        """
+        if not self._retention:
+            return False
+
+        if self._newest is None:
+            existing = self.partitions()
+            self._newest = existing[-1][0] // self._period if existing else key
+
+        self._newest = max(self._newest, key)
+        return (key + 1) * self._period <= self._cutoff(self._newest)
+
+    def _dropExpired(self, rows):
+        self.expiredRows += rows
+        self._log.warning("Dropped %s row(s) older than the retention "
+                          "period, %s in total.", rows, self.expiredRows)
+
+    def _prune(self, key):
+        if not self._retention:
+            return
+
+        cutoff = self._cutoff(key)
+
+        for start, end, seq, path in self.partitions(end=cutoff):
+            if end <= cutoff:
+                self._log.info("Removing expired database partition %s.",
+                               path)
+                os.remove(path)
+
+    #
+    # Inserts
+    #
+    def insertPacket(self, timestamp, protocol, srcAddr, dstAddr, port):
+        key = timestamp // self._period
+
+        if self._expired(key):
+            self._dropExpired(1)
+            return
+
+        db = self._partitionFor(key)
+        db.insertPacket(timestamp, protocol, srcAddr, dstAddr, port)
+        self._rows += 1
+
+    def insertFlows(self, flows):
+        groups = {}
+
+        for flow in flows:
+            groups.setdefault(flow[5] // self._period, []).append(flow)
+
+        # Newest first, so the retention cutoff is known for the older.
+        for key in sorted(groups, reverse=True):
+            if self._expired(key):
+                self._dropExpired(len(groups[key]))
+            elif self._key is None or key >= self._key:
+                self._partitionFor(key).insertFlows(groups[key])
+                self._rows += len(groups[key])
+            else:
+                # Flows that started in an earlier partition.
+                db = MonitorDB(self._log, self._path(
+                    key, self._lastSequence(key)),
+                    observer=self._observer).open()
+
+                try:
+                    db.insertFlows(groups[key])
+                finally:
+                    db.close()
+
+    #
+    # Queries
+    #
+    def hits(self, address=None, port=None, protocol=None, start=None,
+             end=None):
+        return self._fanOut('hits', address, port, protocol, start, end)
+
+    def flows(self, address=None, port=None, protocol=None, start=None,
+              end=None):
+        return self._fanOut('flows', address, port, protocol, start, end)
+
+    def _fanOut(self, method, address, port, protocol, start, end):
+        for first, last, seq, path in self.partitions(start, end):
+            db = MonitorDB(self._log, path).open(readOnly=True)
+
+            try:
+                for row in getattr(db, method)(address, port, protocol,
+                                               start, end):
+                    yield row
+            finally:
+                db.close()
+
+    def dump(self, stream=sys.stdout):
+        for first, last, seq, path in self.partitions():
+            stream.write("-- Partition: {}\n".format(path))
+            db = MonitorDB(self._log, path).open(readOnly=True)
+
+            try:
+                db.dump(stream)
+            finally:
+                db.close()
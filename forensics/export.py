@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+#
+# forensics/export.py
+#
+# by: Carl J. Nobile
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+#
+from __future__ import absolute_import
+
+import csv
+import json
+
+from .database import MonitorDB
+
+
+__version__ = '1.0.0'
+__version_info__ = tuple([ int(num) for num in __version__.split('.')])
+
+
+class MonitorExport(object):
+    """
+    Streams rows from a MonitorDB or PartitionedMonitorDB to CSV or JSON
+    Lines. The criteria are passed on to the database query so they are
+    evaluated by SQLite, and rows are written as they are fetched so memory
+    use does not grow with the size of the database.
+    """
+    CSV = 'csv'
+    JSONL = 'jsonl'
+    PACKETS = 'packets'
+    FLOWS = 'flows'
+    HEADERS = {
+        PACKETS: ('time', 'protocol', 'src_addr', 'dst_addr', 'port'),
+        FLOWS: ('protocol', 'src_addr', 'dst_addr', 'src_port', 'dst_port',
+                'first_seen', 'last_seen', 'packets', 'bytes', 'tcp_flags'),
+        }
+    # The column positions of nanosecond times converted to ISO 8601.
+    _TIME_COLUMNS = {PACKETS: (0,), FLOWS: (5, 6)}
+    _QUERY_MAP = {PACKETS: 'hits', FLOWS: 'flows'}
+
+    def __init__(self, log, db, fmt=CSV, table=PACKETS):
+        self._log = log
+        self._db = db
+        self._fmt = fmt
+        self._table = table
+
+    def export(self, stream, address=None, port=None, protocol=None,
+               start=None, end=None):
+        """
+        Write the matching rows to 'stream' and return the number written.
+        """
+        headers = self.HEADERS[self._table]
+        times = self._TIME_COLUMNS[self._table]
+        rows = getattr(self._db, self._QUERY_MAP[self._table])(
+            address, port, protocol, start, end)
+        count = 0
+
+        if self._fmt == self.CSV:
+            writer = csv.writer(stream, delimiter=',', quoting=csv.QUOTE_ALL)
+            writer.writerow(headers)
+            write = writer.writerow
+        else:
+            write = lambda row: stream.write(
+                json.dumps(dict(zip(headers, row))) + "\n")
+
+        # The query is closed here, e.g. on a broken pipe, so its cursor is
+        # not left open for the garbage collector after the database closes.
+        try:
+            for row in rows:
+                row = list(row)
+
+                for idx in times:
+                    row[idx] = MonitorDB.toDatetime(row[idx]).isoformat()
+
+                write(row)
+                count += 1
+        finally:
+            rows.close()
+
+        self._log.info("Exported %s %s rows as %s.", count, self._table,
+                       self._fmt)
+        return count
@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+#
+# forensics/flows.py
+#
+# by: Carl J. Nobile
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+#
+from __future__ import absolute_import
+
+from collections import OrderedDict
+
+
+__version__ = '1.0.0'
+__version_info__ = tuple([ int(num) for num in __version__.split('.')])
+
+
+class FlowTable(object):
+    """
+    Aggregates packets into flows keyed on (protocol, source address,
+    destination address, source port, destination port). Each flow keeps
+    its first and last seen times, packet and byte counts, and the OR of
+    all TCP flags seen.
+
+    Flows are kept in least recently seen order so idle flows are found at
+    the front of the table without scanning it. A flow that stays active
+    longer than the active timeout is reported and restarted on its next
+    packet. Expired flows are passed to 'sink' in batches as tuples of
+    (protocol, src, dst, sport, dport, first, last, packets, bytes, flags).
+    All times are in epoch nanoseconds.
+    """
+    _NS = 1000000000
+    _FIRST, _LAST, _PACKETS, _BYTES, _FLAGS = range(5)
+
+    def __init__(self, log, sink, idleTimeout=60, activeTimeout=1800,
+                 batchSize=500, flushInterval=10):
+        self._log = log
+        self._sink = sink
+        self._idle = idleTimeout * self._NS
+        self._active = activeTimeout * self._NS
+        self._batchSize = batchSize
+        self._flushInterval = flushInterval * self._NS
+        self._flows = OrderedDict()
+        self._pending = []
+        self._lastFlush = None
+
+    def __len__(self):
+        return len(self._flows)
+
+    def update(self, key, length, flags, timestamp):
+        flow = self._flows.get(key)
+
+        if flow is None:
+            self._flows[key] = [timestamp, timestamp, 1, length, flags]
+        elif timestamp - flow[self._FIRST] >= self._active:
+            del self._flows[key]
+            self._expire(key, flow)
+            self._flows[key] = [timestamp, timestamp, 1, length, flags]
+        else:
+            flow[self._LAST] = timestamp
+            flow[self._PACKETS] += 1
+            flow[self._BYTES] += length
+            flow[self._FLAGS] |= flags
+            self._flows.move_to_end(key)
+
+        self.expire(timestamp)
+
+    def expire(self, now):
+        """
+        Expire all flows idle longer than the idle timeout and flush the
+        pending batch if it is full or the flush interval has passed.
+        """
+        flows = self._flows
+
+        while flows:
+            key, flow = next(iter(flows.items()))
+
+            if now - flow[self._LAST] < self._idle:
+                break
+
+            del flows[key]
+            self._expire(key, flow)
+
+        if self._lastFlush is None:
+            self._lastFlush = now
+
+        if self._pending and (len(self._pending) >= self._batchSize or
+                              now - self._lastFlush >= self._flushInterval):
+            self._flush(now)
+
+    def flushAll(self):
+        """
+        Expire every flow and flush, used at shutdown.
+        """
+        while self._flows:
+            self._expire(*self._flows.popitem(last=False))
+
+        self._flush(self._lastFlush)
+
+    def _expire(self, key, flow):
+        self._pending.append(key + tuple(flow))
+
+    def _flush(self, now):
+        if self._pending:
+            self._log.debug("Flushing %s flows.", len(self._pending))
+            self._sink(self._pending)
+            self._pending = []
+
+        self._lastFlush = now
@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+#
+# forensics/log_utils.py
+#
+# by: Carl J. Nobile
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+#
+
+import time
+import queue
+import atexit
+import datetime
+import logging
+import logging.handlers
+
+__version__ = '1.0.0'
+__version_info__ = tuple([ int(num) for num in __version__.split('.')])
+
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """
+    Puts the log record on the queue without formatting it, so the message
+    is only built by the QueueListener thread. The record arguments must
+    not be changed after the logging call. Records are dropped and counted
+    in 'dropped' when a bounded queue is full instead of blocking.
+    """
+
+    def __init__(self, queue):
+        super(DeferredQueueHandler, self).__init__(queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def startLogQueue(log, rate=0, size=10000):
+    """
+    Move the handlers of 'log' behind a bounded queue serviced by a
+    QueueListener thread, optionally rate limiting the high volume records.
+    The listener is stopped, and the queue flushed, at exit.
+    """
+    handlers = log.handlers[:]
+    handler = DeferredQueueHandler(queue.Queue(size))
+
+    if rate:
+        handler.addFilter(RateLimitFilter(rate))
+
+    for each in handlers:
+        log.removeHandler(each)
+
+    log.addHandler(handler)
+    listener = logging.handlers.QueueListener(
+        handler.queue, *handlers, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+    return handler
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Passes at most 'rate' records per second of those logged with
+    extra=RateLimitFilter.EXTRA, the rest are counted in 'suppressed' and
+    dropped. All other records are always passed. A filter only sees the
+    record after it has been made, so in a hot loop call 'allow' before
+    the logging call instead and log without the extra.
+    """
+    EXTRA = {'rate_limit': True}
+
+    def __init__(self, rate):
+        super(RateLimitFilter, self).__init__()
+        self._rate = rate
+        self._window = 0
+        self._count = 0
+        self.suppressed = 0
+
+    def filter(self, record):
+        if not getattr(record, 'rate_limit', False):
+            return True
+
+        return self.allow()
+
+    def allow(self):
+        """
+        Returns True if one more record fits in the current one second
+        window, otherwise counts it as suppressed.
+        """
+        window = int(time.monotonic())
+
+        if window != self._window:
+            self._window = window
+            self._count = 0
+
+        self._count += 1
+
+        if self._count > self._rate:
+            self.suppressed += 1
+            return False
+
+        return True
+
+
+class EpochTime(object):
+    """
+    Wraps an epoch nanosecond time so it is only converted to ISO 8601 when
+    a log message is actually formatted.
+    """
+    __slots__ = ('_ns',)
+    _EPOCH = datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc)
+
+    def __init__(self, ns):
+        self._ns = ns
+
+    def __str__(self):
+        return (self._EPOCH + datetime.timedelta(
+            microseconds=self._ns // 1000)).isoformat()
@@ -0,0 +1,258 @@
+# -*- coding: utf-8 -*-
+#
+# forensics/metrics.py
+#
+# by: Carl J. Nobile
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+#
+from __future__ import absolute_import
+
+import os
+import stat
+import socketserver
+import threading
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+__version__ = '1.0.0'
+__version_info__ = tuple([ int(num) for num in __version__.split('.')])
+
+
+class Metric(object):
+    """
+    Base class of all metrics. A metric with label names holds one child
+    metric per set of label values, use 'labels' to get the child.
+    """
+    TYPE = None
+
+    def __init__(self, name, help, labelNames=()):
+        self.name = name
+        self.help = help
+        self._labelNames = tuple(labelNames)
+        self._children = {}
+
+    def labels(self, *values):
+        child = self._children.get(values)
+
+        if child is None:
+            child = self._children[values] = self._child()
+
+        return child
+
+    def _child(self):
+        return self.__class__(self.name, self.help)
+
+    def samples(self):
+        """
+        Yields (name suffix, labels dict, value) for every sample.
+        """
+        if self._labelNames:
+            for values, child in sorted(self._children.items()):
+                labels = dict(zip(self._labelNames, values))
+
+                for suffix, extra, value in child.samples():
+                    extra.update(labels)
+                    yield suffix, extra, value
+        else:
+            for sample in self._samples():
+                yield sample
+
+    def _samples(self):
+        raise NotImplementedError("Must implement the '_samples' method.")
+
+
+class Counter(Metric):
+    """
+    A value that only goes up, if 'func' is given it is called to get the
+    total each time the metrics are rendered.
+    """
+    TYPE = 'counter'
+
+    def __init__(self, name, help, labelNames=(), func=None):
+        super(Counter, self).__init__(name, help, labelNames)
+        self.value = 0
+        self._func = func
+
+    def inc(self, amount=1):
+        self.value += amount
+
+    def _samples(self):
+        yield '_total', {}, self._func() if self._func else self.value
+
+
+class Gauge(Metric):
+    """
+    A value that can go up and down, if 'func' is given it is called to
+    get the value each time the metrics are rendered.
+    """
+    TYPE = 'gauge'
+
+    def __init__(self, name, help, labelNames=(), func=None):
+        super(Gauge, self).__init__(name, help, labelNames)
+        self.value = 0
+        self._func = func
+
+    def set(self, value):
+        self.value = value
+
+    def _samples(self):
+        yield '', {}, self._func() if self._func else self.value
+
+
+class Histogram(Metric):
+    TYPE = 'histogram'
+    BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25,
+               0.5, 1.0, 2.5)
+
+    def __init__(self, name, help, labelNames=(), buckets=BUCKETS):
+        super(Histogram, self).__init__(name, help, labelNames)
+        self._buckets = tuple(buckets)
+        self._counts = [0] * (len(self._buckets) + 1)
+        self._sum = 0.0
+
+    def _child(self):
+        return self.__class__(self.name, self.help, buckets=self._buckets)
+
+    def observe(self, value):
+        self._counts[bisect_left(self._buckets, value)] += 1
+        self._sum += value
+
+    def _samples(self):
+        total = 0
+
+        for bound, count in zip(self._buckets + ('+Inf',), self._counts):
+            total += count
+            yield '_bucket', {'le': str(bound)}, total
+
+        yield '_sum', {}, self._sum
+        yield '_count', {}, total
+
+
+class MetricsRegistry(object):
+    """
+    Holds the metrics of a process and renders them in the Prometheus text
+    exposition format.
+    """
+    CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+    def __init__(self, prefix=''):
+        self._prefix = prefix
+        self._metrics = []
+
+    def register(self, metric):
+        metric.name = self._prefix + metric.name
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, help, labelNames=(), func=None):
+        return self.register(Counter(name, help, labelNames, func))
+
+    def gauge(self, name, help, labelNames=(), func=None):
+        return self.register(Gauge(name, help, labelNames, func))
+
+    def histogram(self, name, help, labelNames=(), buckets=Histogram.BUCKETS):
+        return self.register(Histogram(name, help, labelNames, buckets))
+
+    def render(self):
+        lines = []
+
+        for metric in self._metrics:
+            lines.append("# HELP {} {}".format(metric.name, metric.help))
+            lines.append("# TYPE {} {}".format(metric.name, metric.TYPE))
+
+            for suffix, labels, value in metric.samples():
+                if labels:
+                    labels = "{{{}}}".format(",".join(
+                        ['{}="{}"'.format(k, labels[k])
+                         for k in sorted(labels)]))
+                else:
+                    labels = ''
+
+                lines.append("{}{}{} {}".format(metric.name, suffix, labels,
+                                                value))
+
+        return "\n".join(lines) + "\n"
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        if self.path.split('?')[0] not in ('/', '/metrics'):
+            self.send_error(404)
+            return
+
+        body = self.server.registry.render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', MetricsRegistry.CONTENT_TYPE)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class _UnixHTTPServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+
+class MetricsServer(object):
+    """
+    Serves a MetricsRegistry over HTTP from a daemon thread. The address is
+    either 'host:port' or 'unix:/path/to/socket'.
+    """
+    _UNIX = 'unix:'
+
+    def __init__(self, log, registry, address):
+        self._log = log
+        self._registry = registry
+        self._address = address
+        self._server = None
+
+    def start(self):
+        if self._address.startswith(self._UNIX):
+            path = self._address[len(self._UNIX):]
+            self._removeSocket(path)
+            self._server = _UnixHTTPServer(path, _MetricsHandler)
+        else:
+            host, sep, port = self._address.rpartition(':')
+            self._server = ThreadingHTTPServer((host or '127.0.0.1',
+                                                int(port)), _MetricsHandler)
+            self._server.daemon_threads = True
+
+        self._server.registry = self._registry
+        thread = threading.Thread(target=self._server.serve_forever,
+                                  name='metrics', daemon=True)
+        thread.start()
+        self._log.info("Serving metrics on %s.", self._address)
+        return self
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+            if self._address.startswith(self._UNIX):
+                self._removeSocket(self._address[len(self._UNIX):])
+
+    def _removeSocket(self, path):
+        # Never remove anything but a stale socket, the path may be a typo.
+        try:
+            mode = os.lstat(path).st_mode
+        except FileNotFoundError:
+            return
+
+        if not stat.S_ISSOCK(mode):
+            raise OSError("The metrics path {} exists and is not a "
+                          "socket.".format(path))
+
+        os.remove(path)
@@ -41,6 +41,55 @@ class ContainerBase(object):
         raise NotImplementedError("Must implement the 'name' method.")
 
 
+class IPContainer(ContainerBase):
+    _H_SIZE = 20 # Bytes
+    ICMP = 0x01
+    TCP = 0x06
+    UDP = 0x11
+    PROTOCOL_CLASS_MAP = {}
+
+    def __init__(self, log, packet):
+        super(IPContainer, self).__init__(log, packet)
+
+    def _parse(self):
+        header = struct.unpack('!BBHHHBBH4s4s', self._packet[:self._H_SIZE])
+        self._log.debug("IP Header: %s", header)
+        self.version = header[0] >> 4
+        self.header_length = (header[0] & 0x0f) * 4 # Convert to bytes
+        self.differentiated_services = header[1]
+        self.total_length = header[2]
+        self.identification = header[3]
+        self.flags = header[4] >> 13
+        self.fragment_offset = header[4] & 0b0001111111111111
+        self.ttl = header[5]
+        self.protocol = int(header[6])
+        self.checksum = header[7]
+        self.src_addr = socket.inet_ntoa(header[8])
+        self.dst_addr = socket.inet_ntoa(header[9])
+
+        if self.header_length > self._H_SIZE:
+            self._log.debug("IP Header is longer than %s bytes, %s option "
+                            "bytes need to be parsed.", self._H_SIZE,
+                            self.header_length-self._H_SIZE)
+
+    @property
+    def data(self):
+        return self._packet[self.header_length:]
+
+    @classmethod
+    def register(self, protocol):
+        """
+        Class decorator that registers a container as the handler for an IP
+        protocol number.
+        """
+        def decorator(Klass):
+            self.PROTOCOL_CLASS_MAP[protocol] = Klass
+            return Klass
+
+        return decorator
+
+
+@IPContainer.register(IPContainer.TCP)
 class TCPContainer(ContainerBase):
     _H_SIZE = 20 # Bytes
 
@@ -56,6 +105,7 @@ class TCPContainer(ContainerBase):
         self.acknowledgment_number = header[3]
         self.data_offset = (header[4] >> 4) * 4 # Convert to bytes
         self.reserved = header[4] & 0x0f
+        self.flags = header[5]
         self.CWR = (header[5] >> 7) & 0x01
         self.ECE = (header[5] >> 6) & 0x01
         self.URG = (header[5] >> 5) & 0x01
@@ -85,28 +135,25 @@ class TCPContainer(ContainerBase):
         return TCPContainer.name()
 
 
+@IPContainer.register(IPContainer.UDP)
 class UDPContainer(ContainerBase):
-    _H_SIZE = 12 + 12 # Bytes
+    _H_SIZE = 8 # Bytes
+    flags = 0 # UDP has no flags
 
     def __init__(self, log, packet):
         super(UDPContainer, self).__init__(log, packet)
 
     def _parse(self):
-        header = struct.unpack('!HHHHLLBBH', self._packet[:self._H_SIZE])
+        header = struct.unpack('!HHHH', self._packet[:self._H_SIZE])
         self._log.debug("UDP Header: %s", header)
         self.source_port = header[0]
         self.destination_port = header[1]
-        self.length = header[2]
+        self.length = header[2] # Header and data in bytes
         self.checksum = header[3]
-        self.src_addr = socket.inet_ntoa(header[4])
-        self.dst_addr = socket.inet_ntoa(header[5])
-        self.reserved = header[6]
-        self.protocol = header[7]
-        self.total_length = header[8]
 
     @property
     def data(self):
-        return self._packet[self.length:]
+        return self._packet[self._H_SIZE:self.length]
 
     @classmethod
     def name(self):
@@ -116,36 +163,95 @@ class UDPContainer(ContainerBase):
         return UDPContainer.name()
 
 
-class IPContainer(ContainerBase):
-    _H_SIZE = 20 # Bytes
-    TCP = 0x06
-    UDP = 0x11
-    PROTOCOL_CLASS_MAP = {TCP: TCPContainer, UDP: UDPContainer}
+@IPContainer.register(IPContainer.ICMP)
+class ICMPContainer(ContainerBase):
+    _H_SIZE = 8 # Bytes
+    # ICMP has no ports or flags, these keep it interchangeable with TCP
+    # and UDP.
+    source_port = None
+    destination_port = None
+    flags = 0
 
     def __init__(self, log, packet):
-        super(IPContainer, self).__init__(log, packet)
+        super(ICMPContainer, self).__init__(log, packet)
 
     def _parse(self):
-        header = struct.unpack('!BBHHHBBH4s4s', self._packet[:self._H_SIZE])
-        self._log.debug("IP Header: %s", header)
-        self.version = header[0] >> 4
-        self.header_length = (header[0] & 0x0f) * 4 # Convert to bytes
-        self.differentiated_services = header[1]
-        self.total_length = header[2]
-        self.identification = header[3]
-        self.flags = header[4] >> 13
-        self.fragment_offset = header[4] & 0b0001111111111111
-        self.ttl = header[5]
-        self.protocol = int(header[6])
-        self.checksum = header[7]
-        self.src_addr = socket.inet_ntoa(header[8])
-        self.dst_addr = socket.inet_ntoa(header[9])
-
-        if self.header_length > self._H_SIZE:
-            self._log.debug("IP Header is longer than %s bytes, %s option "
-                            "bytes need to be parsed.", self._H_SIZE,
-                            self.header_length-self._H_SIZE)
+        header = struct.unpack('!BBHHH', self._packet[:self._H_SIZE])
+        self._log.debug("ICMP Header: %s", header)
+        self.type = header[0]
+        self.code = header[1]
+        self.checksum = header[2]
+        # Only meaningful for echo request and reply messages.
+        self.identifier = header[3]
+        self.sequence_number = header[4]
 
     @property
     def data(self):
-        return self._packet[self.header_length:]
+        return self._packet[self._H_SIZE:]
+
+    @classmethod
+    def name(self):
+        return 'ICMP'
+
+    def __str__(self):
+        return ICMPContainer.name()
+
+
+class PacketFilter(object):
+    """
+    Pre-filters raw IP packets before any container objects are built.
+    The protocol, destination address (packed into a 32 bit integer) and
+    destination port criteria are compiled once into sets and checked with
+    direct offset reads on the raw packet buffer. Packets too short for
+    the IP header or the header of a registered protocol are rejected as
+    'short', and fragments other than the first as 'fragment' since they
+    carry no transport header, so the containers never see them.
+    """
+    _PORT_PROTOCOLS = (IPContainer.TCP, IPContainer.UDP)
+    _ADDRESS = struct.Struct('!L')
+
+    def __init__(self, protocols=(), addresses=(), ports=()):
+        nameMap = dict([(Klass.name(), number) for number, Klass
+                        in IPContainer.PROTOCOL_CLASS_MAP.items()])
+        self.protocols = frozenset([nameMap[name] for name in protocols])
+        self.addresses = frozenset([
+            self._ADDRESS.unpack(socket.inet_pton(socket.AF_INET, addr))[0]
+            for addr in addresses])
+        self.ports = frozenset(ports)
+
+    def reject(self, packet):
+        """
+        Returns the reason the packet was rejected or None if it should be
+        passed on to the containers.
+        """
+        if len(packet) < IPContainer._H_SIZE:
+            return 'short'
+
+        protocol = packet[9]
+
+        if self.protocols and protocol not in self.protocols:
+            return 'protocol'
+
+        if (self.addresses and self._ADDRESS.unpack_from(packet, 16)[0]
+            not in self.addresses):
+            return 'address'
+
+        # Only the first fragment carries the transport header.
+        if (packet[6] & 0x1f) or packet[7]:
+            return 'fragment'
+
+        offset = (packet[0] & 0x0f) * 4
+        Klass = IPContainer.PROTOCOL_CLASS_MAP.get(protocol)
+
+        if (offset < IPContainer._H_SIZE or
+            len(packet) < offset + (Klass._H_SIZE if Klass else 0)):
+            return 'short'
+
+        if self.ports:
+            if protocol not in self._PORT_PROTOCOLS:
+                return 'port'
+
+            if (packet[offset+2] << 8 | packet[offset+3]) not in self.ports:
+                return 'port'
+
+        return None
@@ -0,0 +1,275 @@
+# -*- coding: utf-8 -*-
+#
+# forensics/pcap.py
+#
+# by: Carl J. Nobile
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+#
+from __future__ import absolute_import
+
+import time
+import struct
+
+from .capture import CaptureBase
+
+
+__version__ = '1.0.0'
+__version_info__ = tuple([ int(num) for num in __version__.split('.')])
+
+
+class PcapReader(object):
+    """
+    Streaming reader for pcap and pcapng files. Frames are read one at a
+    time so files of any size can be processed in constant memory.
+    """
+    _PCAP_MAGIC = {0xa1b2c3d4: 1000, 0xa1b23c4d: 1} # Fraction to ns
+    _PCAPNG_SHB = 0x0a0d0d0a
+    _PCAPNG_BOM = 0x1a2b3c4d
+    _IDB = 0x00000001
+    _OPB = 0x00000002
+    _SPB = 0x00000003
+    _EPB = 0x00000006
+    _IF_TSRESOL = 9
+
+    def __init__(self, log, fileobj):
+        self._log = log
+        self._file = fileobj
+
+    def frames(self):
+        """
+        Yields (timestamp in epoch nanoseconds, link type, frame) tuples,
+        the timestamp is None if the file does not record one and the link
+        type is None if the frame refers to an undefined pcapng interface.
+        """
+        head = self._file.read(4)
+
+        if len(head) < 4:
+            return
+
+        if struct.unpack('<L', head)[0] == self._PCAPNG_SHB:
+            frames = self._pcapngFrames(head)
+        else:
+            frames = self._pcapFrames(head)
+
+        for frame in frames:
+            yield frame
+
+    def _read(self, size):
+        data = self._file.read(size)
+
+        if len(data) < size:
+            if data:
+                self._log.warning("Truncated capture file, %s of %s bytes "
+                                  "read.", len(data), size)
+
+            raise EOFError()
+
+        return data
+
+    def _pcapFrames(self, head):
+        for order in ('<', '>'):
+            magic = struct.unpack(order + 'L', head)[0]
+
+            if magic in self._PCAP_MAGIC:
+                break
+        else:
+            raise ValueError("Not a pcap or pcapng file, magic number "
+                             "{}.".format(head.hex()))
+
+        scale = self._PCAP_MAGIC[magic]
+        header = struct.unpack(order + 'HHlLLL', self._read(20))
+        linktype = header[5] & 0x0fffffff
+        self._log.debug("pcap header: %s", header)
+        record = struct.Struct(order + 'LLLL')
+
+        try:
+            while True:
+                sec, frac, incl, orig = record.unpack(
+                    self._read(record.size))
+                yield (sec * 1000000000 + frac * scale, linktype,
+                       self._read(incl))
+        except EOFError:
+            pass
+
+    def _pcapngFrames(self, head):
+        interfaces = []
+        order = '<'
+
+        try:
+            while True:
+                raw = head + self._read(8 - len(head))
+                # The section header type reads the same in either order.
+                btype = struct.unpack(order + 'L', raw[:4])[0]
+
+                if btype == self._PCAPNG_SHB:
+                    bom = self._read(4)
+                    order = ('<' if struct.unpack('<L', bom)[0]
+                             == self._PCAPNG_BOM else '>')
+                    length = struct.unpack(order + 'L', raw[4:])[0]
+                    body = bom + self._read(length - 16)
+                    interfaces = []
+                else:
+                    length = struct.unpack(order + 'L', raw[4:])[0]
+                    body = self._read(length - 12)
+
+                self._read(4) # Trailing block length
+                head = b''
+
+                if btype == self._IDB:
+                    interfaces.append(self._interface(order, body))
+                elif btype == self._EPB:
+                    ifid, high, low, incl, orig = struct.unpack(
+                        order + 'LLLLL', body[:20])
+                    linktype, tsresol = self._lookup(interfaces, ifid)
+                    yield (self._nanoseconds(high << 32 | low, tsresol),
+                           linktype, memoryview(body)[20:20 + incl])
+                elif btype == self._SPB:
+                    # A simple block only has the original length, it
+                    # is used to drop the padding.
+                    orig = struct.unpack(order + 'L', body[:4])[0]
+                    linktype, tsresol = self._lookup(interfaces, 0)
+                    yield None, linktype, memoryview(body)[4:4 + orig]
+                elif btype == self._OPB:
+                    ifid, drops, high, low, incl, orig = struct.unpack(
+                        order + 'HHLLLL', body[:20])
+                    linktype, tsresol = self._lookup(interfaces, ifid)
+                    yield (self._nanoseconds(high << 32 | low, tsresol),
+                           linktype, memoryview(body)[20:20 + incl])
+                else:
+                    self._log.debug("Skipping pcapng block type %s.",
+                                    hex(btype))
+        except EOFError:
+            pass
+
+    def _lookup(self, interfaces, ifid):
+        if ifid < len(interfaces):
+            return interfaces[ifid]
+
+        self._log.warning("Packet block for undefined pcapng interface %s.",
+                          ifid)
+        return None, 6
+
+    def _interface(self, order, body):
+        linktype = struct.unpack(order + 'H', body[:2])[0]
+        tsresol = 6
+        offset = 8
+
+        while offset + 4 <= len(body):
+            code, length = struct.unpack(order + 'HH',
+                                         body[offset:offset + 4])
+
+            if code == 0:
+                break
+
+            if code == self._IF_TSRESOL:
+                tsresol = body[offset + 4]
+
+            offset += 4 + (length + 3) // 4 * 4
+
+        return linktype, tsresol
+
+    def _nanoseconds(self, units, tsresol):
+        if tsresol & 0x80:
+            return units * 1000000000 >> (tsresol & 0x7f)
+        elif tsresol <= 9:
+            return units * 10 ** (9 - tsresol)
+        else:
+            return units // 10 ** (tsresol - 9)
+
+
+class PcapCapture(CaptureBase):
+    """
+    Feeds IPv4 packets from a pcap or pcapng file through the monitor.
+    In 'fast' mode packets are delivered as quickly as they can be read,
+    in 'timed' mode the original gaps between packets are reproduced.
+    """
+    FAST = 'fast'
+    TIMED = 'timed'
+    _ETHERTYPE_IP = 0x0800
+    _ETHERTYPE_VLAN = (0x8100, 0x88a8)
+    # Link type: (header length, offset of the protocol type field)
+    _LINKTYPE_MAP = {
+        0: (4, None),      # BSD loopback
+        108: (4, None),    # OpenBSD loopback
+        1: (14, 12),       # Ethernet
+        101: (0, None),    # Raw IP
+        228: (0, None),    # Raw IPv4
+        113: (16, 14),     # Linux cooked capture v1
+        276: (20, 0),      # Linux cooked capture v2
+        }
+
+    def __init__(self, log, path, replay=FAST):
+        super(PcapCapture, self).__init__(log, None)
+        self._path = path
+        self._replay = replay
+        self.skipped = 0
+
+    def packets(self):
+        start = first = None
+
+        with open(self._path, 'rb') as f:
+            for timestamp, linktype, frame in PcapReader(
+                self._log, f).frames():
+                packet = self._ipPacket(linktype, memoryview(frame))
+
+                if packet is None:
+                    self.skipped += 1
+                    continue
+
+                if self._replay == self.TIMED and timestamp is not None:
+                    if first is None:
+                        first, start = timestamp, time.monotonic_ns()
+
+                    delay = (timestamp - first) - (time.monotonic_ns()
+                                                   - start)
+
+                    if delay > 0:
+                        time.sleep(delay / 1000000000)
+
+                yield timestamp, packet
+
+    def _ipPacket(self, linktype, frame):
+        if linktype not in self._LINKTYPE_MAP:
+            self._log.debug("Unsupported link type %s.", linktype)
+            return None
+
+        offset, typeOffset = self._LINKTYPE_MAP[linktype]
+
+        if typeOffset is not None:
+            if len(frame) < typeOffset + 2:
+                return None
+
+            etype = frame[typeOffset] << 8 | frame[typeOffset + 1]
+
+            # Skip any 802.1Q or 802.1ad VLAN tags on Ethernet frames.
+            while linktype == 1 and etype in self._ETHERTYPE_VLAN:
+                offset += 4
+
+                if len(frame) < offset:
+                    return None
+
+                etype = frame[offset - 2] << 8 | frame[offset - 1]
+
+            if etype != self._ETHERTYPE_IP:
+                return None
+
+        packet = frame[offset:]
+
+        if not packet or packet[0] >> 4 != 4:
+            return None
+
+        return packet
+
+    def close(self):
+        pass
+
+    @classmethod
+    def name(self):
+        return 'pcap'
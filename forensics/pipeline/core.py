@@ -0,0 +1,407 @@
+# -*- coding: utf-8 -*-
+#
+# forensics/pipeline/core.py
+#
+# by: Carl J. Nobile
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+#
+from __future__ import absolute_import
+
+import time
+import queue
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+from .stages import Stage
+
+
+__version__ = '1.0.0'
+__version_info__ = tuple([ int(num) for num in __version__.split('.')])
+
+
+class _Marker(object):
+    __slots__ = ('_name',)
+
+    def __init__(self, name):
+        self._name = name
+
+    def __repr__(self):
+        return "<{}>".format(self._name)
+
+
+_END = _Marker('end')
+_WORKER_STAGE = None
+
+
+def _runBatch(stage, batch):
+    start = time.perf_counter()
+    process = stage.process
+    results = [process(item) for item in batch]
+    return results, time.perf_counter() - start
+
+
+def _initWorker(stage):
+    global _WORKER_STAGE
+    _WORKER_STAGE = stage
+
+
+def _runWorker(batch):
+    return _runBatch(_WORKER_STAGE, batch)
+
+
+class Pipeline(object):
+    """
+    Runs a source, any number of transforms, and an optional sink.
+
+    The stages are split into segments at every stage that is not INLINE.
+    The first segment runs in the thread calling 'run', every other one in
+    a thread of its own fed by a bounded queue of 'queueSize' items, so a
+    slow stage blocks the stages before it instead of letting the queues
+    grow. The time blocked is kept in the 'blocked' attribute of the stage
+    handing on the items.
+
+    Every stage counts its items, with 'timing' set, or any 'hooks' given,
+    the time spent in each stage is also kept in its 'seconds' attribute
+    and each hook is called with (stage, items, seconds) after every call
+    or pool batch.
+    """
+    TICK = _Marker('tick')
+
+    def __init__(self, log, source, transforms=(), sink=None,
+                 queueSize=1000, timing=False, hooks=()):
+        self._log = log
+        self._stages = [source] + list(transforms) + ([sink] if sink else [])
+        self._hooks = list(hooks)
+        self._timing = timing or bool(self._hooks)
+        self._stopped = threading.Event()
+        self._errors = []
+        self._segments = []
+
+        for stage in self._stages:
+            if self._segments and stage.executor == Stage.INLINE:
+                self._segments[-1].append(stage)
+            else:
+                self._segments.append([stage])
+
+        self._queues = [None] + [queue.Queue(queueSize)
+                                 for segment in self._segments[1:]]
+        self._ended = [False] * len(self._segments)
+
+    @property
+    def stages(self):
+        return list(self._stages)
+
+    def run(self):
+        """
+        Run the pipeline until the source is exhausted or 'stop' is called
+        and return the number of items the source produced. The first
+        exception raised by any stage is raised here after every thread
+        has finished.
+        """
+        threads = []
+
+        for idx in range(1, len(self._segments)):
+            thread = threading.Thread(
+                target=self._runSegment, args=(idx,), daemon=True,
+                name="pipeline-{}".format(self._segments[idx][0].name()))
+            thread.start()
+            threads.append(thread)
+
+        try:
+            self._runSegment(0)
+        finally:
+            for thread in threads:
+                thread.join()
+
+        if self._errors:
+            raise self._errors[0]
+
+        return self._stages[0].count
+
+    def stop(self):
+        """
+        Stop reading the source, items already read are still processed.
+        """
+        self._stopped.set()
+
+    def queueDepths(self):
+        return [(segment[0].name(), self._queues[idx].qsize())
+                for idx, segment in enumerate(self._segments) if idx]
+
+    def report(self):
+        for stage in self._stages:
+            if self._timing:
+                self._log.info("Stage %s (%s): %s items, %.3f seconds busy, "
+                               "%.3f seconds blocked.", stage.name(),
+                               stage.executor, stage.count, stage.seconds,
+                               stage.blocked)
+            else:
+                self._log.info("Stage %s (%s): %s items, %.3f seconds "
+                               "blocked.", stage.name(), stage.executor,
+                               stage.count, stage.blocked)
+
+    def _runSegment(self, idx):
+        segment = self._segments[idx]
+        head = segment[0]
+        emit = self._put(idx)
+        opened = []
+
+        for stage in reversed(segment[1:]):
+            emit = self._inline(stage, emit)
+
+        try:
+            for stage in segment:
+                stage.open()
+                opened.append(stage)
+
+            if idx == 0:
+                self._runSource(head, emit)
+            elif head.workers > 1:
+                self._runPool(idx, head, emit)
+            else:
+                self._runQueue(idx, self._inline(head, emit))
+        except Exception as e:
+            # Inline stages record their own failures as they are raised.
+            if not [error for error in self._errors if error is e]:
+                self._fail(segment[len(opened)] if len(opened) < len(segment)
+                           else head, e)
+
+            if idx and not self._ended[idx]:
+                self._drain(idx)
+        finally:
+            for stage in opened:
+                try:
+                    stage.close()
+                except Exception as e:
+                    self._fail(stage, e)
+
+            if idx + 1 < len(self._queues):
+                self._queues[idx+1].put(_END)
+
+    def _fail(self, stage, e):
+        self._log.error("Pipeline stage %s failed, %s", stage.name(), e)
+        self._errors.append(e)
+        self._stopped.set()
+
+    def _drain(self, idx):
+        # Keep taking items so the stages before this one never block.
+        get = self._queues[idx].get
+
+        while get() is not _END:
+            pass
+
+        self._ended[idx] = True
+
+    def _put(self, idx):
+        """
+        Returns the function passing an item out of segment idx to the
+        queue of the next segment.
+        """
+        if idx + 1 >= len(self._queues):
+            return lambda item: None
+
+        sender = self._segments[idx][-1]
+        q = self._queues[idx+1]
+        put = q.put
+        putNowait = q.put_nowait
+
+        def call(item):
+            try:
+                putNowait(item)
+            except queue.Full:
+                start = time.perf_counter()
+                put(item)
+                sender.blocked += time.perf_counter() - start
+
+        return call
+
+    def _inline(self, stage, emit):
+        """
+        Returns the function running 'stage' on an item and passing the
+        result on to 'emit'.
+        """
+        process = stage.process
+        tick = self.TICK
+        fail = self._fail
+
+        # A failure is recorded against the stage that raised it before it
+        # unwinds through the stages before it.
+        def onTick(item):
+            try:
+                stage.tick()
+            except Exception as e:
+                fail(stage, e)
+                raise
+
+            emit(item)
+
+        if self._timing:
+            perfCounter = time.perf_counter
+            hooks = self._hooks
+
+            def call(item):
+                if item is tick:
+                    onTick(item)
+                    return
+
+                start = perfCounter()
+
+                try:
+                    result = process(item)
+                except Exception as e:
+                    fail(stage, e)
+                    raise
+
+                elapsed = perfCounter() - start
+                stage.count += 1
+                stage.seconds += elapsed
+
+                for hook in hooks:
+                    hook(stage, 1, elapsed)
+
+                if result is not None:
+                    emit(result)
+        else:
+            def call(item):
+                if item is tick:
+                    onTick(item)
+                    return
+
+                stage.count += 1
+
+                try:
+                    result = process(item)
+                except Exception as e:
+                    fail(stage, e)
+                    raise
+
+                if result is not None:
+                    emit(result)
+
+        return call
+
+    def _runSource(self, source, emit):
+        stopped = self._stopped.is_set
+        tick = self.TICK
+        items = iter(source.items())
+
+        if self._timing:
+            perfCounter = time.perf_counter
+            hooks = self._hooks
+
+            while not stopped():
+                start = perfCounter()
+
+                try:
+                    item = next(items)
+                except StopIteration:
+                    break
+
+                elapsed = perfCounter() - start
+                source.seconds += elapsed
+
+                if item is tick:
+                    source.tick()
+                else:
+                    source.count += 1
+
+                    for hook in hooks:
+                        hook(source, 1, elapsed)
+
+                emit(item)
+        else:
+            for item in items:
+                if stopped():
+                    break
+
+                if item is tick:
+                    source.tick()
+                else:
+                    source.count += 1
+
+                emit(item)
+
+    def _runQueue(self, idx, call):
+        get = self._queues[idx].get
+
+        while True:
+            item = get()
+
+            if item is _END:
+                self._ended[idx] = True
+                break
+
+            call(item)
+
+    def _runPool(self, idx, stage, emit):
+        q = self._queues[idx]
+        get = q.get
+        tick = self.TICK
+        # Bound the batches in flight so the pool does not read ahead of
+        # the stages after it.
+        limit = stage.workers * 2
+        pending = deque()
+        batch = []
+
+        if stage.executor == Stage.PROCESS:
+            pool = ProcessPoolExecutor(stage.workers, initializer=_initWorker,
+                                       initargs=(stage,))
+            submit = lambda batch: pool.submit(_runWorker, batch)
+        else:
+            pool = ThreadPoolExecutor(
+                stage.workers,
+                thread_name_prefix="pipeline-{}".format(stage.name()))
+            submit = lambda batch: pool.submit(_runBatch, stage, batch)
+
+        def forward(future):
+            results, elapsed = future.result()
+            stage.seconds += elapsed
+
+            for hook in self._hooks:
+                hook(stage, len(results), elapsed)
+
+            for result in results:
+                if result is not None:
+                    emit(result)
+
+        try:
+            while True:
+                item = get()
+
+                if item is _END or item is tick:
+                    self._ended[idx] = item is _END
+
+                    if batch:
+                        pending.append(submit(batch))
+                        batch = []
+
+                    while pending:
+                        forward(pending.popleft())
+
+                    if item is _END:
+                        break
+
+                    stage.tick()
+                    emit(item)
+                    continue
+
+                batch.append(item)
+                stage.count += 1
+
+                if len(batch) >= stage.batchSize or q.empty():
+                    pending.append(submit(batch))
+                    batch = []
+
+                    while pending and (len(pending) >= limit or
+                                       pending[0].done()):
+                        forward(pending.popleft())
+        finally:
+            pool.shutdown(cancel_futures=True)
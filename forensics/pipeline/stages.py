@@ -0,0 +1,222 @@
+# -*- coding: utf-8 -*-
+#
+# forensics/pipeline/stages.py
+#
+# by: Carl J. Nobile
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+#
+from __future__ import absolute_import
+
+import os
+import sys
+import csv
+
+
+__version__ = '1.0.0'
+__version_info__ = tuple([ int(num) for num in __version__.split('.')])
+
+
+class Stage(object):
+    """
+    Base class of the pipeline stages.
+
+    The executor says where the stage runs. An INLINE stage runs in the
+    thread of the stage before it, a THREAD or PROCESS stage reads its
+    items from a bounded queue in a thread of its own and, with more than
+    one worker, hands them in batches of 'batchSize' to a pool of threads
+    or processes. Results are passed on in the order the items arrived.
+
+    'open' and 'close' are called in the thread the stage runs in, 'tick'
+    when the source yields Pipeline.TICK. A stage run on a PROCESS pool
+    must be picklable and its 'open' and 'close' are not called in the
+    worker processes.
+    """
+    INLINE = 'inline'
+    THREAD = 'thread'
+    PROCESS = 'process'
+    EXECUTORS = (INLINE, THREAD, PROCESS)
+
+    def __init__(self, log, executor=INLINE, workers=1, batchSize=1):
+        if executor not in self.EXECUTORS:
+            raise ValueError("Invalid executor '{}', must be one of "
+                             "{}.".format(executor, self.EXECUTORS))
+
+        self._log = log
+        self.executor = executor
+        self.workers = max(1, workers)
+        self.batchSize = max(1, batchSize)
+        self.count = 0
+        self.seconds = 0.0
+        self.blocked = 0.0
+
+    def open(self):
+        pass
+
+    def tick(self):
+        pass
+
+    def close(self):
+        pass
+
+    @classmethod
+    def name(self):
+        return self.__name__
+
+
+class Source(Stage):
+    """
+    Yields the items fed into the pipeline, always runs in the thread that
+    calls Pipeline.run.
+    """
+
+    def __init__(self, log):
+        super(Source, self).__init__(log)
+
+    def items(self):
+        raise NotImplementedError("Must implement the 'items' method.")
+
+
+class Transform(Stage):
+    """
+    Returns the result for an item or None to drop it.
+    """
+
+    def process(self, item):
+        raise NotImplementedError("Must implement the 'process' method.")
+
+
+class Sink(Stage):
+    """
+    Consumes the results at the end of the pipeline, a sink always has a
+    single worker.
+    """
+
+    def __init__(self, log, executor=Stage.INLINE):
+        if executor == self.PROCESS:
+            raise ValueError("A sink can not run in a process pool.")
+
+        super(Sink, self).__init__(log, executor)
+
+    def process(self, item):
+        self.consume(item)
+
+    def consume(self, item):
+        raise NotImplementedError("Must implement the 'consume' method.")
+
+
+class IterSource(Source):
+    """
+    A source of the items of any iterable.
+    """
+
+    def __init__(self, log, iterable):
+        super(IterSource, self).__init__(log)
+        self._iterable = iterable
+
+    def items(self):
+        return iter(self._iterable)
+
+
+class CallableTransform(Transform):
+    """
+    A transform calling 'func' on each item, 'func' must be a module level
+    function for a PROCESS executor.
+    """
+
+    def __init__(self, log, func, executor=Stage.INLINE, workers=1,
+                 batchSize=1):
+        super(CallableTransform, self).__init__(log, executor, workers,
+                                                batchSize)
+        self._func = func
+
+    def process(self, item):
+        return self._func(item)
+
+
+class CallableSink(Sink):
+    """
+    A sink calling 'func' on each result.
+    """
+
+    def __init__(self, log, func, executor=Stage.INLINE):
+        super(CallableSink, self).__init__(log, executor)
+        self._func = func
+
+    def consume(self, item):
+        self._func(item)
+
+
+class FileSource(Source):
+    """
+    The paths of all files under a directory, in os.walk order, or of a
+    single file. Errors listing a directory are passed to 'onerror'.
+    """
+
+    def __init__(self, log, path, onerror=None):
+        super(FileSource, self).__init__(log)
+        self._path = path
+        self._onerror = onerror
+
+    def items(self):
+        if os.path.isfile(self._path):
+            yield self._path
+            return
+
+        for root, dirs, files in os.walk(self._path, onerror=self._onerror):
+            for each in files:
+                yield os.path.join(root, each)
+
+    @classmethod
+    def name(self):
+        return 'files'
+
+
+class CSVSink(Sink):
+    """
+    Writes rows, or lists of rows with 'many' set, to a CSV file after a
+    header row, or to standard out if there is no path. With 'flush' set
+    the file is flushed after every item.
+    """
+
+    def __init__(self, log, path, headers, many=False, flush=False,
+                 executor=Stage.INLINE):
+        super(CSVSink, self).__init__(log, executor)
+        self._path = path
+        self._headers = headers
+        self._many = many
+        self._flush = flush
+        self._file = None
+
+    def open(self):
+        if self._path:
+            self._file = open(self._path, 'w', newline='', encoding='utf-8')
+            stream = self._file
+        else:
+            stream = sys.stdout
+
+        writer = csv.writer(stream, delimiter=',', quoting=csv.QUOTE_ALL)
+        writer.writerow(self._headers)
+        self._write = writer.writerows if self._many else writer.writerow
+        self._stream = stream
+
+    def consume(self, item):
+        self._write(item)
+
+        if self._flush:
+            self._stream.flush()
+
+    def close(self):
+        if self._file:
+            self._file.close()
+            self._file = None
+
+    @classmethod
+    def name(self):
+        return 'csv'
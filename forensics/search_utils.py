@@ -14,12 +14,9 @@
 #
 
 import re
-import os
-import stat
-import time
-import hashlib
-import csv
-from collections import OrderedDict
+import mmap
+
+from .pipeline import Pipeline, Transform, FileSource, CSVSink
 
 
 __version__ = '2.0.0'
@@ -39,7 +36,7 @@ class Keywords(object):
         result = u''
 
         try:
-            with open(filepath, 'rb') as f:
+            with open(filepath, 'r', encoding='utf-8') as f:
                 result = f.read()
         except IOError as e:
             self._log.critical("Could not open or read file: %s", filepath)
@@ -62,11 +59,178 @@ class Keywords(object):
         return kwSet
 
 
+class WeightedMatrix(object):
+    """
+    The character pairs common in the language searched for, read from a
+    file of two letter pairs seperated with white space, commas, or bars.
+    The weight of a word is the fraction of its adjacent letter pairs found
+    in the matrix, so real words weigh close to one and letters that
+    happen to appear in binary data weigh much less.
+    """
+    _REGEX_SPLIT = re.compile(r"[\s,|]+")
+    _REGEX_PAIR = re.compile(r"[a-z]{2}")
+
+    def __init__(self, log):
+        self._log = log
+        self.pairs = frozenset()
+
+    def fromFile(self, filepath):
+        result = u''
+
+        try:
+            with open(filepath, 'r', encoding='utf-8') as f:
+                result = f.read()
+        except IOError as e:
+            self._log.critical("Could not open or read file: %s", filepath)
+
+        self.pairs = frozenset([
+            pair for pair in self._REGEX_SPLIT.split(result.lower())
+            if self._REGEX_PAIR.fullmatch(pair)])
+        self._log.info("Matrix pairs: %s", len(self.pairs))
+        return self
+
+    def weight(self, word):
+        if len(word) < 2:
+            return 0.0
+
+        pairs = self.pairs
+        found = sum([1 for idx in range(len(word) - 1)
+                     if word[idx:idx+2] in pairs])
+        return found / (len(word) - 1)
+
+
 class SearchUtilities(object):
     """
+    Searches a file, or a tree of files, for keywords and for probable
+    words, runs of letters whose matrix weight is at least the weight
+    option. Files are searched as bytes so disk images and other binary
+    files can be searched too. Keywords are matched without regard to case
+    and a keyword of several words matches any white space between them.
     """
+    HEADERS = ['File', 'Offset', 'Type', 'Word', 'Weight']
+    KEYWORD = 'keyword'
+    PROBABLE = 'probable'
+    _REGEX_WORD = re.compile(rb"[A-Za-z]{4,32}")
+
+    def __init__(self, log, options):
+        self._log = log
+        self._options = options
+        self._regex = self.compileKeywords(
+            Keywords(log).fromFile(options.keyword_path))
+        self._matrix = WeightedMatrix(log).fromFile(options.matrix_path)
+
+    @classmethod
+    def compileKeywords(self, keywords):
+        """
+        Compile the keywords into a single regular expression, longest
+        first so a keyword is not cut short by another it starts with.
+        """
+        if not keywords:
+            return None
+
+        patterns = [rb"\s+".join([re.escape(word.encode('utf-8'))
+                                  for word in keyword.split()])
+                    for keyword in sorted(keywords, key=len, reverse=True)]
+        return re.compile(rb"\b(?:" + b"|".join(patterns) + rb")\b",
+                          re.IGNORECASE)
+
+    def start(self):
+        """
+        Search the path writing a report row for each keyword and probable
+        word found, returns the number of files searched.
+        """
+        processCount = 0
+        options = self._options
+
+        if not options.noop:
+            search = _SearchTransform(self._log, self, options.executor,
+                                      options.workers)
+            pipeline = Pipeline(
+                self._log, FileSource(self._log, options.search_path,
+                                      self.__handleError),
+                [search], CSVSink(self._log, options.report_path,
+                                  self.HEADERS, many=True),
+                options.queue_size, options.timing)
+            pipeline.run()
+
+            if options.timing:
+                pipeline.report()
+
+            processCount = search.count
+
+        return processCount
+
+    def __handleError(self, e):
+        self._log.error("Error found with file: %s, %s", e.filename, e)
+
+    def searchFile(self, path):
+        """
+        Returns the report rows for one file in the order found. The file
+        is memory mapped so a large disk image is searched from the page
+        cache rather than read into memory in one piece.
+        """
+        try:
+            with open(path, 'rb') as f:
+                try:
+                    data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                except ValueError:
+                    # An empty file cannot be mapped.
+                    return []
+        except IOError as e:
+            self._log.warning("Error opening file: %s, %s", path, e)
+            return []
+
+        try:
+            rows = self._search(path, data)
+        finally:
+            data.close()
+
+        self._log.debug("Found %s words in %s", len(rows), path)
+        return rows
+
+    def _search(self, path, data):
+        rows = []
+        weight = self._matrix.weight
+
+        if self._regex:
+            for match in self._regex.finditer(data):
+                word = match.group().decode('utf-8', 'replace')
+                rows.append([path, match.start(), self.KEYWORD, word,
+                             "{:.2f}".format(weight(word.lower()))])
+
+        if self._matrix.pairs:
+            threshold = self._options.weight
+            # Words repeat a lot within a file so each is only weighed once.
+            weights = {}
+
+            for match in self._REGEX_WORD.finditer(data):
+                word = match.group().decode('ascii').lower()
+                value = weights.get(word)
+
+                if value is None:
+                    value = weights[word] = weight(word)
+
+                if value >= threshold:
+                    rows.append([path, match.start(), self.PROBABLE, word,
+                                 "{:.2f}".format(value)])
+
+        rows.sort(key=lambda row: row[1])
+        return rows
+
+
+class _SearchTransform(Transform):
+
+    def __init__(self, log, search, executor, workers):
+        batchSize = 8 if executor == self.PROCESS else 1
+        super(_SearchTransform, self).__init__(log, executor, workers,
+                                               batchSize)
+        self._search = search
+
+    def process(self, path):
+        return self._search.searchFile(path)
 
-    def __init__(self):
-        pass
+    @classmethod
+    def name(self):
+        return 'search'
 
 
@@ -17,9 +17,10 @@ import os
 import stat
 import time
 import hashlib
-import csv
 from collections import OrderedDict
 
+from .pipeline import Pipeline, Transform, FileSource, CSVSink
+
 __version__ = '1.0.0'
 __version_info__ = tuple([ int(num) for num in __version__.split('.')])
 
@@ -47,23 +48,28 @@ class WalkerUtilities:
 
     def walkPath(self):
         """
-        Walk the path generating info for each file found.
+        Walk the path generating info for each file found. The files are
+        read and hashed by the executor and workers given in the options,
+        the rows are written in the order the files were found.
         """
         processCount = 0
+        options = self._options
+
+        if not options.noop:
+            sink = CSVSink(self._log, options.report_path,
+                           RowContainer.HEADERS, flush=True)
+            pipeline = Pipeline(
+                self._log, FileSource(self._log, options.dir_path,
+                                      self.__handleError),
+                [_FileInfoTransform(self._log, self, options.executor,
+                                    options.workers)],
+                sink, options.queue_size, options.timing)
+            pipeline.run()
 
-        if not self._options.noop:
-            with open(self._options.report_path, 'w', newline='',
-                      encoding='utf-8') as f:
-                writer = csv.writer(f, delimiter=',', quoting=csv.QUOTE_ALL)
-                writer.writerow(RowContainer.HEADERS)
+            if options.timing:
+                pipeline.report()
 
-                for root, dirs, files in os.walk(self._options.dir_path,
-                                                 onerror=self.__handleError):
-                    for each in files:
-                        row = self._generateFileInfo(root, each)
-                        writer.writerow(row)
-                        processCount += 1
-                        f.flush()
+            processCount = sink.count
 
         return processCount
 
@@ -121,9 +127,10 @@ class RowContainer:
     This class stores the values for a row of data, it also hold the headers
     used in the CVS output file.
     """
-    HEADERS = ['File', 'Path', 'Type', 'Size', 'Modified Time (ISO)',
-               'Access Time (ISO)', 'Created Time (ISO)', "{}", 'Owner',
-               'Group', 'Mode']
+    _HEADERS = ('File', 'Path', 'Type', 'Size', 'Modified Time (ISO)',
+                'Access Time (ISO)', 'Created Time (ISO)', "{}", 'Owner',
+                'Group', 'Mode')
+    HEADERS = list(_HEADERS)
     __LOCAL_FUNC = ('atime', 'mtime', 'ctime', 'mode')
 
     def __init__(self, log):
@@ -145,8 +152,8 @@ class RowContainer:
 
     @classmethod
     def setHashHeader(self, value):
-        idx = self.HEADERS.index('{}')
-        self.HEADERS[idx] = self.HEADERS[idx].format(value)
+        # Formatted from the template so it can be set more than once.
+        self.HEADERS[:] = [header.format(value) for header in self._HEADERS]
 
     def serialize(self):
         row = []
@@ -172,3 +179,21 @@ class RowContainer:
 
         setattr(self, name, value)
         self._log.debug("Set '%s' to '%s'", name, value)
+
+
+class _FileInfoTransform(Transform):
+
+    def __init__(self, log, walker, executor, workers):
+        # Files are handed to process workers in batches to keep the
+        # inter-process overhead small.
+        batchSize = 16 if executor == self.PROCESS else 1
+        super(_FileInfoTransform, self).__init__(log, executor, workers,
+                                                 batchSize)
+        self._walker = walker
+
+    def process(self, path):
+        return self._walker._generateFileInfo(*os.path.split(path))
+
+    @classmethod
+    def name(self):
+        return 'file-info'
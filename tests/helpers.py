@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+#
+# tests/helpers.py
+#
+# by: Carl J. Nobile
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+#
+
+import socket
+import struct
+import logging
+
+TCP = socket.IPPROTO_TCP
+UDP = socket.IPPROTO_UDP
+ICMP = socket.IPPROTO_ICMP
+LOG = logging.getLogger('tests')
+
+
+def ipPacket(protocol=UDP, src='10.0.0.2', dst='10.0.0.1', sport=40000,
+             dport=80, fragment=0, flags=0x18, payload=b'data'):
+    """
+    Build a raw IPv4 packet starting at the IP header.
+    """
+    if protocol == TCP:
+        transport = struct.pack('!HHLLBBHHH', sport, dport, 1, 0, 5 << 4,
+                                flags, 65535, 0, 0)
+    elif protocol == UDP:
+        transport = struct.pack('!HHHH', sport, dport, 8 + len(payload), 0)
+    else:
+        transport = struct.pack('!BBHHH', 8, 0, 0, 1, 1)
+
+    data = transport + payload
+    return struct.pack('!BBHHHBBH4s4s', 0x45, 0, 20 + len(data), 1,
+                       fragment, 64, protocol, 0, socket.inet_aton(src),
+                       socket.inet_aton(dst)) + data
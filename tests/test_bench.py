@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+#
+# tests/test_bench.py
+#
+# by: Carl J. Nobile
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+#
+
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+import subprocess
+
+from forensics.bench import BenchRunner
+
+from helpers import LOG
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def results(**medians):
+    return {'seed': 0, 'scale': 1.0, 'python': '3.11.7',
+            'implementation': 'CPython',
+            'scenarios': dict([(name, {'median': median})
+                               for name, median in medians.items()])}
+
+
+class TestCompare(unittest.TestCase):
+
+    def test_thresholds(self):
+        baseline = results(same=1.0, faster=1.0, slower=1.0, edge=1.0,
+                           gone=1.0)
+        current = results(same=1.0625, faster=0.75, slower=1.25,
+                          edge=1.125, new=1.0)
+        comparison = dict([(item[0], item) for item in BenchRunner.compare(
+            current, baseline, 0.125)])
+        self.assertEqual(sorted(comparison), ['edge', 'faster', 'new',
+                                              'same', 'slower'])
+        self.assertEqual(comparison['same'][4], BenchRunner.SAME)
+        self.assertEqual(comparison['faster'][4], BenchRunner.FASTER)
+        self.assertEqual(comparison['slower'][4], BenchRunner.SLOWER)
+        self.assertEqual(comparison['slower'][3], 0.25)
+        self.assertEqual(comparison['slower'][1:3], (1.0, 1.25))
+        # Exactly at the threshold is not a change.
+        self.assertEqual(comparison['edge'][4], BenchRunner.SAME)
+        self.assertEqual(comparison['new'], ('new', None, 1.0, None,
+                                             BenchRunner.NEW))
+
+    def test_threshold_value(self):
+        baseline = results(scenario=1.0)
+        current = results(scenario=1.25)
+        self.assertEqual(BenchRunner.compare(current, baseline, 0.3)[0][4],
+                         BenchRunner.SAME)
+        self.assertEqual(BenchRunner.compare(current, baseline, 0.2)[0][4],
+                         BenchRunner.SLOWER)
+
+    def test_mismatches(self):
+        baseline = results()
+        current = results()
+        self.assertEqual(BenchRunner.mismatches(current, baseline), [])
+        current['scale'] = 2.0
+        current['python'] = '3.12.0'
+        self.assertEqual(BenchRunner.mismatches(current, baseline),
+                         ['scale', 'python'])
+
+
+class TestBenchRunner(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+
+    def test_invalid_scenario(self):
+        self.assertRaises(ValueError, BenchRunner, LOG, ['no-such-bench'])
+
+    def test_invalid_repeat(self):
+        self.assertRaises(ValueError, BenchRunner, LOG, repeat=0)
+        self.assertRaises(ValueError, BenchRunner, LOG, warmup=-1)
+
+    def test_save_load(self):
+        runner = BenchRunner(LOG, ['keywords-string'], repeat=2, warmup=0,
+                             scale=0.01, workdir=self.tmpdir)
+        current = runner.run()
+        result = current['scenarios']['keywords-string']
+        self.assertEqual(len(result['times']), 2)
+        self.assertGreater(result['ops'], 0)
+        path = os.path.join(self.tmpdir, 'bench.json')
+        BenchRunner.save(current, path)
+        self.assertEqual(BenchRunner.load(path), current)
+        self.assertEqual(BenchRunner.compare(current, BenchRunner.load(path)),
+                         [('keywords-string', result['median'],
+                           result['median'], 0.0, BenchRunner.SAME)])
+
+
+class TestBenchCommand(unittest.TestCase):
+    ARGS = ['-q', '-s', 'keywords-string', '--scale', '0.01', '-r', '1',
+            '-w', '0']
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+        self.path = os.path.join(self.tmpdir, 'bench.json')
+
+    def _run(self, *args):
+        return subprocess.run(
+            [sys.executable, '-m', 'forensics.bench'] + self.ARGS +
+            list(args), cwd=BASE_DIR).returncode
+
+    def _baseline(self, median):
+        baseline = BenchRunner.load(self.path)
+        baseline['scenarios']['keywords-string']['median'] = median
+        BenchRunner.save(baseline, self.path)
+
+    def test_exit_code(self):
+        self.assertEqual(self._run('-o', self.path), 0)
+        # Against a much faster baseline the run is slower and exits 2.
+        self._baseline(1e-9)
+        self.assertEqual(self._run('-b', self.path), 2)
+        # Faster than the baseline is not a failure.
+        self._baseline(1000.0)
+        self.assertEqual(self._run('-b', self.path), 0)
+
+    def test_invalid_scenario(self):
+        self.assertEqual(self._run('-s', 'no-such-bench'), 1)
+
+    def test_invalid_repeat(self):
+        self.assertEqual(self._run('-r', '0'), 1)
+        self.assertEqual(self._run('-w', '-1'), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
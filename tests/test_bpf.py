@@ -0,0 +1,220 @@
+# -*- coding: utf-8 -*-
+#
+# tests/test_bpf.py
+#
+# by: Carl J. Nobile
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+#
+
+import sys
+import socket
+import struct
+import itertools
+import unittest
+
+from forensics.bpf import BPFFilter
+from forensics.network import PacketFilter
+
+from helpers import LOG, TCP, UDP, ICMP, ipPacket
+
+
+def runProgram(program, packet, pktType=0):
+    """
+    Run a classic BPF program the way the kernel would, only the
+    instructions BPFFilter emits are supported.
+    """
+    acc = x = pc = 0
+
+    while True:
+        code, jt, jf, k = program[pc]
+        pc += 1
+
+        if code == BPFFilter.LD_W_ABS:
+            if k == BPFFilter.SKF_AD_PKTTYPE:
+                acc = pktType
+            elif k + 4 > len(packet):
+                return 0
+            else:
+                acc = struct.unpack_from('!L', packet, k)[0]
+        elif code == BPFFilter.LD_H_ABS:
+            if k + 2 > len(packet):
+                return 0
+
+            acc = struct.unpack_from('!H', packet, k)[0]
+        elif code == BPFFilter.LD_B_ABS:
+            if k + 1 > len(packet):
+                return 0
+
+            acc = packet[k]
+        elif code == BPFFilter.LD_H_IND:
+            if x + k + 2 > len(packet):
+                return 0
+
+            acc = struct.unpack_from('!H', packet, x + k)[0]
+        elif code == BPFFilter.LDX_B_MSH:
+            x = (packet[k] & 0x0f) * 4
+        elif code == BPFFilter.JMP_JEQ_K:
+            pc += jt if acc == k else jf
+        elif code == BPFFilter.JMP_JSET_K:
+            pc += jt if acc & k else jf
+        elif code == BPFFilter.RET_K:
+            return k
+        else:
+            raise ValueError("Unsupported BPF code {:#x}".format(code))
+
+
+class TestBPFCompile(unittest.TestCase):
+    PROTOCOLS = ('TCP', 'UDP')
+    ADDRESSES = ('10.0.0.1', '10.0.0.3')
+    PORTS = (53, 443)
+    PACKETS = [
+        ipPacket(TCP, dst='10.0.0.1', dport=443),
+        ipPacket(UDP, dst='10.0.0.3', dport=53),
+        ipPacket(UDP, dst='10.0.0.1', dport=80),
+        ipPacket(TCP, dst='10.0.0.9', dport=53),
+        ipPacket(ICMP, dst='10.0.0.1'),
+        ipPacket(UDP, dst='10.0.0.1', dport=53, fragment=0x2000),
+        ipPacket(UDP, dst='10.0.0.1', dport=53, fragment=0x0010),
+        ipPacket(UDP, dst='10.0.0.2', sport=53, dport=1024),
+        ipPacket(TCP, dst='10.0.0.1', dport=443)[:26],
+        ipPacket(TCP, dst='10.0.0.9', fragment=0x0003),
+        ]
+
+    def _filter(self, protocols, addresses, ports, incomingOnly=False):
+        return BPFFilter(LOG, PacketFilter(
+            self.PROTOCOLS if protocols else (),
+            self.ADDRESSES if addresses else (),
+            self.PORTS if ports else ()), incomingOnly)
+
+    def test_no_criteria(self):
+        self.assertEqual(self._filter(False, False, False).compile(), [
+            (BPFFilter.RET_K, 0, 0, BPFFilter.SNAP_LENGTH),
+            (BPFFilter.RET_K, 0, 0, 0)])
+
+    def test_program(self):
+        tcp, udp = sorted((TCP, UDP))
+        addr1, addr2 = [struct.unpack('!L', socket.inet_aton(addr))[0]
+                        for addr in self.ADDRESSES]
+        self.assertEqual(self._filter(True, True, True).compile(), [
+            (BPFFilter.LD_B_ABS, 0, 0, 9),
+            (BPFFilter.JMP_JEQ_K, 1, 0, tcp),
+            (BPFFilter.JMP_JEQ_K, 0, 13, udp),
+            (BPFFilter.LD_W_ABS, 0, 0, 16),
+            (BPFFilter.JMP_JEQ_K, 1, 0, addr1),
+            (BPFFilter.JMP_JEQ_K, 0, 10, addr2),
+            (BPFFilter.LD_B_ABS, 0, 0, 9),
+            (BPFFilter.JMP_JEQ_K, 1, 0, TCP),
+            (BPFFilter.JMP_JEQ_K, 0, 7, UDP),
+            (BPFFilter.LD_H_ABS, 0, 0, 6),
+            (BPFFilter.JMP_JSET_K, 5, 0, 0x1fff),
+            (BPFFilter.LDX_B_MSH, 0, 0, 0),
+            (BPFFilter.LD_H_IND, 0, 0, 2),
+            (BPFFilter.JMP_JEQ_K, 1, 0, 53),
+            (BPFFilter.JMP_JEQ_K, 0, 1, 443),
+            (BPFFilter.RET_K, 0, 0, BPFFilter.SNAP_LENGTH),
+            (BPFFilter.RET_K, 0, 0, 0)])
+
+    def test_combinations(self):
+        """
+        Every combination of criteria accepts the same packets as the
+        PacketFilter it was compiled from, apart from those the filter
+        rejects as fragments or short.
+        """
+        for combination in itertools.product((False, True), repeat=3):
+            bpf = self._filter(*combination)
+            program = bpf.compile()
+            last = len(program) - 1
+
+            # Jumps only go forward and stay inside the program.
+            for idx, (code, jt, jf, k) in enumerate(program):
+                if code != BPFFilter.RET_K:
+                    self.assertLessEqual(idx + 1 + max(jt, jf), last)
+
+            for packet in self.PACKETS:
+                accepted = runProgram(program, packet) > 0
+                reason = bpf._filter.reject(packet)
+
+                # Fragments and truncated packets may be left for the
+                # PacketFilter to count.
+                if reason not in ('fragment', 'short'):
+                    self.assertEqual(accepted, reason is None,
+                                     (combination, packet))
+
+    def test_incoming_only(self):
+        program = self._filter(False, False, True, True).compile()
+        self.assertEqual(program[:2], [
+            (BPFFilter.LD_W_ABS, 0, 0, BPFFilter.SKF_AD_PKTTYPE),
+            (BPFFilter.JMP_JEQ_K, len(program) - 3, 0,
+             BPFFilter.PACKET_OUTGOING)])
+        packet = ipPacket(dport=53)
+        self.assertTrue(runProgram(program, packet))
+        self.assertFalse(runProgram(program, packet,
+                                    BPFFilter.PACKET_OUTGOING))
+
+    def test_jump_offset(self):
+        # Jumping over 255 port compares is out of range.
+        bpf = BPFFilter(LOG, PacketFilter(
+            ('UDP',), ('10.0.0.1',), range(1, 300)))
+
+        with self.assertRaises(ValueError) as cm:
+            bpf.compile()
+
+        self.assertIn("jump offset", str(cm.exception))
+        bpf = BPFFilter(LOG, PacketFilter(ports=range(1, 250)))
+        self.assertEqual(len(bpf.compile()), 249 + 9)
+
+
+def _rawSocket():
+    try:
+        return socket.socket(socket.AF_INET, socket.SOCK_RAW, UDP)
+    except PermissionError:
+        return None
+
+
+@unittest.skipUnless(sys.platform.startswith('linux'),
+                     "Kernel socket filters are only supported on Linux.")
+class TestBPFAttach(unittest.TestCase):
+
+    def setUp(self):
+        self.sock = _rawSocket()
+
+        if self.sock is None:
+            self.skipTest("A raw socket needs CAP_NET_RAW.")
+
+        self.addCleanup(self.sock.close)
+        self.sender = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.addCleanup(self.sender.close)
+        # Bound but never read ports, so nothing else on the host uses them.
+        self.ports = []
+
+        for idx in range(2):
+            receiver = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            receiver.bind(('127.0.0.1', 0))
+            self.addCleanup(receiver.close)
+            self.ports.append(receiver.getsockname()[1])
+
+    def test_attach(self):
+        match, other = self.ports
+        bpf = BPFFilter(LOG, PacketFilter(('UDP',), ('127.0.0.1',),
+                                          (match,)))
+        self.assertEqual(bpf.attach(self.sock), bpf.compile())
+        self.sender.sendto(b'other', ('127.0.0.1', other))
+        self.sender.sendto(b'match', ('127.0.0.1', match))
+        self.sock.settimeout(2.0)
+        packet = self.sock.recv(65535)
+        self.assertEqual(struct.unpack_from('!H', packet, 22)[0], match)
+        self.assertTrue(packet.endswith(b'match'))
+        # Nothing else made it through the filter.
+        self.sock.settimeout(0.2)
+        self.assertRaises(socket.timeout, self.sock.recv, 65535)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,191 @@
+# -*- coding: utf-8 -*-
+#
+# tests/test_capture.py
+#
+# by: Carl J. Nobile
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+#
+
+import socket
+import struct
+import unittest
+
+from forensics.capture import CaptureBase, SocketCapture, BatchCapture
+
+from helpers import LOG, UDP
+
+
+class LoopbackMixin(object):
+    """
+    A raw UDP socket and a port on the loopback nobody reads, so the test
+    datagrams can be picked out of any other UDP traffic on the host.
+    """
+    COUNT = 10
+
+    def setUp(self):
+        try:
+            self.sock = socket.socket(socket.AF_INET, socket.SOCK_RAW, UDP)
+        except PermissionError:
+            self.skipTest("A raw socket needs CAP_NET_RAW.")
+
+        self.addCleanup(self.sock.close)
+        # A receive timeout so a lost datagram fails instead of hanging.
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVTIMEO,
+                             struct.pack('ll', 2, 0))
+        receiver = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        receiver.bind(('127.0.0.1', 0))
+        self.addCleanup(receiver.close)
+        self.port = receiver.getsockname()[1]
+        self.sender = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.addCleanup(self.sender.close)
+        self.payloads = [
+            "datagram {}".format(idx).encode() * (idx + 1)
+            for idx in range(self.COUNT)]
+
+    def _send(self):
+        for payload in self.payloads:
+            self.sender.sendto(payload, ('127.0.0.1', self.port))
+
+    def _ours(self, packet):
+        return (len(packet) >= 28 and
+                struct.unpack_from('!H', packet, 22)[0] == self.port)
+
+    def _idle(self, capture):
+        # Nothing is sent, so IDLE arrives after any other host traffic.
+        capture.TICK = 0.1
+
+        for item in capture.packets():
+            if item == capture.IDLE:
+                break
+
+        self.assertEqual(item, capture.IDLE)
+
+
+class TestSocketCapture(LoopbackMixin, unittest.TestCase):
+
+    def test_packets(self):
+        self._send()
+        received = []
+
+        for timestamp, packet in SocketCapture(LOG, self.sock).packets():
+            self.assertIsNone(timestamp)
+            self.assertIsNotNone(packet, "A datagram was lost.")
+
+            if self._ours(packet):
+                received.append(bytes(packet[28:]))
+
+                if len(received) == self.COUNT:
+                    break
+
+        self.assertEqual(received, self.payloads)
+
+    def test_idle(self):
+        self._idle(SocketCapture(LOG, self.sock))
+
+
+@unittest.skipUnless(BatchCapture.available(), "recvmmsg is not available.")
+class TestBatchCapture(LoopbackMixin, unittest.TestCase):
+    BATCH = 4
+
+    def test_packets(self):
+        self._send()
+        capture = BatchCapture(LOG, self.sock, self.BATCH)
+        views = []
+        received = []
+
+        for timestamp, packet in capture.packets():
+            self.assertIsNone(timestamp)
+            self.assertIsNotNone(packet, "A datagram was lost.")
+
+            if self._ours(packet):
+                self.assertTrue(packet.readonly)
+                views.append(packet)
+                # The memoryview is only valid until the next packet.
+                received.append(bytes(packet[28:]))
+
+                if len(received) == self.COUNT:
+                    break
+
+        self.assertEqual(received, self.payloads)
+        # Every batch is received into the same buffer pool, so the view of
+        # the first packet now shows the start of the first packet of the
+        # last batch.
+        last = (self.COUNT - 1) // self.BATCH * self.BATCH
+        self.assertEqual(bytes(views[0][28:]),
+                         self.payloads[last][:len(self.payloads[0])])
+
+    def test_idle(self):
+        self._idle(BatchCapture(LOG, self.sock, self.BATCH))
+
+    def test_invalid_batch(self):
+        for batch in (0, -1):
+            self.assertRaises(ValueError, BatchCapture, LOG, self.sock, batch)
+
+
+class TestKernelStatistics(LoopbackMixin, unittest.TestCase):
+
+    def test_not_packet_socket(self):
+        self.assertIsNone(CaptureBase(LOG, self.sock).kernelStatistics())
+
+    @unittest.skipUnless(hasattr(socket, 'AF_PACKET'),
+                         "Packet sockets are Linux only.")
+    def test_packet_socket(self):
+        sock = socket.socket(socket.AF_PACKET, socket.SOCK_DGRAM,
+                             socket.htons(0x0800))
+        self.addCleanup(sock.close)
+        sock.bind(('lo', 0))
+        capture = CaptureBase(LOG, sock)
+        self._send()
+        packets, drops = capture.kernelStatistics()
+        # The datagrams are seen twice on the loopback, sent and received.
+        self.assertGreaterEqual(packets, self.COUNT)
+        self.assertEqual(drops, 0)
+        # The kernel resets its counters on read, the totals are kept.
+        self._send()
+        self.assertGreaterEqual(capture.kernelStatistics()[0],
+                                packets + self.COUNT)
+        sock.close()
+        self.assertGreaterEqual(capture.kernelStatistics()[0],
+                                packets + self.COUNT)
+
+
+class TestReceiveBuffer(LoopbackMixin, unittest.TestCase):
+    COUNT = 400
+    SIZE = 4 * 1024 * 1024
+
+    def test_invalid_size(self):
+        with self.assertRaises(ValueError):
+            CaptureBase(LOG, self.sock).setReceiveBuffer(0)
+
+    def test_burst(self):
+        """
+        A burst sent before the capture reads anything is not dropped.
+        """
+        capture = SocketCapture(LOG, self.sock)
+        self.assertGreaterEqual(capture.setReceiveBuffer(self.SIZE),
+                                self.SIZE)
+        self.payloads = [b'x' * 1000] * self.COUNT
+        self._send()
+        received = 0
+
+        for timestamp, packet in capture.packets():
+            self.assertIsNotNone(packet, "A datagram was lost.")
+
+            if self._ours(packet):
+                received += 1
+
+                if received == self.COUNT:
+                    break
+
+        self.assertEqual(received, self.COUNT)
+
+
+if __name__ == '__main__':
+    unittest.main()
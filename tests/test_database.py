@@ -0,0 +1,494 @@
+# -*- coding: utf-8 -*-
+#
+# tests/test_database.py
+#
+# by: Carl J. Nobile
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+#
+
+import io
+import os
+import shutil
+import sqlite3
+import datetime
+import tempfile
+import unittest
+
+from forensics.database import MonitorDB, PartitionedMonitorDB
+
+from helpers import LOG, TCP, UDP
+
+NS = 1000000000
+
+
+class TestConversions(unittest.TestCase):
+
+    def test_nanoseconds(self):
+        self.assertIsNone(MonitorDB.toNanoseconds(None))
+        self.assertEqual(MonitorDB.toNanoseconds(5), 5)
+        self.assertEqual(MonitorDB.toNanoseconds(1.5), 1500000000)
+        self.assertEqual(MonitorDB.toNanoseconds('1970-01-01T00:00:02'),
+                         2 * NS)
+        self.assertEqual(MonitorDB.toNanoseconds(
+            '1970-01-01T01:00:00+01:00'), 0)
+        self.assertEqual(MonitorDB.toNanoseconds(datetime.datetime(
+            1970, 1, 1, 0, 0, 1, 250)), NS + 250000)
+
+    def test_datetime(self):
+        self.assertEqual(MonitorDB.toDatetime(NS + 250000).isoformat(),
+                         '1970-01-01T00:00:01.000250+00:00')
+
+    def test_address(self):
+        value = MonitorDB.addressToInt('10.0.0.1')
+        self.assertEqual(value, 0x0a000001)
+        self.assertEqual(MonitorDB.intToAddress(value), '10.0.0.1')
+
+
+class TestMonitorDB(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+        self.path = os.path.join(self.tmpdir, 'monitor.db')
+
+    def _createV0(self):
+        conn = sqlite3.connect(self.path)
+
+        with conn:
+            conn.execute("CREATE TABLE monitor_ip (protocol text, "
+                         "address text, port integer, datetime text)")
+            conn.execute("CREATE TABLE monitor_flow (protocol text, "
+                         "src_addr text, dst_addr text, src_port integer, "
+                         "dst_port integer, first_seen text, last_seen text, "
+                         "packets integer, bytes integer, tcp_flags integer)")
+            conn.executemany("INSERT INTO monitor_ip VALUES (?,?,?,?)", [
+                ('TCP', '10.0.0.2', 80, '1970-01-01T00:00:01+00:00'),
+                ('UDP', '10.0.0.3', 53, '1970-01-01T00:00:02.5'),
+                ])
+            conn.execute("INSERT INTO monitor_flow VALUES "
+                         "(?,?,?,?,?,?,?,?,?,?)", (
+                             'TCP', '10.0.0.2', '10.0.0.1', 40000, 80,
+                             '1970-01-01T00:00:01', '1970-01-01T00:00:03',
+                             3, 1600, 0x13))
+
+        conn.close()
+
+    def _createV1(self):
+        conn = sqlite3.connect(self.path)
+
+        with conn:
+            conn.execute("CREATE TABLE monitor_ip (time_ns integer NOT NULL, "
+                         "protocol integer NOT NULL, address integer NOT "
+                         "NULL, port integer)")
+            conn.execute("CREATE INDEX monitor_ip_address_time ON "
+                         "monitor_ip (address, time_ns, protocol, port)")
+            conn.execute("CREATE INDEX monitor_ip_port_time ON monitor_ip "
+                         "(port, time_ns, protocol, address)")
+            conn.execute("CREATE INDEX monitor_ip_time ON monitor_ip "
+                         "(time_ns)")
+            conn.execute("CREATE TABLE monitor_flow (protocol integer NOT "
+                         "NULL, src_addr integer NOT NULL, dst_addr integer "
+                         "NOT NULL, src_port integer, dst_port integer, "
+                         "first_ns integer NOT NULL, last_ns integer NOT "
+                         "NULL, packets integer, bytes integer, "
+                         "tcp_flags integer)")
+            conn.execute("CREATE INDEX monitor_flow_src_time ON "
+                         "monitor_flow (src_addr, first_ns)")
+            conn.executemany("INSERT INTO monitor_ip VALUES (?,?,?,?)", [
+                (1 * NS, TCP, MonitorDB.addressToInt('10.0.0.2'), 80),
+                (2 * NS, UDP, MonitorDB.addressToInt('10.0.0.3'), 53),
+                ])
+            conn.execute("INSERT INTO monitor_flow VALUES "
+                         "(?,?,?,?,?,?,?,?,?,?)", (
+                             TCP, MonitorDB.addressToInt('10.0.0.2'),
+                             MonitorDB.addressToInt('10.0.0.1'), 40000, 80,
+                             1 * NS, 3 * NS, 3, 1600, 0x13))
+            conn.execute("PRAGMA user_version = 1")
+
+        conn.close()
+
+    def _version(self):
+        conn = sqlite3.connect(self.path)
+
+        try:
+            return conn.execute("PRAGMA user_version").fetchone()[0]
+        finally:
+            conn.close()
+
+    def test_create(self):
+        MonitorDB(LOG, self.path).open().close()
+        self.assertEqual(self._version(), MonitorDB.VERSION)
+
+    def test_migrate(self):
+        self._createV0()
+        db = MonitorDB(LOG, self.path).open()
+
+        try:
+            # Version 0 did not record the destination address.
+            self.assertEqual(list(db.hits()), [
+                (1 * NS, 'TCP', '10.0.0.2', None, 80),
+                (2500000000, 'UDP', '10.0.0.3', None, 53)])
+            self.assertEqual(list(db.hits(address='10.0.0.2')), [])
+            self.assertEqual(list(db.flows()), [
+                ('TCP', '10.0.0.2', '10.0.0.1', 40000, 80, 1 * NS, 3 * NS,
+                 3, 1600, 0x13)])
+            tables = [row[0] for row in db.connection.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'table'")]
+        finally:
+            db.close()
+
+        self.assertEqual(sorted(tables), ['monitor_flow', 'monitor_ip'])
+        self.assertEqual(self._version(), MonitorDB.VERSION)
+
+    def test_migrate_v1(self):
+        self._createV1()
+        db = MonitorDB(LOG, self.path).open()
+
+        try:
+            # Version 1 did not record the destination address.
+            self.assertEqual(list(db.hits()), [
+                (1 * NS, 'TCP', '10.0.0.2', None, 80),
+                (2 * NS, 'UDP', '10.0.0.3', None, 53)])
+            self.assertEqual(list(db.hits(address='10.0.0.2')), [])
+            self.assertEqual(list(db.flows(address='10.0.0.1')), [
+                ('TCP', '10.0.0.2', '10.0.0.1', 40000, 80, 1 * NS, 3 * NS,
+                 3, 1600, 0x13)])
+            db.insertPacket(3 * NS, TCP, '10.0.0.2', '10.0.0.1', 443)
+            self.assertEqual(list(db.hits(address='10.0.0.1')), [
+                (3 * NS, 'TCP', '10.0.0.2', '10.0.0.1', 443)])
+            names = dict([(name, kind) for kind, name in
+                          db.connection.execute(
+                              "SELECT type, name FROM sqlite_master "
+                              "WHERE name NOT LIKE 'sqlite_%'")])
+        finally:
+            db.close()
+
+        self.assertEqual(names, {
+            'monitor_ip': 'table', 'monitor_flow': 'table',
+            'monitor_ip_dst_time': 'index', 'monitor_ip_port_time': 'index',
+            'monitor_ip_time': 'index', 'monitor_flow_dst_time': 'index',
+            'monitor_flow_port_time': 'index', 'monitor_flow_time': 'index'})
+        self.assertEqual(self._version(), MonitorDB.VERSION)
+
+    def test_read_only(self):
+        self._createV0()
+
+        with open(self.path, 'rb') as f:
+            original = f.read()
+
+        db = MonitorDB(LOG, self.path).open(readOnly=True)
+
+        try:
+            stream = io.StringIO()
+            db.dump(stream)
+            self.assertIn("datetime text", stream.getvalue())
+            # An old schema can not be queried without migrating it.
+            self.assertRaises(ValueError, list, db.hits())
+            self.assertRaises(sqlite3.OperationalError,
+                              db.connection.execute,
+                              "DELETE FROM monitor_ip")
+        finally:
+            db.close()
+
+        with open(self.path, 'rb') as f:
+            self.assertEqual(f.read(), original)
+
+        self.assertEqual(self._version(), 0)
+
+    def test_read_only_missing(self):
+        db = MonitorDB(LOG, self.path)
+        self.assertRaises(sqlite3.OperationalError, db.open, True)
+        self.assertFalse(os.path.exists(self.path))
+
+    def test_newer_version(self):
+        conn = sqlite3.connect(self.path)
+        conn.execute("PRAGMA user_version = {}".format(
+            MonitorDB.VERSION + 1))
+        conn.close()
+
+        for readOnly in (False, True):
+            self.assertRaises(ValueError, MonitorDB(LOG, self.path).open,
+                              readOnly)
+
+    def test_hits(self):
+        db = MonitorDB(LOG, self.path).open()
+
+        try:
+            db.insertPacket(1 * NS, TCP, '10.0.0.2', '10.0.0.1', 80)
+            db.insertPacket(2 * NS, UDP, '10.0.0.3', '10.0.0.1', 53)
+            db.insertPacket(3 * NS, TCP, '10.0.0.1', '10.0.0.3', 443)
+            # The address matches the destination, as the capture filter.
+            self.assertEqual(list(db.hits(address='10.0.0.3')), [
+                (3 * NS, 'TCP', '10.0.0.1', '10.0.0.3', 443)])
+            self.assertEqual(list(db.hits(address='10.0.0.1')), [
+                (1 * NS, 'TCP', '10.0.0.2', '10.0.0.1', 80),
+                (2 * NS, 'UDP', '10.0.0.3', '10.0.0.1', 53)])
+            self.assertEqual(list(db.hits(protocol='TCP', start=2 * NS)), [
+                (3 * NS, 'TCP', '10.0.0.1', '10.0.0.3', 443)])
+            self.assertEqual(list(db.hits(port=[80, 53], end=2 * NS)), [
+                (1 * NS, 'TCP', '10.0.0.2', '10.0.0.1', 80)])
+        finally:
+            db.close()
+
+    def _rows(self):
+        conn = sqlite3.connect(self.path)
+
+        try:
+            return conn.execute(
+                "SELECT count(*) FROM monitor_ip").fetchone()[0]
+        finally:
+            conn.close()
+
+    def test_batch(self):
+        db = MonitorDB(LOG, self.path, batchSize=3, commitInterval=60).open()
+
+        try:
+            db.insertPacket(1 * NS, TCP, '10.0.0.2', '10.0.0.1', 80)
+            db.insertPacket(2 * NS, TCP, '10.0.0.2', '10.0.0.1', 80)
+            self.assertEqual(self._rows(), 0)
+            db.insertPacket(3 * NS, TCP, '10.0.0.2', '10.0.0.1', 80)
+            self.assertEqual(self._rows(), 3)
+            db.insertPacket(4 * NS, TCP, '10.0.0.2', '10.0.0.1', 80)
+            # Queries see the pending rows.
+            self.assertEqual(len(list(db.hits())), 4)
+            db.insertPacket(5 * NS, TCP, '10.0.0.2', '10.0.0.1', 80)
+            self.assertEqual(self._rows(), 4)
+        finally:
+            db.close()
+
+        self.assertEqual(self._rows(), 5)
+
+    def test_commit_interval(self):
+        db = MonitorDB(LOG, self.path, batchSize=100, commitInterval=1).open()
+
+        try:
+            db.insertPacket(10 * NS, TCP, '10.0.0.2', '10.0.0.1', 80)
+            self.assertEqual(self._rows(), 1)
+            db.insertPacket(10 * NS + 1, TCP, '10.0.0.2', '10.0.0.1', 80)
+            self.assertEqual(self._rows(), 1)
+            db.commit(11 * NS)
+            self.assertEqual(self._rows(), 2)
+            db.insertPacket(11 * NS + 1, TCP, '10.0.0.2', '10.0.0.1', 80)
+            self.assertEqual(self._rows(), 2)
+            db.insertPacket(12 * NS, TCP, '10.0.0.2', '10.0.0.1', 80)
+            self.assertEqual(self._rows(), 4)
+        finally:
+            db.close()
+
+    def test_observer(self):
+        calls = []
+        db = MonitorDB(LOG, self.path, batchSize=2, commitInterval=60,
+                       observer=lambda *args: calls.append(args[:2])).open()
+
+        try:
+            db.insertPacket(1 * NS, TCP, '10.0.0.2', '10.0.0.1', 80)
+            self.assertEqual(db.pendingRows, 1)
+            db.insertPacket(2 * NS, TCP, '10.0.0.2', '10.0.0.1', 80)
+            self.assertEqual(db.pendingRows, 0)
+            db.insertFlows([(UDP, '10.0.0.1', '10.0.0.3', 40001, 53, 2 * NS,
+                             2 * NS, 1, 100, 0)])
+        finally:
+            db.close()
+
+        self.assertEqual(calls, [('monitor_ip', 2), ('monitor_flow', 1)])
+
+    def test_flows(self):
+        flow1 = (TCP, '10.0.0.2', '10.0.0.1', 40000, 80, 1 * NS, 3 * NS, 3,
+                 1600, 0x13)
+        flow2 = (UDP, '10.0.0.1', '10.0.0.3', 40001, 53, 2 * NS, 2 * NS, 1,
+                 100, 0)
+        db = MonitorDB(LOG, self.path).open()
+
+        try:
+            db.insertFlows([flow1, flow2])
+            self.assertEqual(list(db.flows(address='10.0.0.1')),
+                             [('TCP',) + flow1[1:]])
+            self.assertEqual(list(db.flows(port=80)), [('TCP',) + flow1[1:]])
+            self.assertEqual(list(db.flows(start=2 * NS, end=3 * NS)),
+                             [('UDP',) + flow2[1:]])
+        finally:
+            db.close()
+
+
+class TestPartitionedMonitorDB(unittest.TestCase):
+    DAY = 86400 * NS
+    HOUR = 3600 * NS
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+        self.path = os.path.join(self.tmpdir, 'monitor_ip.db')
+
+    def _names(self):
+        return sorted(os.listdir(self.tmpdir))
+
+    def test_daily(self):
+        db = PartitionedMonitorDB(LOG, self.path).open()
+
+        try:
+            db.insertPacket(1 * NS, TCP, '10.0.0.2', '10.0.0.1', 80)
+            db.insertPacket(self.DAY + 1 * NS, UDP, '10.0.0.3', '10.0.0.1', 53)
+            db.insertPacket(2 * NS, TCP, '10.0.0.2', '10.0.0.1', 443)
+        finally:
+            db.close()
+
+        self.assertEqual(self._names(), ['monitor_ip-19700101.db',
+                                         'monitor_ip-19700102.db'])
+
+    def test_hourly(self):
+        db = PartitionedMonitorDB(LOG, self.path,
+                                  rotate=PartitionedMonitorDB.HOURLY).open()
+
+        try:
+            db.insertPacket(1 * NS, TCP, '10.0.0.2', '10.0.0.1', 80)
+            db.insertPacket(self.HOUR, TCP, '10.0.0.2', '10.0.0.1', 80)
+        finally:
+            db.close()
+
+        self.assertEqual(self._names(), ['monitor_ip-1970010100.db',
+                                         'monitor_ip-1970010101.db'])
+
+    def test_max_size(self):
+        db = PartitionedMonitorDB(LOG, self.path, maxSize=1).open()
+        db._SIZE_CHECK = 1
+
+        try:
+            for i in range(3):
+                db.insertPacket(i * NS, TCP, '10.0.0.2', '10.0.0.1', 80)
+        finally:
+            db.close()
+
+        self.assertEqual(self._names(), ['monitor_ip-19700101-1.db',
+                                         'monitor_ip-19700101-2.db',
+                                         'monitor_ip-19700101.db'])
+        self.assertEqual([seq for start, end, seq, path
+                          in db.partitions()], [0, 1, 2])
+        self.assertEqual(len(list(db.hits())), 3)
+
+    def test_prune(self):
+        db = PartitionedMonitorDB(LOG, self.path, retention=86400).open()
+
+        try:
+            db.insertPacket(1 * NS, TCP, '10.0.0.2', '10.0.0.1', 80)
+            db.insertPacket(self.DAY + 1 * NS, TCP, '10.0.0.2', '10.0.0.1', 80)
+            self.assertEqual(len(self._names()), 2)
+            db.insertPacket(2 * self.DAY + 1 * NS, TCP, '10.0.0.2',
+                            '10.0.0.1', 80)
+        finally:
+            db.close()
+
+        self.assertEqual(self._names(), ['monitor_ip-19700102.db',
+                                         'monitor_ip-19700103.db'])
+
+    def test_late_packet(self):
+        db = PartitionedMonitorDB(LOG, self.path, retention=86400).open()
+
+        try:
+            db.insertPacket(1 * NS, TCP, '10.0.0.2', '10.0.0.1', 80)
+            db.insertPacket(2 * self.DAY + 1 * NS, TCP, '10.0.0.2',
+                            '10.0.0.1', 80)
+            # The first partition was removed and is not created again.
+            db.insertPacket(2 * NS, TCP, '10.0.0.2', '10.0.0.1', 80)
+            # Still within the retention period.
+            db.insertPacket(self.DAY + 1 * NS, TCP, '10.0.0.2', '10.0.0.1',
+                            80)
+        finally:
+            db.close()
+
+        self.assertEqual(self._names(), ['monitor_ip-19700102.db',
+                                         'monitor_ip-19700103.db'])
+        self.assertEqual(db.expiredRows, 1)
+        self.assertEqual([row[0] for row in db.hits()],
+                         [self.DAY + 1 * NS, 2 * self.DAY + 1 * NS])
+
+    def test_late_packet_reopened(self):
+        """
+        The retention cutoff is taken from the partitions on disk when the
+        first row is late.
+        """
+        db = PartitionedMonitorDB(LOG, self.path, retention=86400).open()
+
+        try:
+            db.insertPacket(2 * self.DAY + 1 * NS, TCP, '10.0.0.2',
+                            '10.0.0.1', 80)
+        finally:
+            db.close()
+
+        db = PartitionedMonitorDB(LOG, self.path, retention=86400).open()
+
+        try:
+            db.insertPacket(1 * NS, TCP, '10.0.0.2', '10.0.0.1', 80)
+        finally:
+            db.close()
+
+        self.assertEqual(self._names(), ['monitor_ip-19700103.db'])
+        self.assertEqual(db.expiredRows, 1)
+
+    def test_late_flows(self):
+        flow1 = (TCP, '10.0.0.2', '10.0.0.1', 40000, 80, 1 * NS,
+                 2 * NS, 3, 1600, 0x13)
+        flow2 = (UDP, '10.0.0.1', '10.0.0.3', 40001, 53,
+                 2 * self.DAY + 1 * NS, 2 * self.DAY + 1 * NS, 1, 100, 0)
+        db = PartitionedMonitorDB(LOG, self.path, retention=86400).open()
+
+        try:
+            # The expired flow is dropped even when it comes first.
+            db.insertFlows([flow1, flow2])
+            db.insertFlows([flow1])
+        finally:
+            db.close()
+
+        self.assertEqual(self._names(), ['monitor_ip-19700103.db'])
+        self.assertEqual(db.expiredRows, 2)
+        self.assertEqual(list(db.flows()), [('UDP',) + flow2[1:]])
+
+    def test_hits(self):
+        db = PartitionedMonitorDB(LOG, self.path).open()
+
+        try:
+            db.insertPacket(1 * NS, TCP, '10.0.0.2', '10.0.0.1', 80)
+            db.insertPacket(self.DAY + 1 * NS, UDP, '10.0.0.1', '10.0.0.3',
+                            53)
+            db.insertPacket(2 * self.DAY + 1 * NS, TCP, '10.0.0.1',
+                            '10.0.0.3', 443)
+        finally:
+            db.close()
+
+        self.assertEqual([row[0] for row in db.hits()], [
+            1 * NS, self.DAY + 1 * NS, 2 * self.DAY + 1 * NS])
+        self.assertEqual(list(db.hits(address='10.0.0.3',
+                                      end=2 * self.DAY)), [
+            (self.DAY + 1 * NS, 'UDP', '10.0.0.1', '10.0.0.3', 53)])
+        self.assertEqual(len(db.partitions(self.DAY, 2 * self.DAY)), 1)
+
+    def test_flows(self):
+        flow1 = (TCP, '10.0.0.2', '10.0.0.1', 40000, 80, 1 * NS,
+                 self.DAY + 2 * NS, 3, 1600, 0x13)
+        flow2 = (UDP, '10.0.0.1', '10.0.0.3', 40001, 53, self.DAY + 1 * NS,
+                 self.DAY + 1 * NS, 1, 100, 0)
+        db = PartitionedMonitorDB(LOG, self.path).open()
+
+        try:
+            db.insertFlows([flow2])
+            # A flow that started in the previous partition.
+            db.insertFlows([flow1])
+        finally:
+            db.close()
+
+        self.assertEqual(self._names(), ['monitor_ip-19700101.db',
+                                         'monitor_ip-19700102.db'])
+        self.assertEqual(list(db.flows()), [('TCP',) + flow1[1:],
+                                            ('UDP',) + flow2[1:]])
+        self.assertEqual(list(db.flows(port=53, start=self.DAY)),
+                         [('UDP',) + flow2[1:]])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,214 @@
+# -*- coding: utf-8 -*-
+#
+# tests/test_export.py
+#
+# by: Carl J. Nobile
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+#
+
+import io
+import os
+import sys
+import gc
+import csv
+import json
+import shutil
+import subprocess
+import tempfile
+import unittest
+
+from forensics.database import MonitorDB, PartitionedMonitorDB
+from forensics.export import MonitorExport
+
+from helpers import LOG, TCP, UDP
+
+NS = 1000000000
+SCRIPT = os.path.join(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__))), 'bin', 'monitor_ip.py')
+DAY = 86400 * NS
+
+
+class DatabaseMixin(object):
+    PACKETS = (
+        (1 * NS, TCP, '10.0.0.1', '10.0.0.2', 80),
+        (2 * NS + 500000000, UDP, '10.0.0.1', '10.0.0.3', 53),
+        (DAY + 3 * NS, TCP, '10.0.0.1', '10.0.0.3', 443),
+        )
+    FLOWS = (
+        (TCP, '10.0.0.2', '10.0.0.1', 40000, 80, 1 * NS, 3 * NS, 3, 1600,
+         0x13),
+        (UDP, '10.0.0.3', '10.0.0.1', 40001, 53, DAY, DAY, 1, 100, 0),
+        )
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+        self.db = self.createDB(os.path.join(self.tmpdir, 'monitor_ip.db'))
+        self.addCleanup(self.db.close)
+
+        for row in self.PACKETS:
+            self.db.insertPacket(*row)
+
+        self.db.insertFlows(self.FLOWS)
+
+
+class ExportMixin(DatabaseMixin):
+
+    def _export(self, fmt, table=MonitorExport.PACKETS, **kwargs):
+        stream = io.StringIO(newline='')
+        count = MonitorExport(LOG, self.db, fmt, table).export(
+            stream, **kwargs)
+        return count, stream.getvalue()
+
+    def _csv(self, **kwargs):
+        count, text = self._export(MonitorExport.CSV, **kwargs)
+        rows = list(csv.reader(io.StringIO(text, newline='')))
+        self.assertEqual(len(rows) - 1, count)
+        return rows
+
+    def _jsonl(self, **kwargs):
+        count, text = self._export(MonitorExport.JSONL, **kwargs)
+        rows = [json.loads(line) for line in text.splitlines()]
+        self.assertEqual(len(rows), count)
+        return rows
+
+    def test_csv(self):
+        rows = self._csv()
+        self.assertEqual(tuple(rows[0]), MonitorExport.HEADERS['packets'])
+        self.assertEqual(rows[1:], [
+            ['1970-01-01T00:00:01+00:00', 'TCP', '10.0.0.1', '10.0.0.2',
+             '80'],
+            ['1970-01-01T00:00:02.500000+00:00', 'UDP', '10.0.0.1',
+             '10.0.0.3', '53'],
+            ['1970-01-02T00:00:03+00:00', 'TCP', '10.0.0.1', '10.0.0.3',
+             '443']])
+
+        self.assertEqual([MonitorDB.toNanoseconds(row[0])
+                          for row in rows[1:]],
+                         [row[0] for row in self.PACKETS])
+
+    def test_jsonl(self):
+        rows = self._jsonl()
+        self.assertEqual(rows[0], {'time': '1970-01-01T00:00:01+00:00',
+                                   'protocol': 'TCP',
+                                   'src_addr': '10.0.0.1',
+                                   'dst_addr': '10.0.0.2', 'port': 80})
+        self.assertEqual([(MonitorDB.toNanoseconds(row['time']),
+                           row['src_addr'], row['dst_addr'], row['port'])
+                          for row in rows],
+                         [(row[0],) + row[2:] for row in self.PACKETS])
+
+    def test_flows(self):
+        rows = self._jsonl(table=MonitorExport.FLOWS)
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(rows[0], {
+            'protocol': 'TCP', 'src_addr': '10.0.0.2',
+            'dst_addr': '10.0.0.1', 'src_port': 40000, 'dst_port': 80,
+            'first_seen': '1970-01-01T00:00:01+00:00',
+            'last_seen': '1970-01-01T00:00:03+00:00', 'packets': 3,
+            'bytes': 1600, 'tcp_flags': 0x13})
+        rows = self._csv(table=MonitorExport.FLOWS)
+        self.assertEqual(tuple(rows[0]), MonitorExport.HEADERS['flows'])
+        self.assertEqual(rows[2][5:7], ['1970-01-02T00:00:00+00:00'] * 2)
+
+    def test_start_end(self):
+        rows = self._jsonl(start='1970-01-01T00:00:02',
+                           end='1970-01-02T00:00:00')
+        self.assertEqual([row['port'] for row in rows], [53])
+        rows = self._jsonl(start='1970-01-01T00:00:02')
+        self.assertEqual([row['port'] for row in rows], [53, 443])
+        rows = self._jsonl(table=MonitorExport.FLOWS, end='1970-01-02')
+        self.assertEqual([row['dst_port'] for row in rows], [80])
+
+    def test_criteria(self):
+        rows = self._jsonl(address='10.0.0.3', protocol=['TCP'])
+        self.assertEqual([row['port'] for row in rows], [443])
+        rows = self._jsonl(port=[80, 53])
+        self.assertEqual([row['port'] for row in rows], [80, 53])
+        self.assertEqual(self._csv(port=[8080])[1:], [])
+        # The address matches the destination of packets and flows.
+        self.assertEqual(self._jsonl(address='10.0.0.1'), [])
+        rows = self._jsonl(table=MonitorExport.FLOWS, address='10.0.0.1')
+        self.assertEqual([row['dst_port'] for row in rows], [80, 53])
+        self.assertEqual(self._jsonl(table=MonitorExport.FLOWS,
+                                     address='10.0.0.2'), [])
+
+    def test_broken_pipe(self):
+        """
+        The query is closed before the database when the reader of the
+        stream goes away.
+        """
+        class BrokenStream(io.StringIO):
+            def write(self, text):
+                if text.startswith('"1970'):
+                    raise BrokenPipeError()
+
+                return super(BrokenStream, self).write(text)
+
+        unraisable = []
+        self.addCleanup(setattr, sys, 'unraisablehook', sys.unraisablehook)
+        sys.unraisablehook = unraisable.append
+        error = None
+
+        try:
+            MonitorExport(LOG, self.db).export(BrokenStream(newline=''))
+        except BrokenPipeError as e:
+            error = e
+
+        self.assertIsInstance(error, BrokenPipeError)
+        self.db.close()
+        del error
+        gc.collect()
+        self.assertEqual(unraisable, [])
+
+
+
+class TestExportMonitorDB(ExportMixin, unittest.TestCase):
+
+    def createDB(self, path):
+        return MonitorDB(LOG, path).open()
+
+
+class TestExportPartitioned(ExportMixin, unittest.TestCase):
+
+    def createDB(self, path):
+        return PartitionedMonitorDB(LOG, path).open()
+
+
+class TestExportCommand(DatabaseMixin, unittest.TestCase):
+
+    def createDB(self, path):
+        self.path = path
+        return MonitorDB(LOG, path).open()
+
+    def _run(self, *args):
+        output = os.path.join(self.tmpdir, 'export.out')
+        subprocess.run([sys.executable, SCRIPT, '-q', '-d', self.path,
+                        '-o', output] + list(args), check=True)
+
+        with open(output, newline='', encoding='utf-8') as f:
+            return f.read()
+
+    def test_jsonl(self):
+        text = self._run('-e', 'jsonl', '--start', '1970-01-01T00:00:02',
+                         '--end', '1970-01-02T00:00:00')
+        self.assertEqual([json.loads(line) for line in text.splitlines()], [
+            {'time': '1970-01-01T00:00:02.500000+00:00', 'protocol': 'UDP',
+             'src_addr': '10.0.0.1', 'dst_addr': '10.0.0.3', 'port': 53}])
+
+    def test_csv(self):
+        text = self._run('-e', 'csv', '--table', 'flows', '-p', '53')
+        rows = list(csv.reader(io.StringIO(text, newline='')))
+        self.assertEqual(tuple(rows[0]), MonitorExport.HEADERS['flows'])
+        self.assertEqual([row[4] for row in rows[1:]], ['53'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+#
+# tests/test_flows.py
+#
+# by: Carl J. Nobile
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+#
+
+import unittest
+
+from forensics.flows import FlowTable
+
+from helpers import LOG, TCP, UDP
+
+NS = 1000000000
+FLOW1 = (TCP, '10.0.0.2', '10.0.0.1', 40000, 80)
+FLOW2 = (UDP, '10.0.0.3', '10.0.0.1', 40001, 53)
+
+
+class TestFlowTable(unittest.TestCase):
+
+    def setUp(self):
+        self.batches = []
+
+    def _table(self, idle=60, active=1800, batchSize=500, flush=10):
+        return FlowTable(LOG, self.batches.append, idle, active, batchSize,
+                         flush)
+
+    def _flows(self):
+        return [flow for batch in self.batches for flow in batch]
+
+    def test_aggregate(self):
+        table = self._table()
+        table.update(FLOW1, 60, 0x02, 1 * NS)
+        table.update(FLOW1, 1500, 0x10, 2 * NS)
+        table.update(FLOW2, 100, 0, 3 * NS)
+        table.update(FLOW1, 40, 0x01, 4 * NS)
+        self.assertEqual(len(table), 2)
+        self.assertEqual(self.batches, [])
+        table.flushAll()
+        self.assertEqual(len(table), 0)
+        # Flushed in least recently seen order.
+        self.assertEqual(self.batches, [[
+            FLOW2 + (3 * NS, 3 * NS, 1, 100, 0),
+            FLOW1 + (1 * NS, 4 * NS, 3, 1600, 0x13)]])
+
+    def test_idle_timeout(self):
+        table = self._table(idle=10, flush=0)
+        table.update(FLOW1, 10, 0, 1 * NS)
+        table.update(FLOW2, 10, 0, 5 * NS)
+        table.expire(10 * NS)
+        self.assertEqual(self.batches, [])
+        table.expire(11 * NS)
+        self.assertEqual(self._flows(), [FLOW1 + (NS, NS, 1, 10, 0)])
+        self.assertEqual(len(table), 1)
+        # A packet keeps a flow from going idle.
+        table.update(FLOW2, 10, 0, 14 * NS)
+        table.expire(20 * NS)
+        self.assertEqual(len(table), 1)
+
+    def test_active_timeout(self):
+        table = self._table(idle=60, active=30)
+        table.update(FLOW1, 10, 0, 0)
+        table.update(FLOW2, 10, 0, 1 * NS)
+
+        for second in range(10, 30, 10):
+            table.update(FLOW1, 10, 0, second * NS)
+
+        table.update(FLOW1, 20, 0x04, 30 * NS)
+        table.flushAll()
+        flows = self._flows()
+        self.assertEqual(flows[0], FLOW1 + (0, 20 * NS, 3, 30, 0))
+        # The restarted flow is the most recently seen one.
+        self.assertEqual(flows[1:], [FLOW2 + (NS, NS, 1, 10, 0),
+                                     FLOW1 + (30 * NS, 30 * NS, 1, 20, 0x04)])
+
+    def test_batch_size(self):
+        table = self._table(idle=1, batchSize=2, flush=3600)
+        table.update(FLOW1, 10, 0, 0)
+        table.expire(1 * NS)
+        self.assertEqual(self.batches, [])
+        table.update(FLOW2, 10, 0, 2 * NS)
+        table.expire(3 * NS)
+        self.assertEqual(len(self.batches), 1)
+        self.assertEqual(len(self.batches[0]), 2)
+
+    def test_flush_interval(self):
+        table = self._table(idle=1, flush=10)
+        table.update(FLOW1, 10, 0, 0)
+        table.expire(5 * NS)
+        self.assertEqual(self.batches, [])
+        table.expire(10 * NS)
+        self.assertEqual(self._flows(), [FLOW1 + (0, 0, 1, 10, 0)])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+#
+# tests/test_log_utils.py
+#
+# by: Carl J. Nobile
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+#
+
+import io
+import time
+import queue
+import logging
+import unittest
+from unittest import mock
+
+from forensics.log_utils import (
+    DeferredQueueHandler, RateLimitFilter, EpochTime, startLogQueue)
+
+
+class Counted(object):
+    """
+    A log argument that counts how often it is converted to a string.
+    """
+
+    def __init__(self):
+        self.calls = 0
+
+    def __str__(self):
+        self.calls += 1
+        return 'counted'
+
+
+def makeRecord(msg='message', args=(), extra=None):
+    record = logging.LogRecord('test', logging.INFO, __file__, 1, msg, args,
+                               None)
+
+    if extra:
+        record.__dict__.update(extra)
+
+    return record
+
+
+class TestRateLimitFilter(unittest.TestCase):
+
+    def test_rate(self):
+        flt = RateLimitFilter(2)
+
+        with mock.patch('forensics.log_utils.time.monotonic',
+                        return_value=100.5):
+            passed = [flt.filter(makeRecord(extra=RateLimitFilter.EXTRA))
+                      for idx in range(5)]
+
+        self.assertEqual(passed, [True, True, False, False, False])
+        self.assertEqual(flt.suppressed, 3)
+
+        # A new one second window passes records again.
+        with mock.patch('forensics.log_utils.time.monotonic',
+                        return_value=101.0):
+            self.assertTrue(flt.filter(makeRecord(
+                extra=RateLimitFilter.EXTRA)))
+
+        self.assertEqual(flt.suppressed, 3)
+
+    def test_allow(self):
+        flt = RateLimitFilter(2)
+
+        with mock.patch('forensics.log_utils.time.monotonic',
+                        return_value=100.5):
+            allowed = [flt.allow() for idx in range(3)]
+            # Checked records share the window with filtered records.
+            self.assertFalse(flt.filter(makeRecord(
+                extra=RateLimitFilter.EXTRA)))
+
+        self.assertEqual(allowed, [True, True, False])
+        self.assertEqual(flt.suppressed, 2)
+
+    def test_unlimited_records(self):
+        flt = RateLimitFilter(1)
+        self.assertTrue(all([flt.filter(makeRecord()) for idx in range(5)]))
+        self.assertEqual(flt.suppressed, 0)
+
+
+class TestDeferredQueueHandler(unittest.TestCase):
+
+    def test_deferred_formatting(self):
+        handler = DeferredQueueHandler(queue.Queue())
+        counted = Counted()
+        handler.handle(makeRecord('value %s', (counted,)))
+        self.assertEqual(counted.calls, 0)
+        record = handler.queue.get_nowait()
+        self.assertIs(record.args[0], counted)
+        self.assertEqual(record.getMessage(), 'value counted')
+        self.assertEqual(counted.calls, 1)
+
+    def test_dropped(self):
+        handler = DeferredQueueHandler(queue.Queue(2))
+
+        for idx in range(5):
+            handler.handle(makeRecord())
+
+        self.assertEqual(handler.queue.qsize(), 2)
+        self.assertEqual(handler.dropped, 3)
+
+    def test_filter(self):
+        handler = DeferredQueueHandler(queue.Queue())
+        handler.addFilter(RateLimitFilter(1))
+
+        for idx in range(3):
+            handler.handle(makeRecord(extra=RateLimitFilter.EXTRA))
+
+        handler.handle(makeRecord())
+        self.assertEqual(handler.queue.qsize(), 2)
+        self.assertEqual(handler.dropped, 0)
+
+
+class TestStartLogQueue(unittest.TestCase):
+
+    def test_listener(self):
+        log = logging.getLogger('test_log_utils.listener')
+        log.propagate = False
+        log.setLevel(logging.INFO)
+        stream = io.StringIO()
+        log.addHandler(logging.StreamHandler(stream))
+        handler = startLogQueue(log)
+        self.addCleanup(log.removeHandler, handler)
+        self.assertEqual(log.handlers, [handler])
+
+        log.info("packet %s", 1, extra=RateLimitFilter.EXTRA)
+        log.info("done at %s", EpochTime(0))
+        deadline = time.monotonic() + 5
+
+        while 'done' not in stream.getvalue() and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+        self.assertEqual(stream.getvalue().splitlines(), [
+            'packet 1', 'done at 1970-01-01T00:00:00+00:00'])
+
+
+class TestEpochTime(unittest.TestCase):
+
+    def test_str(self):
+        self.assertEqual(str(EpochTime(1500000000)),
+                         '1970-01-01T00:00:01.500000+00:00')
+        self.assertEqual("{}".format(EpochTime(86400 * 1000000000)),
+                         '1970-01-02T00:00:00+00:00')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+#
+# tests/test_metrics.py
+#
+# by: Carl J. Nobile
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+#
+
+import os
+import socket
+import shutil
+import tempfile
+import unittest
+
+from forensics.metrics import MetricsRegistry, MetricsServer
+
+from helpers import LOG
+
+
+class TestMetricsRegistry(unittest.TestCase):
+
+    def test_render(self):
+        registry = MetricsRegistry('test_')
+        counter = registry.counter('packets', "Packets.", ('reason',))
+        counter.labels('port').inc(2)
+        counter.labels('port').inc()
+        counter.labels('address').inc()
+        registry.gauge('depth', "Depth.", func=lambda: 7)
+        text = registry.render()
+        self.assertIn("# HELP test_packets Packets.\n", text)
+        self.assertIn("# TYPE test_packets counter\n", text)
+        self.assertIn('test_packets_total{reason="port"} 3\n', text)
+        self.assertIn('test_packets_total{reason="address"} 1\n', text)
+        self.assertIn("# TYPE test_depth gauge\ntest_depth 7\n", text)
+
+    def test_histogram(self):
+        registry = MetricsRegistry()
+        histogram = registry.histogram('latency', "Latency.",
+                                       buckets=(0.1, 1.0))
+        histogram.observe(0.05)
+        histogram.observe(0.5)
+        histogram.observe(5)
+        text = registry.render()
+        self.assertIn('latency_bucket{le="0.1"} 1\n', text)
+        self.assertIn('latency_bucket{le="1.0"} 2\n', text)
+        self.assertIn('latency_bucket{le="+Inf"} 3\n', text)
+        self.assertIn("latency_sum 5.55\n", text)
+        self.assertIn("latency_count 3\n", text)
+
+
+class ServerMixin(object):
+
+    def _request(self, family, address):
+        sock = socket.socket(family, socket.SOCK_STREAM)
+
+        try:
+            sock.connect(address)
+            sock.sendall(b"GET /metrics HTTP/1.0\r\n\r\n")
+            return b''.join(iter(lambda: sock.recv(4096), b''))
+        finally:
+            sock.close()
+
+    def _registry(self):
+        registry = MetricsRegistry()
+        registry.gauge('up', "Up.", func=lambda: 1)
+        return registry
+
+
+class TestMetricsServerTCP(ServerMixin, unittest.TestCase):
+
+    def test_start_stop(self):
+        server = MetricsServer(LOG, self._registry(), '127.0.0.1:0').start()
+
+        try:
+            response = self._request(socket.AF_INET,
+                                     server._server.server_address)
+        finally:
+            server.stop()
+
+        self.assertTrue(response.startswith(b"HTTP/1.0 200"))
+        self.assertIn(b"\nup 1\n", response)
+
+
+@unittest.skipUnless(hasattr(socket, 'AF_UNIX'),
+                     "Unix domain sockets are not supported.")
+class TestMetricsServerUnix(ServerMixin, unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+        self.path = os.path.join(self.tmpdir, 'metrics.sock')
+
+    def test_start_stop(self):
+        # A stale socket left by an earlier run is replaced.
+        stale = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        stale.bind(self.path)
+        stale.close()
+        server = MetricsServer(LOG, self._registry(),
+                               'unix:' + self.path).start()
+
+        try:
+            self.assertIn(b"\nup 1\n", self._request(socket.AF_UNIX,
+                                                     self.path))
+        finally:
+            server.stop()
+
+        self.assertFalse(os.path.exists(self.path))
+
+    def test_not_a_socket(self):
+        with open(self.path, 'w') as f:
+            f.write("evidence")
+
+        server = MetricsServer(LOG, MetricsRegistry(), 'unix:' + self.path)
+        self.assertRaises(OSError, server.start)
+
+        with open(self.path) as f:
+            self.assertEqual(f.read(), "evidence")
+
+    def test_socket_removed(self):
+        server = MetricsServer(LOG, self._registry(),
+                               'unix:' + self.path).start()
+        os.remove(self.path)
+        server.stop()
+        server.stop()
+
+
+if __name__ == '__main__':
+    unittest.main()
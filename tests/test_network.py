@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+#
+# tests/test_network.py
+#
+# by: Carl J. Nobile
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+#
+
+import unittest
+
+from forensics.network import (
+    IPContainer, TCPContainer, UDPContainer, ICMPContainer, PacketFilter)
+
+from helpers import LOG, TCP, UDP, ICMP, ipPacket
+
+
+class TestPacketFilter(unittest.TestCase):
+
+    def test_no_criteria(self):
+        flt = PacketFilter()
+
+        for protocol in (TCP, UDP, ICMP):
+            self.assertIsNone(flt.reject(ipPacket(protocol)))
+
+    def test_short(self):
+        flt = PacketFilter()
+        self.assertEqual(flt.reject(ipPacket()[:19]), 'short')
+        # The IP header is complete but the ports are cut off.
+        self.assertEqual(PacketFilter(ports=(80,)).reject(ipPacket()[:22]),
+                         'short')
+        # The transport header is cut off.
+        self.assertEqual(flt.reject(ipPacket(TCP, payload=b'')[:26]),
+                         'short')
+        self.assertIsNone(flt.reject(ipPacket(TCP, payload=b'')))
+        self.assertEqual(flt.reject(ipPacket(UDP)[:27]), 'short')
+        self.assertIsNone(flt.reject(ipPacket(UDP, payload=b'')))
+        self.assertEqual(flt.reject(ipPacket(ICMP)[:27]), 'short')
+        # A header length below the minimum IP header.
+        packet = bytearray(ipPacket())
+        packet[0] = 0x44
+        self.assertEqual(flt.reject(packet), 'short')
+        # A protocol without a container has no minimum.
+        self.assertIsNone(flt.reject(ipPacket(47)[:20]))
+
+    def test_protocol(self):
+        flt = PacketFilter(('TCP', 'ICMP'))
+        self.assertIsNone(flt.reject(ipPacket(TCP)))
+        self.assertIsNone(flt.reject(ipPacket(ICMP)))
+        self.assertEqual(flt.reject(ipPacket(UDP)), 'protocol')
+
+    def test_address(self):
+        flt = PacketFilter(addresses=('10.0.0.1', '10.0.0.3'))
+        self.assertIsNone(flt.reject(ipPacket(dst='10.0.0.1')))
+        self.assertIsNone(flt.reject(ipPacket(dst='10.0.0.3')))
+        # The destination address is matched, not the source.
+        self.assertEqual(flt.reject(ipPacket(src='10.0.0.1',
+                                             dst='10.0.0.2')), 'address')
+
+    def test_port(self):
+        flt = PacketFilter(ports=(80, 443))
+        self.assertIsNone(flt.reject(ipPacket(TCP, dport=443)))
+        self.assertIsNone(flt.reject(ipPacket(UDP, dport=80)))
+        self.assertEqual(flt.reject(ipPacket(TCP, sport=80, dport=8080)),
+                         'port')
+        self.assertEqual(flt.reject(ipPacket(ICMP)), 'port')
+
+    def test_fragments(self):
+        # Only the first fragment carries the transport header.
+        for flt in (PacketFilter(), PacketFilter(ports=(80,))):
+            # More fragments set, offset zero, is the first fragment.
+            self.assertIsNone(flt.reject(ipPacket(fragment=0x2000)))
+            self.assertEqual(flt.reject(ipPacket(fragment=0x2001)),
+                             'fragment')
+            self.assertEqual(flt.reject(ipPacket(fragment=0x0100)),
+                             'fragment')
+            # A 20 byte fragment would otherwise pass as a TCP header.
+            self.assertEqual(flt.reject(ipPacket(
+                TCP, fragment=0x0003, payload=b'x' * 20)), 'fragment')
+
+    def test_memoryview(self):
+        # Batched capture passes read only views into its buffer pool.
+        flt = PacketFilter(('UDP',), ('10.0.0.1',), (80,))
+        self.assertIsNone(flt.reject(memoryview(ipPacket()).toreadonly()))
+        self.assertEqual(flt.reject(memoryview(ipPacket(dst='10.0.0.2'))),
+                         'address')
+
+    def test_all_criteria(self):
+        flt = PacketFilter(('UDP',), ('10.0.0.1',), (53,))
+        self.assertIsNone(flt.reject(ipPacket(UDP, dport=53)))
+        self.assertEqual(flt.reject(ipPacket(TCP, dport=53)), 'protocol')
+        self.assertEqual(flt.reject(ipPacket(UDP, dst='10.0.0.9',
+                                             dport=53)), 'address')
+        self.assertEqual(flt.reject(ipPacket(UDP, dport=54)), 'port')
+
+
+class TestContainers(unittest.TestCase):
+
+    def test_ip(self):
+        ipCont = IPContainer(LOG, ipPacket(TCP, fragment=0x2001))
+        self.assertEqual((ipCont.version, ipCont.header_length), (4, 20))
+        self.assertEqual((ipCont.flags, ipCont.fragment_offset), (1, 1))
+        self.assertEqual(ipCont.protocol, TCP)
+        self.assertEqual(ipCont.src_addr, '10.0.0.2')
+        self.assertEqual(ipCont.dst_addr, '10.0.0.1')
+
+    def test_tcp(self):
+        ipCont = IPContainer(LOG, ipPacket(TCP, sport=1234, dport=80))
+        self.assertIs(IPContainer.PROTOCOL_CLASS_MAP[TCP], TCPContainer)
+        tcp = TCPContainer(LOG, ipCont.data)
+        self.assertEqual((tcp.source_port, tcp.destination_port), (1234, 80))
+        self.assertEqual((tcp.ACK, tcp.PSH, tcp.SYN), (1, 1, 0))
+        self.assertEqual(bytes(tcp.data), b'data')
+
+    def test_udp(self):
+        # The data ends at the UDP length, not at the end of the buffer.
+        ipCont = IPContainer(LOG, ipPacket(UDP, sport=1234, dport=53) +
+                             b'padding')
+        self.assertIs(IPContainer.PROTOCOL_CLASS_MAP[UDP], UDPContainer)
+        udp = UDPContainer(LOG, ipCont.data)
+        self.assertEqual((udp.source_port, udp.destination_port), (1234, 53))
+        self.assertEqual(udp.length, 12)
+        self.assertEqual(bytes(udp.data), b'data')
+
+    def test_icmp(self):
+        ipCont = IPContainer(LOG, ipPacket(ICMP))
+        self.assertIs(IPContainer.PROTOCOL_CLASS_MAP[ICMP], ICMPContainer)
+        icmp = ICMPContainer(LOG, ipCont.data)
+        self.assertEqual((icmp.type, icmp.code), (8, 0))
+        self.assertEqual((icmp.identifier, icmp.sequence_number), (1, 1))
+        self.assertIsNone(icmp.source_port)
+        self.assertIsNone(icmp.destination_port)
+        self.assertEqual(ICMPContainer.name(), 'ICMP')
+
+    def test_register(self):
+        classMap = dict(IPContainer.PROTOCOL_CLASS_MAP)
+        self.addCleanup(IPContainer.PROTOCOL_CLASS_MAP.update, classMap)
+        self.addCleanup(IPContainer.PROTOCOL_CLASS_MAP.clear)
+
+        @IPContainer.register(47)
+        class GREContainer(ICMPContainer):
+
+            @classmethod
+            def name(self):
+                return 'GRE'
+
+        self.assertIs(IPContainer.PROTOCOL_CLASS_MAP[47], GREContainer)
+        self.assertIsNone(PacketFilter(('GRE',)).reject(ipPacket(47)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,253 @@
+# -*- coding: utf-8 -*-
+#
+# tests/test_pcap.py
+#
+# by: Carl J. Nobile
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+#
+
+import io
+import os
+import re
+import sys
+import shutil
+import struct
+import subprocess
+import tempfile
+import unittest
+
+from forensics.database import MonitorDB
+from forensics.pcap import PcapReader, PcapCapture
+
+from helpers import LOG, TCP, UDP, ipPacket
+
+ETHERNET = 1
+RAW = 101
+ETHER_HEADER = b'\x00' * 12
+SCRIPT = os.path.join(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__))), 'bin', 'monitor_ip.py')
+
+
+def pcapFile(records, linktype=ETHERNET, order='<', nano=False):
+    magic = 0xa1b23c4d if nano else 0xa1b2c3d4
+    data = struct.pack(order + 'LHHlLLL', magic, 2, 4, 0, 0, 65535, linktype)
+
+    for sec, frac, frame in records:
+        data += struct.pack(order + 'LLLL', sec, frac, len(frame),
+                            len(frame)) + frame
+
+    return data
+
+
+def block(btype, body, order='<'):
+    body += b'\x00' * (-len(body) % 4)
+    length = len(body) + 12
+    return struct.pack(order + 'LL', btype, length) + body + struct.pack(
+        order + 'L', length)
+
+
+def shb(order='<'):
+    return block(0x0a0d0d0a, struct.pack(order + 'LHHq', 0x1a2b3c4d, 1, 0,
+                                         -1), order)
+
+
+def idb(linktype=ETHERNET, tsresol=None, order='<'):
+    body = struct.pack(order + 'HHL', linktype, 0, 65535)
+
+    if tsresol is not None:
+        body += struct.pack(order + 'HHB3x', 9, 1, tsresol)
+        body += struct.pack(order + 'HH', 0, 0)
+
+    return block(1, body, order)
+
+
+def epb(ifid, units, frame, order='<'):
+    return block(6, struct.pack(order + 'LLLLL', ifid, units >> 32,
+                                units & 0xffffffff, len(frame), len(frame))
+                 + frame, order)
+
+
+def spb(frame, order='<'):
+    return block(3, struct.pack(order + 'L', len(frame)) + frame, order)
+
+
+def opb(ifid, units, frame, order='<'):
+    return block(2, struct.pack(order + 'HHLLLL', ifid, 0, units >> 32,
+                                units & 0xffffffff, len(frame), len(frame))
+                 + frame, order)
+
+
+def frames(data):
+    return [(ts, linktype, bytes(frame)) for ts, linktype, frame
+            in PcapReader(LOG, io.BytesIO(data)).frames()]
+
+
+class TestPcapReader(unittest.TestCase):
+
+    def test_empty(self):
+        self.assertEqual(frames(b''), [])
+
+    def test_bad_magic(self):
+        self.assertRaises(ValueError, frames, b'\x00' * 24)
+
+    def test_pcap(self):
+        for order in ('<', '>'):
+            data = pcapFile([(1, 500000, b'one'), (2, 0, b'two')],
+                            order=order)
+            self.assertEqual(frames(data), [
+                (1500000000, ETHERNET, b'one'), (2000000000, ETHERNET, b'two')
+                ])
+
+    def test_pcap_nanoseconds(self):
+        data = pcapFile([(1, 5, b'one')], RAW, nano=True)
+        self.assertEqual(frames(data), [(1000000005, RAW, b'one')])
+
+    def test_pcap_truncated(self):
+        data = pcapFile([(1, 0, b'one'), (2, 0, b'two')])
+        self.assertEqual(frames(data[:-1]), [(1000000000, ETHERNET, b'one')])
+
+    def test_pcapng(self):
+        for order in ('<', '>'):
+            data = (shb(order) + idb(ETHERNET, order=order) +
+                    idb(RAW, 9, order) + epb(0, 1500000, b'one', order) +
+                    epb(1, 7, b'two', order) + spb(b'three', order) +
+                    opb(1, 8, b'four', order))
+            self.assertEqual(frames(data), [
+                (1500000000, ETHERNET, b'one'), (7, RAW, b'two'),
+                (None, ETHERNET, b'three'), (8, RAW, b'four')])
+
+    def test_pcapng_binary_resolution(self):
+        data = shb() + idb(RAW, 0x80 | 10) + epb(0, 3 << 10, b'one')
+        self.assertEqual(frames(data), [(3000000000, RAW, b'one')])
+
+    def test_pcapng_sections(self):
+        # Interfaces are numbered per section.
+        data = (shb() + idb(ETHERNET) + epb(0, 1, b'one') + shb('>') +
+                idb(RAW, order='>') + epb(0, 2, b'two', '>'))
+        self.assertEqual(frames(data), [(1000, ETHERNET, b'one'),
+                                        (2000, RAW, b'two')])
+
+    def test_pcapng_undefined_interface(self):
+        data = (shb() + spb(b'one') + idb(RAW) + epb(3, 1, b'two') +
+                opb(1, 1, b'three') + epb(0, 1, b'four'))
+        self.assertEqual(frames(data), [
+            (None, None, b'one'), (1000, None, b'two'),
+            (1000, None, b'three'), (1000, RAW, b'four')])
+
+
+class TestPcapCapture(unittest.TestCase):
+
+    def _packets(self, data):
+        fd, path = tempfile.mkstemp(suffix='.pcap')
+        self.addCleanup(os.remove, path)
+
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+
+        capture = PcapCapture(LOG, path)
+        packets = [(ts, bytes(packet)) for ts, packet in capture.packets()]
+        return packets, capture.skipped
+
+    def test_ethernet(self):
+        packet = ipPacket()
+        vlan = b'\x81\x00\x00\x01\x88\xa8\x00\x02'
+        data = pcapFile([
+            (1, 0, ETHER_HEADER + b'\x08\x00' + packet),
+            (2, 0, ETHER_HEADER + vlan + b'\x08\x00' + packet),
+            (3, 0, ETHER_HEADER + b'\x86\xdd' + packet),
+            ])
+        self.assertEqual(self._packets(data),
+                         ([(1000000000, packet), (2000000000, packet)], 1))
+
+    def test_short_frames(self):
+        data = pcapFile([
+            (1, 0, b''),
+            (2, 0, ETHER_HEADER),
+            (3, 0, ETHER_HEADER + b'\x08'),
+            (4, 0, ETHER_HEADER + b'\x08\x00'),
+            (5, 0, ETHER_HEADER + b'\x81\x00\x00'),
+            (6, 0, ETHER_HEADER + b'\x81\x00\x00\x01\x08'),
+            (7, 0, ETHER_HEADER + b'\x81\x00\x00\x01\x81\x00'),
+            ])
+        self.assertEqual(self._packets(data), ([], 7))
+
+    def test_raw(self):
+        packet = ipPacket()
+        data = pcapFile([(1, 0, packet), (2, 0, b'\x60' + packet[1:])], RAW)
+        self.assertEqual(self._packets(data), ([(1000000000, packet)], 1))
+
+    def test_undefined_interface(self):
+        packet = ipPacket()
+        data = shb() + spb(packet) + idb(RAW) + epb(0, 1, packet)
+        self.assertEqual(self._packets(data), ([(1000, packet)], 1))
+
+
+class TestPcapReplay(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+
+    def test_malformed_packets(self):
+        """
+        Truncated packets and non-first fragments are rejected without
+        stopping the replay.
+        """
+        path = os.path.join(self.tmpdir, 'replay.pcap')
+        dbPath = os.path.join(self.tmpdir, 'replay.db')
+        data = pcapFile([
+            (1, 0, ipPacket(TCP, dport=80)),
+            # The TCP header is cut off after the ports.
+            (2, 0, ipPacket(TCP, dport=81)[:26]),
+            # A non-first fragment long enough to pass as a TCP header.
+            (3, 0, ipPacket(TCP, dport=82, fragment=0x0003,
+                            payload=b'x' * 20)),
+            (4, 0, ipPacket(UDP, dport=53)),
+            ], RAW)
+
+        with open(path, 'wb') as f:
+            f.write(data)
+
+        subprocess.run([sys.executable, SCRIPT, '-q', '-r', path, '-d',
+                        dbPath], check=True)
+        db = MonitorDB(LOG, dbPath).open(readOnly=True)
+        self.addCleanup(db.close)
+        self.assertEqual([(row[1], row[4]) for row in db.hits()],
+                         [('TCP', 80), ('UDP', 53)])
+
+    def test_log_rate(self):
+        """
+        Packet records over the log rate are counted, not logged.
+        """
+        count = 50
+        path = os.path.join(self.tmpdir, 'replay.pcap')
+        logPath = os.path.join(self.tmpdir, 'replay.log')
+        data = pcapFile([(1, idx, ipPacket(UDP, dport=53))
+                         for idx in range(count)], RAW)
+
+        with open(path, 'wb') as f:
+            f.write(data)
+
+        subprocess.run([sys.executable, SCRIPT, '-r', path, '-l', logPath,
+                        '-d', os.path.join(self.tmpdir, 'replay.db'),
+                        '--log-rate', '5'], check=True)
+
+        with open(logPath, encoding='utf-8') as f:
+            text = f.read()
+
+        logged = text.count("Protocol: UDP")
+        suppressed = re.search(r"suppressed by rate limit: (\d+)", text)
+        self.assertIsNotNone(suppressed)
+        self.assertLess(logged, count)
+        self.assertEqual(logged + int(suppressed.group(1)), count)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,246 @@
+# -*- coding: utf-8 -*-
+#
+# tests/test_pipeline.py
+#
+# by: Carl J. Nobile
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+#
+
+import threading
+import unittest
+
+from forensics.pipeline import (
+    Pipeline, Stage, Source, IterSource, CallableTransform, CallableSink)
+
+from helpers import LOG
+
+
+def double(item):
+    return item * 2
+
+
+class StageFailure(Exception):
+    pass
+
+
+def failOnFive(item):
+    if item == 5:
+        raise StageFailure(item)
+
+    return item
+
+
+class FailingSource(Source):
+
+    def items(self):
+        yield 1
+        yield 2
+        raise StageFailure('source')
+
+    @classmethod
+    def name(self):
+        return 'failing-source'
+
+
+class TickSource(Source):
+
+    def items(self):
+        yield 1
+        yield Pipeline.TICK
+        yield 2
+
+    @classmethod
+    def name(self):
+        return 'tick-source'
+
+
+class TickSink(CallableSink):
+
+    def __init__(self, log, func, executor=Stage.INLINE):
+        super(TickSink, self).__init__(log, func, executor)
+        self.ticks = 0
+
+    def tick(self):
+        self.ticks += 1
+
+
+class TestPipeline(unittest.TestCase):
+    EXECUTORS = ((Stage.INLINE, 1), (Stage.THREAD, 1), (Stage.THREAD, 3),
+                 (Stage.PROCESS, 2))
+
+    def _run(self, source, transforms, timing=False):
+        results = []
+        pipeline = Pipeline(LOG, source, transforms,
+                            CallableSink(LOG, results.append), queueSize=4,
+                            timing=timing)
+        return pipeline, pipeline.run(), results
+
+    def test_order(self):
+        for executor, workers in self.EXECUTORS:
+            pipeline, count, results = self._run(
+                IterSource(LOG, range(100)),
+                [CallableTransform(LOG, double, executor, workers, 3)])
+            self.assertEqual(count, 100)
+            self.assertEqual(results, [item * 2 for item in range(100)])
+
+    def test_drop_none(self):
+        pipeline, count, results = self._run(
+            IterSource(LOG, range(10)),
+            [CallableTransform(LOG, lambda item: item if item % 2 else None)])
+        self.assertEqual(results, [1, 3, 5, 7, 9])
+
+    def test_tick(self):
+        for executor in (Stage.INLINE, Stage.THREAD):
+            results = []
+            sink = TickSink(LOG, results.append, executor)
+            pipeline = Pipeline(LOG, TickSource(LOG), [], sink)
+            self.assertEqual(pipeline.run(), 2)
+            self.assertEqual(results, [1, 2])
+            self.assertEqual(sink.ticks, 1)
+
+    def test_timing(self):
+        calls = []
+        transform = CallableTransform(LOG, double, Stage.THREAD, 2, 4)
+        pipeline = Pipeline(
+            LOG, IterSource(LOG, range(20)), [transform],
+            CallableSink(LOG, lambda item: None),
+            hooks=[lambda stage, items, seconds: calls.append(
+                (stage.name(), items))])
+        self.assertEqual(pipeline.run(), 20)
+        self.assertEqual([stage.count for stage in pipeline.stages],
+                         [20, 20, 20])
+        self.assertEqual(sum([items for name, items in calls
+                              if name == transform.name()]), 20)
+        self.assertGreater(transform.seconds, 0)
+        # The inline sink runs in the segment of the transform.
+        self.assertEqual(pipeline.queueDepths(), [(transform.name(), 0)])
+
+        with self.assertLogs(LOG, 'INFO') as cm:
+            pipeline.report()
+
+        self.assertEqual(len(cm.output), 3)
+
+    def test_invalid_executor(self):
+        self.assertRaises(ValueError, CallableTransform, LOG, double,
+                          'fiber')
+
+    def test_transform_failure(self):
+        """
+        The exception raised by a stage reaches 'run', and is logged
+        against that stage, wherever the stage runs.
+        """
+        for timing in (False, True):
+            for executor, workers in self.EXECUTORS:
+                failing = CallableTransform(LOG, failOnFive, executor,
+                                            workers)
+                after = CallableTransform(LOG, double)
+                pipeline = Pipeline(
+                    LOG, IterSource(LOG, range(1000)),
+                    [CallableTransform(LOG, abs), failing, after],
+                    CallableSink(LOG, lambda item: None),
+                    queueSize=4, timing=timing)
+
+                threads = threading.active_count()
+
+                with self.assertLogs(LOG, 'ERROR') as cm:
+                    with self.assertRaises(StageFailure) as ecm:
+                        pipeline.run()
+
+                self.assertEqual(ecm.exception.args, (5,))
+                self.assertEqual(len(cm.output), 1, cm.output)
+                self.assertIn("stage {} failed".format(failing.name()),
+                              cm.output[0])
+                self.assertEqual(threading.active_count(), threads)
+
+    def test_inline_failure_attribution(self):
+        # The failing stage is the second of an inline segment.
+        class First(CallableTransform):
+            pass
+
+        class Second(CallableTransform):
+            pass
+
+        with self.assertLogs(LOG, 'ERROR') as cm:
+            self.assertRaises(StageFailure, Pipeline(
+                LOG, IterSource(LOG, [2, 5]),
+                [First(LOG, failOnFive), Second(LOG, double)]).run)
+
+        self.assertIn("stage First failed", cm.output[0])
+
+        with self.assertLogs(LOG, 'ERROR') as cm:
+            self.assertRaises(StageFailure, Pipeline(
+                LOG, IterSource(LOG, [1, 5]),
+                [First(LOG, abs), Second(LOG, failOnFive)]).run)
+
+        self.assertIn("stage Second failed", cm.output[0])
+
+    def test_source_failure(self):
+        """
+        A failure in the first segment ends the other segments instead of
+        draining a queue it does not have.
+        """
+        for executor, workers in self.EXECUTORS:
+            results = []
+            pipeline = Pipeline(
+                LOG, FailingSource(LOG),
+                [CallableTransform(LOG, double, executor, workers)],
+                CallableSink(LOG, results.append, Stage.THREAD))
+
+            threads = threading.active_count()
+
+            with self.assertLogs(LOG, 'ERROR') as cm:
+                with self.assertRaises(StageFailure) as ecm:
+                    pipeline.run()
+
+            self.assertEqual(ecm.exception.args, ('source',))
+            self.assertIn("stage failing-source failed", cm.output[0])
+            self.assertEqual(results, [2, 4])
+            self.assertEqual(threading.active_count(), threads)
+
+    def test_open_failure(self):
+        class BadOpen(CallableTransform):
+
+            def open(self):
+                raise StageFailure('open')
+
+        closed = []
+
+        class Tracked(CallableTransform):
+
+            def close(self):
+                closed.append(True)
+
+        pipeline = Pipeline(LOG, IterSource(LOG, range(10)), [
+            Tracked(LOG, double), BadOpen(LOG, double)])
+
+        with self.assertLogs(LOG, 'ERROR') as cm:
+            self.assertRaises(StageFailure, pipeline.run)
+
+        self.assertIn("stage BadOpen failed", cm.output[0])
+        self.assertEqual(closed, [True])
+
+    def test_stop(self):
+        pipeline = None
+        results = []
+
+        def sink(item):
+            results.append(item)
+
+            if item == 3:
+                pipeline.stop()
+
+        pipeline = Pipeline(LOG, IterSource(LOG, range(1000)), (),
+                            CallableSink(LOG, sink))
+        self.assertEqual(pipeline.run(), 4)
+        self.assertEqual(results, [0, 1, 2, 3])
+
+
+if __name__ == '__main__':
+    unittest.main()
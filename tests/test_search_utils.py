@@ -0,0 +1,199 @@
+# -*- coding: utf-8 -*-
+#
+# tests/test_search_utils.py
+#
+# by: Carl J. Nobile
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+#
+
+import os
+import sys
+import csv
+import shutil
+import argparse
+import tempfile
+import unittest
+import subprocess
+
+from forensics.search_utils import Keywords, WeightedMatrix, SearchUtilities
+
+from helpers import LOG
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# The letter pairs of 'evidence' and 'hidden'.
+MATRIX = "ev vi id de en nc ce hi dd"
+
+
+class TestKeywords(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+
+    def test_from_string(self):
+        self.assertEqual(Keywords(LOG).fromString(
+            " alpha, beta|gamma\r\ndelta\t,, "),
+            {'alpha', 'beta', 'gamma', 'delta'})
+
+    def test_from_file(self):
+        # The file was read as bytes which the str regex cannot split.
+        path = os.path.join(self.tmpdir, 'keywords.txt')
+
+        with open(path, 'w', encoding='utf-8', newline='') as f:
+            f.write("alpha,beta\r\ngamma|café\n")
+
+        self.assertEqual(Keywords(LOG).fromFile(path),
+                         {'alpha', 'beta', 'gamma', 'café'})
+
+    def test_from_file_missing(self):
+        self.assertEqual(Keywords(LOG).fromFile(
+            os.path.join(self.tmpdir, 'missing.txt')), set())
+
+
+class TestWeightedMatrix(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+
+    def test_weight(self):
+        path = os.path.join(self.tmpdir, 'matrix.txt')
+
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write("EV vi,id|de\nen nc ce xyz q1")
+
+        matrix = WeightedMatrix(LOG).fromFile(path)
+        # Only two letter pairs are used, in lower case.
+        self.assertEqual(matrix.pairs, frozenset(
+            ['ev', 'vi', 'id', 'de', 'en', 'nc', 'ce']))
+        self.assertEqual(matrix.weight('evidence'), 1.0)
+        self.assertEqual(matrix.weight('evil'), 2 / 3)
+        self.assertEqual(matrix.weight('qzqz'), 0.0)
+        self.assertEqual(matrix.weight('e'), 0.0)
+
+
+class SearchMixin(object):
+    DATA = (b"\x00\x01EVIDENCE\xff\xfeqzxqzjwv\x00the hidden\r\n  Key "
+            b"word and keyword.\x00evidence")
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+        self.keywordPath = self._write('keywords.txt', "key word,keyword")
+        self.matrixPath = self._write('matrix.txt', MATRIX)
+        self.searchPath = os.path.join(self.tmpdir, 'search')
+        os.makedirs(os.path.join(self.searchPath, 'sub'))
+        self.binary = os.path.join(self.searchPath, 'sub', 'image.bin')
+
+        with open(self.binary, 'wb') as f:
+            f.write(self.DATA)
+
+    def _write(self, name, text):
+        path = os.path.join(self.tmpdir, name)
+
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(text)
+
+        return path
+
+    def _options(self, **kwargs):
+        options = dict(
+            noop=False, search_path=self.searchPath,
+            keyword_path=self.keywordPath, matrix_path=self.matrixPath,
+            report_path=os.path.join(self.tmpdir, 'report.csv'),
+            weight=0.75, executor='inline', workers=1, queue_size=4,
+            timing=False)
+        options.update(kwargs)
+        return argparse.Namespace(**options)
+
+
+class TestSearchUtilities(SearchMixin, unittest.TestCase):
+
+    def test_compile_keywords(self):
+        self.assertIsNone(SearchUtilities.compileKeywords(set()))
+        regex = SearchUtilities.compileKeywords({'key', 'key word'})
+        # The longest keyword wins and white space between words matches.
+        self.assertEqual([match.group() for match in regex.finditer(
+            b"KEY\tword, key keys")], [b"KEY\tword", b"key"])
+
+    def test_search_file(self):
+        rows = SearchUtilities(LOG, self._options()).searchFile(self.binary)
+        self.assertEqual([row[1:] for row in rows], [
+            [2, 'probable', 'evidence', '1.00'],
+            [25, 'probable', 'hidden', '1.00'],
+            [35, 'keyword', 'Key word', '0.00'],
+            [48, 'keyword', 'keyword', '0.00'],
+            [57, 'probable', 'evidence', '1.00']])
+        self.assertEqual(rows[0][0], self.binary)
+
+    def test_keywords_only(self):
+        rows = SearchUtilities(LOG, self._options(weight=1.1)).searchFile(
+            self.binary)
+        self.assertEqual([row[2] for row in rows], ['keyword', 'keyword'])
+
+    def test_empty_file(self):
+        path = os.path.join(self.tmpdir, 'empty.bin')
+        open(path, 'wb').close()
+        search = SearchUtilities(LOG, self._options())
+        self.assertEqual(search.searchFile(path), [])
+
+    def test_missing_file(self):
+        search = SearchUtilities(LOG, self._options())
+        self.assertEqual(search.searchFile(os.path.join(
+            self.tmpdir, 'missing.bin')), [])
+
+    def test_start(self):
+        with open(os.path.join(self.searchPath, 'note.txt'), 'wb') as f:
+            f.write(b"nothing to see")
+
+        options = self._options()
+        self.assertEqual(SearchUtilities(LOG, options).start(), 2)
+
+        with open(options.report_path, newline='', encoding='utf-8') as f:
+            rows = list(csv.reader(f))
+
+        self.assertEqual(rows[0], SearchUtilities.HEADERS)
+        self.assertEqual(len(rows), 6)
+
+        for executor in ('thread', 'process'):
+            path = os.path.join(self.tmpdir, executor + '.csv')
+            SearchUtilities(LOG, self._options(
+                executor=executor, workers=2, report_path=path)).start()
+
+            with open(path, newline='', encoding='utf-8') as f:
+                self.assertEqual(list(csv.reader(f)), rows)
+
+
+class TestSearchCommand(SearchMixin, unittest.TestCase):
+
+    def _run(self, searchPath):
+        report = os.path.join(self.tmpdir, 'command.csv')
+        result = subprocess.run(
+            [sys.executable, os.path.join(BASE_DIR, 'bin', 'search.py'),
+             '-q', '-k', self.keywordPath, '-m', self.matrixPath, '-s',
+             searchPath, '-r', report], capture_output=True)
+        return result, report
+
+    def test_file(self):
+        # A single file is also a valid search path.
+        result, report = self._run(self.binary)
+        self.assertEqual(result.returncode, 0, result.stderr)
+
+        with open(report, newline='', encoding='utf-8') as f:
+            self.assertEqual(len(list(csv.reader(f))), 6)
+
+    def test_missing_path(self):
+        result, report = self._run(os.path.join(self.tmpdir, 'missing'))
+        self.assertEqual(result.returncode, 1)
+        self.assertFalse(os.path.exists(report))
+
+
+if __name__ == '__main__':
+    unittest.main()
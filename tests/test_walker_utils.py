@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+#
+# tests/test_walker_utils.py
+#
+# by: Carl J. Nobile
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+#
+
+import os
+import csv
+import shutil
+import hashlib
+import argparse
+import tempfile
+import unittest
+
+from forensics.walker_utils import WalkerUtilities
+
+from helpers import LOG
+
+
+class TestWalkerUtilities(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+        self.tree = os.path.join(self.tmpdir, 'tree')
+        os.makedirs(os.path.join(self.tree, 'sub'))
+
+        for name, data in (('a.txt', b'alpha'),
+                           (os.path.join('sub', 'b.bin'), b'beta')):
+            with open(os.path.join(self.tree, name), 'wb') as f:
+                f.write(data)
+
+    def _walk(self, md5=False, sha256=False, sha512=False,
+              executor='inline', workers=1):
+        report = os.path.join(self.tmpdir, 'report.csv')
+        options = argparse.Namespace(
+            noop=False, dir_path=self.tree, report_path=report, md5=md5,
+            sha256=sha256, sha512=sha512, executor=executor,
+            workers=workers, queue_size=4, timing=False)
+        count = WalkerUtilities(LOG, options).walkPath()
+
+        with open(report, newline='', encoding='utf-8') as f:
+            rows = list(csv.reader(f))
+
+        self.assertEqual(len(rows) - 1, count)
+        return rows
+
+    def test_walk_path(self):
+        rows = self._walk(md5=True)
+        self.assertEqual(rows[0][:4], ['File', 'Path', 'Type', 'Size'])
+        self.assertEqual(rows[0][7], 'MD5')
+        found = dict([(row[0], row) for row in rows[1:]])
+        self.assertEqual(sorted(found), ['a.txt', 'b.bin'])
+        self.assertEqual(found['b.bin'][1], os.path.join(self.tree, 'sub'))
+        self.assertEqual(found['b.bin'][2], 'bin')
+        self.assertEqual(found['a.txt'][3], '5')
+        self.assertEqual(found['a.txt'][7],
+                         hashlib.md5(b'alpha').hexdigest().upper())
+
+    def test_repeated_runs(self):
+        # The hash header was only replaced the first time.
+        self.assertEqual(self._walk(md5=True)[0][7], 'MD5')
+        rows = self._walk(sha256=True)
+        self.assertEqual(rows[0][7], 'SHA256')
+        self.assertEqual(dict([(row[0], row[7]) for row in rows[1:]])['a.txt'],
+                         hashlib.sha256(b'alpha').hexdigest().upper())
+
+    def test_executors(self):
+        for idx in range(40):
+            with open(os.path.join(self.tree, 'sub', 'f{}'.format(idx)),
+                      'wb') as f:
+                f.write(os.urandom(idx * 100))
+
+        inline = self._walk(sha512=True)
+
+        for executor in ('thread', 'process'):
+            self.assertEqual(self._walk(sha512=True, executor=executor,
+                                        workers=3), inline)
+
+
+if __name__ == '__main__':
+    unittest.main()